@@ -0,0 +1,72 @@
+"""
+Bulk Delete Queue
+Collects messages doomed by enforcement and removes them with batched bulk-delete calls
+"""
+import asyncio
+import discord
+from datetime import datetime, timedelta, timezone
+
+
+class BulkDeleteQueue:
+    """Per-channel deletion queue flushed through a WriteScheduler"""
+
+    WINDOW = 0.3          # seconds to collect deletions before flushing a channel
+    BATCH_SIZE = 100      # Discord's bulk-delete maximum
+    MAX_AGE = timedelta(days=14, minutes=-5)  # bulk delete rejects older messages; keep a margin
+
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+        self.pending = {}     # channel_id -> {message_id: (message, future)}
+        self.stats = {'queued': 0, 'bulk_calls': 0, 'single_calls': 0}
+
+    def add(self, message, priority):
+        """Queue a message for deletion; the returned future resolves once it is gone"""
+        channel_id = message.channel.id
+        queue = self.pending.get(channel_id)
+        if queue is None:
+            queue = self.pending[channel_id] = {}
+            asyncio.create_task(self._flush_later(message.channel, priority))
+
+        if message.id in queue:
+            return queue[message.id][1]
+
+        future = asyncio.get_running_loop().create_future()
+        queue[message.id] = (message, future)
+        self.stats['queued'] += 1
+        return future
+
+    async def _flush_later(self, channel, priority):
+        await asyncio.sleep(self.WINDOW)
+        queue = self.pending.pop(channel.id, {})
+        cutoff = datetime.now(timezone.utc) - self.MAX_AGE
+
+        recent, old = [], []
+        for message, future in queue.values():
+            if discord.utils.snowflake_time(message.id) > cutoff:
+                recent.append((message, future))
+            else:
+                old.append((message, future))
+
+        for start in range(0, len(recent), self.BATCH_SIZE):
+            batch = recent[start:start + self.BATCH_SIZE]
+            if len(batch) == 1:
+                old.extend(batch)
+                continue
+            self.stats['bulk_calls'] += 1
+            done = self.scheduler.submit(
+                f"bulk_delete:{channel.id}",
+                lambda batch=batch: channel.delete_messages([m for m, _ in batch], reason="Auto-moderation cleanup"),
+                priority
+            )
+            done.add_done_callback(lambda _, batch=batch: self._resolve(batch))
+
+        # Single deletes for lone messages and anything past the bulk-delete age limit
+        for message, future in old:
+            self.stats['single_calls'] += 1
+            done = self.scheduler.submit(f"message_delete:{channel.id}", message.delete, priority)
+            done.add_done_callback(lambda _, batch=[(message, future)]: self._resolve(batch))
+
+    def _resolve(self, batch):
+        for _, future in batch:
+            if not future.done():
+                future.set_result(None)
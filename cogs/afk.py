@@ -2,6 +2,7 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 from database import Database
+from message_pipeline import get_pipeline
 from datetime import datetime, timedelta
 import re
 
@@ -9,6 +10,11 @@ class AFK(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.db = Database()
+        get_pipeline(bot).register('afk', self.handle_message, order=40)
+        self.db.expiries.start()
+    
+    def cog_unload(self):
+        get_pipeline(self.bot).unregister('afk')
     
     def parse_duration(self, duration_str):
         if not duration_str:
@@ -89,14 +95,7 @@ class AFK(commands.Cog):
         self.db.remove_afk(ctx.author.id)
         await ctx.send(f"✅ Welcome back, {ctx.author.mention}! Your AFK status has been removed.")
     
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        if message.author.bot:
-            return
-        
-        if not message.guild:
-            return
-        
+    async def handle_message(self, message, features):
         afk_data = self.db.get_afk(message.author.id)
         if afk_data and not message.content.startswith(('.afk', '!afk', '/afk')):
             if afk_data.get('muted'):
@@ -123,12 +122,11 @@ class AFK(commands.Cog):
                     until = afk_data.get('until')
                     
                     if until:
-                        until_time = datetime.fromisoformat(until)
-                        remaining = until_time - datetime.utcnow()
+                        remaining = self.db.expiries.remaining('afk', mentioned_user.id)
                         
-                        if remaining.total_seconds() > 0:
-                            hours = int(remaining.total_seconds() // 3600)
-                            minutes = int((remaining.total_seconds() % 3600) // 60)
+                        if remaining > 0:
+                            hours = int(remaining // 3600)
+                            minutes = int((remaining % 3600) // 60)
                             
                             if hours > 0:
                                 time_str = f"{hours}h {minutes}m"
@@ -5,6 +5,18 @@ from discord import app_commands
 import aiohttp
 import os
 from database import Database
+from message_pipeline import get_pipeline
+
+# Channels where AI should not respond
+AI_BLACKLIST_CHANNELS = frozenset([
+    1409307931622768762,  # General
+    1426711816024756314,  # International
+    1421903738636865556,  # Media
+    1409308015827353720,  # Creation
+    1409308088300998707,  # Question
+    1409308197809819668,  # Bot command
+    1431428103674138634   # Counting to 1000
+])
 
 class AIChat(commands.Cog):
     def __init__(self, bot):
@@ -15,6 +27,22 @@ class AIChat(commands.Cog):
         
         if not self.db.get_config('ai_model'):
             self.db.set_config('ai_model', 'meta-llama/Llama-3.2-3B-Instruct:fastest')
+        self.config = self.db.config.subscribe(self.on_config_change)
+        pipeline = get_pipeline(bot)
+        pipeline.register('ai_memory', self.log_memory, order=45)
+        pipeline.register(
+            'ai_chat', self.handle_message, order=80,
+            exclude=lambda config: AI_BLACKLIST_CHANNELS
+        )
+
+    def cog_unload(self):
+        self.db.config.unsubscribe(self.on_config_change)
+        pipeline = get_pipeline(self.bot)
+        pipeline.unregister('ai_memory')
+        pipeline.unregister('ai_chat')
+
+    def on_config_change(self, config):
+        self.config = config
 
     async def get_server_context(self, guild) -> str:
         """Build server context with accurate data from server indexing"""
@@ -169,13 +197,9 @@ When asked about server statistics, use the exact numbers provided above."""
 
         await ctx.send(embed=embed)
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        if message.author.bot:
-            return
-
+    async def log_memory(self, message, features):
         # LOG ALL MESSAGES TO AI MEMORY (server-wide learning)
-        if message.guild and message.content:
+        if message.content:
             self.db.add_ai_memory_message(
                 user_id=message.author.id,
                 username=message.author.name,
@@ -184,23 +208,8 @@ When asked about server statistics, use the exact numbers provided above."""
                 guild_id=message.guild.id
             )
 
-        ai_enabled = self.db.get_config('ai_enabled')
-        if not ai_enabled:
-            return
-        
-        # Blacklist channels where AI should not respond
-        AI_BLACKLIST_CHANNELS = [
-            1409307931622768762,  # General
-            1426711816024756314,  # International
-            1421903738636865556,  # Media
-            1409308015827353720,  # Creation
-            1409308088300998707,  # Question
-            1409308197809819668,  # Bot command
-            1431428103674138634   # Counting to 1000
-        ]
-        
-        # Skip AI responses in blacklisted channels
-        if message.channel.id in AI_BLACKLIST_CHANNELS:
+    async def handle_message(self, message, features):
+        if not self.config.ai_enabled:
             return
         
         # Check if message is in an allowed ticket category
@@ -215,10 +224,10 @@ When asked about server statistics, use the exact numbers provided above."""
             is_in_allowed_ticket_category = True
         
         # Check if AI operations are enabled (STOP/START control)
-        ai_ops_enabled = self.db.get_ai_ops_status()
+        ai_ops_enabled = self.config.get('ai_ops_enabled', True)
 
         # Clean message content for comparison
-        content_clean = message.content.strip().lower()
+        content_clean = features.lower
         
         # IGNORE messages that are ONLY punctuation (like ??, .., ???, etc.)
         if content_clean and all(c in '?!.,;:-' for c in content_clean):
@@ -0,0 +1,103 @@
+import discord
+from discord.ext import commands, tasks
+from database import Database
+from datetime import datetime
+import time
+from message_pipeline import get_pipeline
+
+RANGES = {
+    '1h': 3600,
+    '24h': 86400,
+    '7d': 7 * 86400,
+    '30d': 30 * 86400,
+    '90d': 90 * 86400,
+    '1y': 365 * 86400
+}
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+def sparkline(counts, width=48):
+    """Counts squeezed into `width` columns of block characters"""
+    if not counts:
+        return ""
+    if len(counts) > width:
+        step = len(counts) / width
+        counts = [sum(counts[int(i * step):int((i + 1) * step)]) for i in range(width)]
+    peak = max(counts) or 1
+    return "".join(SPARK_CHARS[min(len(SPARK_CHARS) - 1, count * len(SPARK_CHARS) // (peak + 1))] for count in counts)
+
+class Analytics(commands.Cog):
+    """Message and command activity recorded into the time series store"""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.db = Database()
+        get_pipeline(bot).register('analytics', self.handle_message, order=-10)
+        self.persist_analytics.start()
+
+    def cog_unload(self):
+        get_pipeline(self.bot).unregister('analytics')
+        self.persist_analytics.cancel()
+        self.db.analytics.save()
+
+    async def handle_message(self, message, features):
+        self.db.track_daily_message(message.guild.id, features.channel_id)
+
+    @commands.Cog.listener()
+    async def on_command_completion(self, ctx):
+        self.db.track_command_usage(ctx.command.qualified_name)
+
+    @tasks.loop(minutes=5)
+    async def persist_analytics(self):
+        try:
+            self.db.analytics.compact()
+            self.db.analytics.save()
+        except Exception as e:
+            print(f"Analytics save error: {e}")
+
+    @commands.hybrid_command(name='activity', description='Chart server message activity over a time range')
+    @commands.has_permissions(manage_messages=True)
+    async def activity(self, ctx, period: str = '24h', channel: discord.TextChannel = None):
+        seconds = RANGES.get(period.lower())
+        if seconds is None:
+            await ctx.send(f"❌ Period must be one of: {', '.join(RANGES)}", ephemeral=True)
+            return
+
+        now = time.time()
+        start = now - seconds
+        key = f"channel:{channel.id}" if channel else f"message:{ctx.guild.id}"
+        points = self.db.analytics.query(key, start, now)
+        counts = [count for _, count in points]
+        total = sum(counts)
+        bucket_seconds = points[1][0] - points[0][0] if len(points) > 1 else seconds
+        peak_start, peak = max(points, key=lambda point: point[1]) if points else (start, 0)
+
+        embed = discord.Embed(
+            title=f"📊 Activity - {channel.name if channel else ctx.guild.name}",
+            description=f"Messages over the last **{period}**\n```\n{sparkline(counts)}\n```",
+            color=discord.Color.blue(),
+            timestamp=datetime.utcnow()
+        )
+        embed.add_field(name="Messages", value=f"{total:,}", inline=True)
+        embed.add_field(name="Per Hour", value=f"{total * 3600 / seconds:,.1f}", inline=True)
+        embed.add_field(name="Peak", value=f"{peak:,} at <t:{int(peak_start)}:f>" if peak else "None", inline=True)
+
+        if not channel:
+            channels = []
+            for channel_id, count in self.db.analytics.top('channel', start, now, limit=15):
+                guild_channel = ctx.guild.get_channel(int(channel_id))
+                if guild_channel:
+                    channels.append(f"{guild_channel.mention} - {count:,}")
+            embed.add_field(name="Busiest Channels", value="\n".join(channels[:5]) or "None", inline=False)
+
+        commands_used = self.db.analytics.top('command', start, now, limit=5)
+        embed.add_field(
+            name="Top Commands",
+            value="\n".join(f"`/{name}` - {count:,}" for name, count in commands_used) or "None",
+            inline=False
+        )
+        embed.set_footer(text=f"{len(points)} buckets of {bucket_seconds // 60:,} min")
+
+        await ctx.send(embed=embed, ephemeral=True)
+
+async def setup(bot):
+    await bot.add_cog(Analytics(bot))
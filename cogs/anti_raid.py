@@ -0,0 +1,263 @@
+import discord
+from discord.ext import commands, tasks
+from datetime import datetime, timedelta, timezone
+import aiohttp
+import asyncio
+import time
+from database import Database
+from raid_detector import JoinBurstDetector
+from write_scheduler import get_scheduler
+from cogs.verification import complete_verification
+
+class RaidState:
+    def __init__(self, reasons):
+        self.started = time.time()
+        self.last_trigger = self.started
+        self.reasons = list(reasons)
+        self.actioned = set()
+        self.held_welcomes = []
+        self.joins = 0
+
+class AntiRaid(commands.Cog):
+    CALM_PERIOD = 300        # seconds without a trigger before raid mode ends
+    VERIFY_WINDOW = 2        # seconds to collect verifications during a raid
+    ROBLOX_BATCH = 100
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.db = Database()
+        self.detectors = {}
+        self.raids = {}
+        self.pending_logs = []
+        self.pending_verifications = []
+        self.verify_task = None
+        self.config = self.db.config.subscribe(self.on_config_change)
+        self.maintenance.start()
+
+    def cog_unload(self):
+        self.maintenance.cancel()
+        self.db.config.unsubscribe(self.on_config_change)
+
+    def on_config_change(self, config):
+        self.config = config
+
+    def is_raid_active(self, guild_id):
+        return guild_id in self.raids
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member):
+        """Constant-time bookkeeping per join; punishments and logs are queued, never awaited here"""
+        if member.bot or not self.config.anti_raid_enabled:
+            return
+
+        guild = member.guild
+        detector = self.detectors.get(guild.id)
+        if detector is None:
+            detector = self.detectors[guild.id] = JoinBurstDetector()
+
+        account_age = (datetime.now(timezone.utc) - member.created_at).total_seconds()
+        entry, reasons = detector.record(member.id, member.name, account_age)
+
+        raid = self.raids.get(guild.id)
+        if reasons:
+            if raid is None:
+                raid = self.raids[guild.id] = RaidState(reasons)
+                self.announce_raid(guild, raid)
+                # Joins that arrived before the threshold tripped are part of the wave too
+                for earlier in list(detector.recent):
+                    if detector.is_suspicious(earlier):
+                        self.punish(guild, earlier.member_id, raid, reasons)
+            raid.last_trigger = time.time()
+            for reason in reasons:
+                if reason not in raid.reasons:
+                    raid.reasons.append(reason)
+
+        if raid is None:
+            return
+
+        raid.joins += 1
+        if detector.is_suspicious(entry):
+            self.punish(guild, member.id, raid, reasons or raid.reasons)
+        else:
+            raid.held_welcomes.append(member.id)
+
+    def punish(self, guild, member_id, raid, reasons):
+        if member_id in raid.actioned:
+            return
+        raid.actioned.add(member_id)
+
+        member = guild.get_member(member_id)
+        if not member:
+            return
+
+        action = self.config.anti_raid_action or 'timeout'
+        scheduler = get_scheduler(self.bot)
+        reason = f"Anti-Raid: {'; '.join(reasons)}"[:512]
+        if action == 'kick':
+            scheduler.kick_member(member, reason=reason)
+        else:
+            scheduler.timeout_member(member, timedelta(hours=1), reason=reason)
+
+        self.pending_logs.append({
+            'guild_id': guild.id,
+            'user_id': member_id,
+            'action': 'kick' if action == 'kick' else 'mute',
+            'reason': reason,
+            'duration': None if action == 'kick' else 3600
+        })
+
+    def announce_raid(self, guild, raid):
+        log_channel = guild.get_channel(self.db.get_config('log_channel') or 1411710143598690404)
+        if not log_channel:
+            return
+        embed = discord.Embed(
+            title="🚨 Raid Mode Enabled",
+            description="Join burst detected. Welcomes are paused, verification is batched and suspicious accounts are being restricted.",
+            color=discord.Color.red(),
+            timestamp=datetime.utcnow()
+        )
+        embed.add_field(name="Triggers", value="\n".join(f"• {r}" for r in raid.reasons), inline=False)
+        get_scheduler(self.bot).send_message(log_channel, embed=embed)
+
+    async def end_raid(self, guild, raid):
+        del self.raids[guild.id]
+
+        log_channel = guild.get_channel(self.db.get_config('log_channel') or 1411710143598690404)
+        if log_channel:
+            embed = discord.Embed(
+                title="✅ Raid Mode Ended",
+                description=f"No join bursts for {self.CALM_PERIOD // 60} minutes.",
+                color=discord.Color.green(),
+                timestamp=datetime.utcnow()
+            )
+            embed.add_field(name="Joins During Raid", value=str(raid.joins), inline=True)
+            embed.add_field(name="Accounts Restricted", value=str(len(raid.actioned)), inline=True)
+            embed.add_field(name="Triggers", value="\n".join(f"• {r}" for r in raid.reasons)[:1024], inline=False)
+            get_scheduler(self.bot).send_message(log_channel, embed=embed)
+
+        # Welcome everyone who was held back in one message
+        welcome_channel = guild.get_channel(self.db.get_config('welcome_channel') or 1409299795318804612)
+        members = [guild.get_member(member_id) for member_id in raid.held_welcomes]
+        members = [m for m in members if m]
+        if welcome_channel and members:
+            mentions = " ".join(m.mention for m in members[:50])
+            extra = f" and {len(members) - 50} more" if len(members) > 50 else ""
+            get_scheduler(self.bot).send_message(
+                welcome_channel,
+                content=f"Welcome {mentions}{extra} to **{guild.name}**!",
+                allowed_mentions=discord.AllowedMentions(users=False)
+            )
+
+    @tasks.loop(seconds=5)
+    async def maintenance(self):
+        if self.pending_logs:
+            entries, self.pending_logs = self.pending_logs, []
+            self.db.log_automod_actions(entries)
+
+        now = time.time()
+        for guild_id, raid in list(self.raids.items()):
+            if now - raid.last_trigger >= self.CALM_PERIOD:
+                guild = self.bot.get_guild(guild_id)
+                if guild:
+                    await self.end_raid(guild, raid)
+                else:
+                    del self.raids[guild_id]
+
+    @maintenance.before_loop
+    async def before_maintenance(self):
+        await self.bot.wait_until_ready()
+
+    # Batched verification
+    def queue_verification(self, interaction, username):
+        self.pending_verifications.append((interaction, username))
+        if self.verify_task is None or self.verify_task.done():
+            self.verify_task = asyncio.create_task(self.process_verifications())
+
+    async def process_verifications(self):
+        await asyncio.sleep(self.VERIFY_WINDOW)
+        while self.pending_verifications:
+            batch = self.pending_verifications[:self.ROBLOX_BATCH]
+            del self.pending_verifications[:self.ROBLOX_BATCH]
+            try:
+                await self.verify_batch(batch)
+            except Exception as e:
+                print(f"Batched verification error: {e}")
+                for interaction, _ in batch:
+                    try:
+                        await interaction.followup.send("❌ An error occurred during verification. Please contact an administrator.", ephemeral=True)
+                    except:
+                        pass
+
+    async def verify_batch(self, batch):
+        """One username lookup and one thumbnail lookup for a whole batch of submissions"""
+        usernames = list(dict.fromkeys(username for _, username in batch))
+        async with aiohttp.ClientSession() as session:
+            async with session.post(
+                "https://users.roblox.com/v1/usernames/users",
+                json={"usernames": usernames}
+            ) as resp:
+                if resp.status != 200:
+                    for interaction, _ in batch:
+                        await interaction.followup.send("❌ Failed to verify with Roblox. Please try again later.", ephemeral=True)
+                    return
+                data = await resp.json()
+
+            accounts = {
+                account['requestedUsername'].lower(): account
+                for account in data.get('data', [])
+                if account.get('requestedUsername')
+            }
+
+            avatars = {}
+            if accounts:
+                user_ids = ",".join(str(account['id']) for account in accounts.values())
+                async with session.get(f"https://thumbnails.roblox.com/v1/users/avatar-headshot?userIds={user_ids}&size=150x150&format=Png") as avatar_resp:
+                    if avatar_resp.status == 200:
+                        avatar_data = await avatar_resp.json()
+                        avatars = {item['targetId']: item.get('imageUrl') for item in avatar_data.get('data', [])}
+
+        db = Database()
+        for interaction, username in batch:
+            account = accounts.get(username.lower())
+            if not account:
+                await interaction.followup.send("❌ Roblox username not found. Please check your username and try again.", ephemeral=True)
+                continue
+            try:
+                await complete_verification(interaction, db, account['id'], account['name'], avatars.get(account['id']))
+            except Exception as e:
+                print(f"Verification error: {e}")
+                await interaction.followup.send("❌ An error occurred during verification. Please contact an administrator.", ephemeral=True)
+
+    @commands.hybrid_command(name='raidstatus', description='Show anti-raid status for this server')
+    @commands.has_permissions(moderate_members=True)
+    async def raidstatus(self, ctx):
+        detector = self.detectors.get(ctx.guild.id)
+        raid = self.raids.get(ctx.guild.id)
+
+        embed = discord.Embed(
+            title="🛡️ Anti-Raid Status",
+            color=discord.Color.red() if raid else discord.Color.green(),
+            timestamp=datetime.utcnow()
+        )
+        embed.add_field(name="Raid Mode", value="Active" if raid else "Inactive", inline=True)
+        embed.add_field(name="Enabled", value="Yes" if self.db.get_config('anti_raid_enabled') else "No", inline=True)
+
+        if detector:
+            now = int(time.time())
+            histogram = detector.age_histogram(now)
+            labels = ["<1h", "<1d", "<7d", "<30d", "older"]
+            embed.add_field(name=f"Joins (last {detector.burst_window}s)", value=str(detector.joins_within(detector.burst_window, now)), inline=True)
+            embed.add_field(
+                name=f"Account Ages (last {detector.window}s)",
+                value=" • ".join(f"{label}: {count}" for label, count in zip(labels, histogram)),
+                inline=False
+            )
+
+        if raid:
+            embed.add_field(name="Accounts Restricted", value=str(len(raid.actioned)), inline=True)
+            embed.add_field(name="Triggers", value="\n".join(f"• {r}" for r in raid.reasons)[:1024], inline=False)
+
+        await ctx.send(embed=embed, ephemeral=True)
+
+async def setup(bot):
+    await bot.add_cog(AntiRaid(bot))
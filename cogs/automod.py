@@ -1,79 +1,170 @@
 import discord
-from discord.ext import commands
-from datetime import datetime, timedelta
-from collections import defaultdict
+from discord.ext import commands, tasks
+from datetime import datetime, timedelta, timezone
 from database import Database
+from write_scheduler import get_scheduler, PRIORITY_COSMETIC
+from rate_tracker import SlidingWindowTracker
+from fingerprint import FingerprintIndex
+from automod_rules import RuleEngine
+from domain_blocklist import DomainBlocklist
+from raid_detector import YOUNG_AGE
+from message_pipeline import get_pipeline
 
 class AutoMod(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.db = Database()
         
-        self.message_cache = defaultdict(list)
-        self.mention_cache = defaultdict(list)
-        
         self.spam_threshold = 5
         self.spam_interval = 5
         self.duplicate_threshold = 3
-        self.mention_threshold = 5
-        self.caps_threshold = 0.7
-        self.caps_min_length = 10
+        self.blocklist = DomainBlocklist('blocklist.txt')
+        self.rules = RuleEngine(self.db, self.blocklist)
+        self.config = self.db.config.subscribe(self.on_config_change)
+        
+        self.message_cache = SlidingWindowTracker(window=self.spam_interval, capacity=self.spam_threshold)
+        self.fingerprints = FingerprintIndex(window=30, author_threshold=self.config.get('raid_wave_threshold', 5))
+        self.refresh_blocklist.start()
+        get_pipeline(bot).register('automod', self.handle_message, order=10)
     
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        if message.author.bot:
-            return
-        
+    def cog_unload(self):
+        self.refresh_blocklist.cancel()
+        get_pipeline(self.bot).unregister('automod')
+        self.db.config.unsubscribe(self.on_config_change)
+    
+    def on_config_change(self, config):
+        self.config = config
+        self.fingerprints.author_threshold = config.get('raid_wave_threshold', 5)
+    
+    @tasks.loop(minutes=5)
+    async def refresh_blocklist(self):
+        """Pick up edits to the blocklist file; the rebuild runs off the event loop"""
+        try:
+            await self.blocklist.reload()
+        except Exception as e:
+            print(f"Blocklist reload error: {e}")
+    
+    async def handle_message(self, message, features):
+        """Pipeline handler; returning True (message actioned) stops XP, AI and the rest"""
         if message.author.guild_permissions.manage_messages:
-            return
+            return False
         
-        automod_enabled = self.db.get_config('auto_mod_enabled') or False
-        if not automod_enabled:
-            return
+        rules = self.rules.snapshot(message.guild.id)
+        if rules.is_exempt(features.role_ids):
+            return False
         
-        exempt_roles = self.db.get_config('automod_exempt_roles') or []
-        if any(role.id in exempt_roles for role in message.author.roles):
-            return
+        if self.config.anti_raid_enabled and await self.check_raid_wave(message):
+            return True
+        
+        if not rules.enabled:
+            return False
         
         current_time = datetime.utcnow()
         
         if await self.check_spam(message, current_time):
-            return
+            return True
         
-        if await self.check_mass_mentions(message):
-            return
+        verdict = rules.evaluate(message.content, features.mention_count)
+        if verdict:
+            return await self.apply_verdict(message, verdict)
+        return False
+    
+    def is_young(self, member):
+        """Account created or server joined within the young window used by join-raid detection"""
+        now = datetime.now(timezone.utc)
+        if (now - member.created_at).total_seconds() < YOUNG_AGE:
+            return True
+        return member.joined_at is not None and (now - member.joined_at).total_seconds() < YOUNG_AGE
+    
+    async def check_raid_wave(self, message):
+        """Catch the same message posted by many new accounts within the window"""
+        cluster = self.fingerprints.observe(message.guild.id, message.author.id, message.content, message)
+        if not cluster:
+            return False
         
-        if await self.check_caps(message):
-            return
+        # Only young accounts are treated as a raid; established members get a staff alert instead
+        young = set()
+        for author_id in cluster.authors:
+            member = message.guild.get_member(author_id)
+            if member and not member.guild_permissions.manage_messages and self.is_young(member):
+                young.add(author_id)
+        
+        if len(young) < self.fingerprints.author_threshold:
+            if not cluster.alerted:
+                cluster.alerted = True
+                self.alert_staff(message, len(cluster.authors), len(young))
+            return False
         
-        if await self.check_links(message):
+        scheduler = get_scheduler(self.bot)
+        for author_id, doomed in cluster.drain():
+            if author_id in young:
+                scheduler.delete_message(doomed)
+        
+        new_authors = [author_id for author_id in young if author_id not in cluster.actioned]
+        for author_id in new_authors:
+            cluster.actioned.add(author_id)
+            scheduler.timeout_member(message.guild.get_member(author_id), timedelta(minutes=10), reason="Anti-Raid: Coordinated spam")
+            self.db.log_automod_action(
+                guild_id=message.guild.id,
+                user_id=author_id,
+                action='mute',
+                reason=f'Raid wave: near-identical message from {len(young)} new accounts',
+                duration=600
+            )
+        
+        if new_authors:
+            embed = discord.Embed(
+                title="🛡️ Anti-Raid",
+                description=f"Removed a message posted by **{len(young)}** new accounts in a short time.",
+                color=discord.Color.orange()
+            )
+            scheduler.send_message(
+                message.channel,
+                PRIORITY_COSMETIC,
+                key=f"raid_notice:{message.channel.id}",
+                ttl=10,
+                embed=embed,
+                delete_after=10
+            )
+        
+        return message.author.id in young
+    
+    def alert_staff(self, message, authors, young):
+        log_channel = message.guild.get_channel(self.db.get_config('log_channel') or 1411710143598690404)
+        if not log_channel:
             return
+        embed = discord.Embed(
+            title="👀 Repeated Message",
+            description=f"**{authors}** accounts posted near-identical messages in {message.channel.mention} within {self.fingerprints.window}s. "
+                        f"Only {young} are new accounts, so no action was taken.",
+            color=discord.Color.yellow(),
+            timestamp=datetime.utcnow()
+        )
+        embed.add_field(name="Message", value=message.content[:1024] or "*empty*", inline=False)
+        get_scheduler(self.bot).send_message(log_channel, PRIORITY_COSMETIC, embed=embed)
     
     async def check_spam(self, message, current_time):
-        user_messages = self.message_cache[message.author.id]
-        
-        user_messages = [msg for msg in user_messages if current_time - msg['time'] < timedelta(seconds=self.spam_interval)]
-        
-        user_messages.append({
-            'time': current_time,
-            'content': message.content,
-            'channel': message.channel.id
-        })
-        
-        self.message_cache[message.author.id] = user_messages
+        message_count, duplicate_count = self.message_cache.record(message.author.id, message.content)
         
-        if len(user_messages) >= self.spam_threshold:
+        if message_count >= self.spam_threshold:
             try:
-                await message.delete()
+                get_scheduler(self.bot).delete_message(message)
                 
-                await message.author.timeout(timedelta(minutes=5), reason="Auto-Mod: Spam detected")
+                get_scheduler(self.bot).timeout_member(message.author, timedelta(minutes=5), reason="Auto-Mod: Spam detected")
                 
                 embed = discord.Embed(
                     title="🛡️ Auto-Mod Action",
                     description=f"{message.author.mention} was muted for **5 minutes** for spam",
                     color=discord.Color.orange()
                 )
-                await message.channel.send(embed=embed, delete_after=10)
+                get_scheduler(self.bot).send_message(
+                    message.channel,
+                    PRIORITY_COSMETIC,
+                    key=f"automod_notice:{message.channel.id}:{message.author.id}",
+                    ttl=10,
+                    embed=embed,
+                    delete_after=10
+                )
                 
                 self.db.log_automod_action(
                     guild_id=message.guild.id,
@@ -83,21 +174,27 @@ class AutoMod(commands.Cog):
                     duration=300
                 )
                 
-                self.message_cache[message.author.id] = []
+                self.message_cache.reset(message.author.id)
                 return True
             except:
                 pass
         
-        duplicate_count = sum(1 for msg in user_messages if msg['content'] == message.content)
         if duplicate_count >= self.duplicate_threshold:
             try:
-                await message.delete()
+                get_scheduler(self.bot).delete_message(message)
                 
                 embed = discord.Embed(
                     description=f"❌ {message.author.mention} Please don't spam duplicate messages",
                     color=discord.Color.red()
                 )
-                await message.channel.send(embed=embed, delete_after=5)
+                get_scheduler(self.bot).send_message(
+                    message.channel,
+                    PRIORITY_COSMETIC,
+                    key=f"automod_notice:{message.channel.id}:{message.author.id}",
+                    ttl=5,
+                    embed=embed,
+                    delete_after=5
+                )
                 
                 self.db.log_automod_action(
                     guild_id=message.guild.id,
@@ -113,111 +210,64 @@ class AutoMod(commands.Cog):
         
         return False
     
-    async def check_mass_mentions(self, message):
-        mention_count = len(message.mentions) + len(message.role_mentions)
-        
-        if mention_count >= self.mention_threshold:
-            try:
-                await message.delete()
-                
-                await message.author.timeout(timedelta(minutes=10), reason="Auto-Mod: Mass mentions")
-                
+    async def apply_verdict(self, message, verdict):
+        """Carry out a RuleSnapshot verdict: delete, optionally time out, notify and log"""
+        try:
+            scheduler = get_scheduler(self.bot)
+            scheduler.delete_message(message)
+            
+            if verdict.action == 'mute':
+                minutes = verdict.duration // 60
+                scheduler.timeout_member(message.author, timedelta(seconds=verdict.duration), reason=f"Auto-Mod: {verdict.reason}")
                 embed = discord.Embed(
                     title="🛡️ Auto-Mod Action",
-                    description=f"{message.author.mention} was muted for **10 minutes** for mass mentions ({mention_count} mentions)",
+                    description=f"{message.author.mention} was muted for **{minutes} minutes** for {verdict.reason[0].lower()}{verdict.reason[1:]}",
                     color=discord.Color.orange()
                 )
-                await message.channel.send(embed=embed, delete_after=10)
-                
-                self.db.log_automod_action(
-                    guild_id=message.guild.id,
-                    user_id=message.author.id,
-                    action='mute',
-                    reason=f'Mass mentions ({mention_count})',
-                    duration=600
-                )
-                
-                return True
-            except:
-                pass
-        
-        return False
-    
-    async def check_caps(self, message):
-        if len(message.content) < self.caps_min_length:
-            return False
-        
-        caps_count = sum(1 for char in message.content if char.isupper())
-        total_letters = sum(1 for char in message.content if char.isalpha())
-        
-        if total_letters == 0:
-            return False
-        
-        caps_ratio = caps_count / total_letters
-        
-        if caps_ratio >= self.caps_threshold:
-            try:
-                await message.delete()
-                
-                await message.author.timeout(timedelta(minutes=3), reason="Auto-Mod: Excessive caps")
-                
+                ttl = 10
+            else:
                 embed = discord.Embed(
-                    title="🛡️ Auto-Mod Action",
-                    description=f"{message.author.mention} was muted for **3 minutes** for excessive caps ({int(caps_ratio * 100)}% caps)",
-                    color=discord.Color.orange()
-                )
-                await message.channel.send(embed=embed, delete_after=10)
-                
-                self.db.log_automod_action(
-                    guild_id=message.guild.id,
-                    user_id=message.author.id,
-                    action='mute',
-                    reason=f'Excessive caps ({int(caps_ratio * 100)}%)',
-                    duration=180
+                    description=f"❌ {message.author.mention} Unauthorized links are not allowed",
+                    color=discord.Color.red()
                 )
-                
-                return True
-            except:
-                pass
-        
-        return False
-    
-    async def check_links(self, message):
-        link_filter_enabled = self.db.get_config('link_filter_enabled') or False
-        if not link_filter_enabled:
-            return False
-        
-        whitelisted_domains = self.db.get_config('whitelisted_domains') or [
-            'discord.gg', 'discord.com', 'youtube.com', 'youtu.be',
-            'twitch.tv', 'twitter.com', 'x.com', 'roblox.com'
-        ]
-        
-        if 'http://' in message.content or 'https://' in message.content:
-            is_whitelisted = any(domain in message.content.lower() for domain in whitelisted_domains)
+                ttl = 5
+            
+            scheduler.send_message(
+                message.channel,
+                PRIORITY_COSMETIC,
+                key=f"automod_notice:{message.channel.id}:{message.author.id}",
+                ttl=ttl,
+                embed=embed,
+                delete_after=ttl
+            )
             
-            if not is_whitelisted:
-                try:
-                    await message.delete()
-                    
-                    embed = discord.Embed(
-                        description=f"❌ {message.author.mention} Unauthorized links are not allowed",
-                        color=discord.Color.red()
-                    )
-                    await message.channel.send(embed=embed, delete_after=5)
-                    
-                    self.db.log_automod_action(
-                        guild_id=message.guild.id,
-                        user_id=message.author.id,
-                        action='delete',
-                        reason='Unauthorized link posted',
-                        duration=None
-                    )
-                    
-                    return True
-                except:
-                    pass
+            self.db.log_automod_action(
+                guild_id=message.guild.id,
+                user_id=message.author.id,
+                action=verdict.action,
+                reason=verdict.reason,
+                duration=verdict.duration
+            )
+            
+            return True
+        except:
+            return False
+    
+    @commands.hybrid_command(name='blocklist', description='Show phishing blocklist status')
+    @commands.has_permissions(moderate_members=True)
+    async def blocklist_status(self, ctx):
+        stats = self.blocklist.stats
+        embed = discord.Embed(
+            title="🛡️ Phishing Blocklist",
+            color=discord.Color.blue()
+        )
+        embed.add_field(name="Domains", value=f"{len(self.blocklist):,}", inline=True)
+        embed.add_field(name="Lookups", value=f"{stats['lookups']:,}", inline=True)
+        embed.add_field(name="Blocked", value=f"{stats['blocked']:,}", inline=True)
+        embed.add_field(name="Avg Lookup", value=f"{self.blocklist.average_lookup_ns() / 1000:.1f} µs", inline=True)
+        embed.add_field(name="Filter", value="Enabled" if self.rules.snapshot(ctx.guild.id).blocklist else "Disabled", inline=True)
         
-        return False
+        await ctx.send(embed=embed, ephemeral=True)
     
     # DISABLED - /automod command
     # @commands.hybrid_command(name='automod', description='Toggle auto-moderation on or off')
@@ -1,120 +1,114 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from database import Database
-from datetime import datetime, timedelta
+from datetime import datetime
+from write_scheduler import get_scheduler, PRIORITY_COSMETIC
+from message_pipeline import get_pipeline
+from counting_state import LOCKED, COOLDOWN, NOT_NUMBER, DOUBLE_COUNT, MILESTONE
 
 class Counting(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.db = Database()
         self.counting_channel_id = 1431428103674138634
         self.cooldown_seconds = 5
         self.max_mistakes = 5
         self.lockout_duration = 3600
         self.celebration_number = 5000
+        self.state = self.db.counting
+        self.state.configure(
+            cooldown=self.cooldown_seconds,
+            max_mistakes=self.max_mistakes,
+            lockout=self.lockout_duration,
+            celebration=self.celebration_number
+        )
+        get_pipeline(bot).register(
+            'counting', self.handle_message, order=20,
+            channels=lambda config: (self.counting_channel_id,)
+        )
+        self.expiries = self.db.expiries
+        self.expiries.on_expire('counting_lockout', self.on_lockout_expired)
+        self.expiries.start()
+        self.checkpoint_counting.start()
     
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        if message.author.bot:
-            return
-        
-        if message.channel.id != self.counting_channel_id:
-            return
-        
-        db = Database()
-        
-        lockout_data = db.get_counting_lockout(message.author.id)
-        if lockout_data:
-            lockout_until = datetime.fromisoformat(lockout_data['lockout_until'])
-            if datetime.utcnow() < lockout_until:
-                await message.delete()
-                remaining = (lockout_until - datetime.utcnow()).total_seconds()
-                remaining_minutes = int(remaining / 60)
-                try:
-                    await message.author.send(f"🔒 You are locked from counting for {remaining_minutes} more minutes due to {self.max_mistakes} mistakes.")
-                except:
-                    pass
-                return
-            else:
-                db.clear_counting_lockout(message.author.id)
-        
-        cooldown_data = db.get_counting_cooldown(message.author.id)
-        if cooldown_data:
-            cooldown_until = datetime.fromisoformat(cooldown_data['cooldown_until'])
-            if datetime.utcnow() < cooldown_until:
-                await message.delete()
-                remaining_seconds = int((cooldown_until - datetime.utcnow()).total_seconds())
-                try:
-                    await message.channel.send(
-                        f"{message.author.mention} ⏱️ Please wait **{remaining_seconds}** seconds before typing again.",
-                        delete_after=3
-                    )
-                except:
-                    pass
-                return
-        
-        content = message.content.strip()
-        if not content.isdigit():
-            await message.delete()
+    def cog_unload(self):
+        get_pipeline(self.bot).unregister('counting')
+        self.expiries.remove_callback('counting_lockout', self.on_lockout_expired)
+        self.checkpoint_counting.cancel()
+        self.state.checkpoint()
+    
+    @tasks.loop(seconds=10)
+    async def checkpoint_counting(self):
+        """Counts are applied in memory; persist them in one save when anything changed"""
+        try:
+            self.state.checkpoint()
+        except Exception as e:
+            print(f"Counting checkpoint error: {e}")
+    
+    async def on_lockout_expired(self, user_id, payload):
+        user = self.bot.get_user(user_id)
+        if user:
             try:
-                await message.channel.send(
-                    f"{message.author.mention} ❌ Numbers only!",
-                    delete_after=3
-                )
+                await user.send("🔓 Your counting lockout has ended. You can count again!")
             except:
                 pass
-            return
-        
-        number = int(content)
-        
-        counting_state = db.get_counting_state(message.guild.id)
-        last_number = counting_state.get('last_number', 0)
-        last_user_id = counting_state.get('last_user_id')
-        
-        if last_user_id == message.author.id:
-            await message.delete()
-            mistakes = db.increment_counting_mistakes(message.author.id)
-            
-            remaining_mistakes = self.max_mistakes - mistakes
-            
+    
+    async def handle_message(self, message, features):
+        # The transition happens before any await, so racing messages cannot both be accepted
+        result = self.state.submit(message.guild.id, message.author.id, message.content)
+        scheduler = get_scheduler(self.bot)
+        
+        if result.outcome == LOCKED:
+            scheduler.delete_message(message)
+            remaining_minutes = int(result.remaining / 60)
             try:
-                await message.channel.send(
-                    f"{message.author.mention} ❌ You cannot count twice in a row! **{remaining_mistakes}** mistakes remaining before lockout.",
-                    delete_after=5
-                )
+                await message.author.send(f"🔒 You are locked from counting for {remaining_minutes} more minutes due to {self.max_mistakes} mistakes.")
             except:
                 pass
-            
-            if mistakes >= self.max_mistakes:
-                lockout_until = datetime.utcnow() + timedelta(seconds=self.lockout_duration)
-                db.set_counting_lockout(message.author.id, lockout_until.isoformat())
-                db.reset_counting_mistakes(message.author.id)
-                try:
-                    await message.author.send("🔒 You have been locked from counting for **1 hour** due to 5 mistakes. Take a break!")
-                except:
-                    pass
-            
             return
         
-        expected = last_number + 1
+        if result.outcome == COOLDOWN:
+            scheduler.delete_message(message)
+            scheduler.send_message(
+                message.channel,
+                PRIORITY_COSMETIC,
+                key=f"counting_notice:{message.author.id}",
+                ttl=3,
+                content=f"{message.author.mention} ⏱️ Please wait **{int(result.remaining)}** seconds before typing again.",
+                delete_after=3
+            )
+            return
         
-        if number != expected:
-            await message.delete()
-            mistakes = db.increment_counting_mistakes(message.author.id)
-            
-            remaining_mistakes = self.max_mistakes - mistakes
+        if result.outcome == NOT_NUMBER:
+            scheduler.delete_message(message)
+            scheduler.send_message(
+                message.channel,
+                PRIORITY_COSMETIC,
+                key=f"counting_notice:{message.author.id}",
+                ttl=3,
+                content=f"{message.author.mention} ❌ Numbers only!",
+                delete_after=3
+            )
+            return
+        
+        if not result.accepted:
+            scheduler.delete_message(message)
+            remaining_mistakes = self.max_mistakes - result.mistakes
             
-            try:
-                await message.channel.send(
-                    f"{message.author.mention} ❌ Wrong number! Expected **{expected}**. **{remaining_mistakes}** mistakes remaining.",
-                    delete_after=5
-                )
-            except:
-                pass
+            if result.outcome == DOUBLE_COUNT:
+                notice = f"{message.author.mention} ❌ You cannot count twice in a row! **{remaining_mistakes}** mistakes remaining before lockout."
+            else:
+                notice = f"{message.author.mention} ❌ Wrong number! Expected **{result.expected}**. **{remaining_mistakes}** mistakes remaining."
+            scheduler.send_message(
+                message.channel,
+                PRIORITY_COSMETIC,
+                key=f"counting_notice:{message.author.id}",
+                ttl=5,
+                content=notice,
+                delete_after=5
+            )
             
-            if mistakes >= self.max_mistakes:
-                lockout_until = datetime.utcnow() + timedelta(seconds=self.lockout_duration)
-                db.set_counting_lockout(message.author.id, lockout_until.isoformat())
-                db.reset_counting_mistakes(message.author.id)
+            if result.locked_out:
                 try:
                     await message.author.send("🔒 You have been locked from counting for **1 hour** due to 5 mistakes. Take a break!")
                 except:
@@ -124,20 +118,11 @@ class Counting(commands.Cog):
         
         await message.add_reaction("✅")
         
-        db.update_counting_state(message.guild.id, number, message.author.id)
-        db.increment_count_contribution(message.author.id)
-        
-        cooldown_until = datetime.utcnow() + timedelta(seconds=self.cooldown_seconds)
-        db.set_counting_cooldown(message.author.id, cooldown_until.isoformat())
-        
-        if number == self.celebration_number:
-            await self.celebrate_milestone(message.channel, db)
-            db.update_counting_state(message.guild.id, 0, None)
-            db.reset_counting_contributions()
+        if result.outcome == MILESTONE:
+            self.state.checkpoint()
+            await self.celebrate_milestone(message.channel, result.leaderboard)
     
-    async def celebrate_milestone(self, channel, db):
-        leaderboard = db.get_counting_leaderboard(limit=10)
-        
+    async def celebrate_milestone(self, channel, leaderboard):
         embed = discord.Embed(
             title="🎉 CONGRATULATIONS! 🎉",
             description=f"The server has reached **{self.celebration_number}**!",
@@ -169,9 +154,8 @@ class Counting(commands.Cog):
     @commands.hybrid_command(name='resetmistakes', description='Reset a user\'s counting mistakes (Moderator+)')
     @commands.has_permissions(moderate_members=True)
     async def reset_mistakes_cmd(self, ctx, member: discord.Member):
-        db = Database()
-        db.reset_counting_mistakes(member.id)
-        db.clear_counting_lockout(member.id)
+        self.db.reset_counting_mistakes(member.id)
+        self.db.clear_counting_lockout(member.id)
         
         embed = discord.Embed(
             title="✅ Mistakes Reset",
@@ -0,0 +1,43 @@
+import discord
+from discord.ext import commands
+from datetime import datetime
+from message_pipeline import get_pipeline, OVERHEAD_BUDGET_NS
+
+class Dispatch(commands.Cog):
+    """The only on_message listener; cogs register handlers on the bot's MessagePipeline"""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.pipeline = get_pipeline(bot)
+
+    @commands.Cog.listener()
+    async def on_message(self, message):
+        await self.pipeline.dispatch(message)
+
+    @commands.hybrid_command(name='pipelinestats', description='Show message pipeline timings')
+    @commands.has_permissions(administrator=True)
+    async def pipelinestats(self, ctx):
+        stats = self.pipeline.stats
+        messages = stats['messages'] or 1
+
+        embed = discord.Embed(
+            title="📨 Message Pipeline",
+            color=discord.Color.blue(),
+            timestamp=datetime.utcnow()
+        )
+        embed.add_field(name="Messages", value=f"{stats['messages']:,}", inline=True)
+        embed.add_field(name="Avg Overhead", value=f"{stats['overhead_ns'] / messages / 1000:.1f} µs", inline=True)
+        embed.add_field(name="Max Overhead", value=f"{stats['max_overhead_ns'] / 1000:.1f} µs", inline=True)
+        embed.add_field(name=f"Over {OVERHEAD_BUDGET_NS // 1000} µs", value=str(stats['over_budget']), inline=True)
+
+        lines = []
+        for route in sorted(self.pipeline.routes.values(), key=lambda route: route.order):
+            calls, total_ns, errors = self.pipeline.handler_stats[route.name]
+            average = total_ns / calls / 1000 if calls else 0
+            lines.append(f"`{route.order:>3}` **{route.name}** - {calls:,} calls, {average:.0f} µs avg, {errors} errors")
+        embed.add_field(name="Handlers", value="\n".join(lines)[:1024] or "None registered", inline=False)
+
+        await ctx.send(embed=embed, ephemeral=True)
+
+async def setup(bot):
+    await bot.add_cog(Dispatch(bot))
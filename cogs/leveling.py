@@ -1,13 +1,26 @@
+import asyncio
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from database import Database
 from datetime import datetime, timedelta
+from message_pipeline import get_pipeline
+from xp_engine import total_xp_for_level
+from write_scheduler import get_scheduler
+from milestone_sync import resolve_milestone_roles, plan_changes, MilestoneSyncJob
 
 class Leveling(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.db = Database()
+        self.config = self.db.config.subscribe(self.on_config_change)
+        get_pipeline(bot).register(
+            'leveling', self.handle_message, order=60,
+            exclude=lambda config: (*config.excluded_xp_channels, config.counting_channel)
+        )
         self.level_channel_id = 1409304816718709006
+        self.xp_cooldown = 60
+        self.db.xp.subscribe(self.on_level_up)
+        self.flush_xp.start()
 
         self.milestone_roles = {
             5: {'name': 'Active Member', 'id': None},
@@ -15,83 +28,215 @@ class Leveling(commands.Cog):
             25: {'name': 'Veteran', 'id': None},
             50: {'name': 'Legend', 'id': None}
         }
+        self.milestone_role_cache = {}  # guild_id -> {level: role}
+        self.sync_jobs = {}             # guild_id -> MilestoneSyncJob
+
+    def cog_unload(self):
+        self.db.config.unsubscribe(self.on_config_change)
+        get_pipeline(self.bot).unregister('leveling')
+        self.db.xp.unsubscribe(self.on_level_up)
+        self.flush_xp.cancel()
+        self.db.xp.flush()
+        for job in self.sync_jobs.values():
+            if job.task:
+                job.task.cancel()
+        self.db.save()
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        if message.author.bot:
-            return
-
-        if not message.guild:
-            return
+    def on_config_change(self, config):
+        self.config = config
 
-        excluded_channels = self.db.get_config('excluded_xp_channels') or []
-        if message.channel.id in excluded_channels:
-            return
+    @tasks.loop(seconds=30)
+    async def flush_xp(self):
+        """XP is awarded in memory; persist the changed members in one save"""
+        try:
+            self.db.xp.flush()
+        except Exception as e:
+            print(f"XP flush error: {e}")
 
-        counting_channel = self.db.get_config('counting_channel')
-        if message.channel.id == counting_channel:
+    async def handle_message(self, message, features):
+        if not self.db.xp.ready(message.guild.id, message.author.id):
             return
 
-        user_data = self.db.get_user_level(message.guild.id, message.author.id)
+        xp_gain = 15
 
-        last_message = user_data.get('last_message')
-        if last_message:
-            last_time = datetime.fromisoformat(last_message)
-            if datetime.utcnow() - last_time < timedelta(seconds=60):
-                return
+        if features.config.verified_role in features.role_ids:
+            xp_gain += 5
 
-        user_data['last_message'] = datetime.utcnow().isoformat()
+        # Active conversation: three or more people talking in the last five minutes
+        if features.speakers >= 3:
+            xp_gain += 10
 
-        xp_gain = 15
+        self.db.xp.award(
+            message.guild.id, message.author.id, xp_gain,
+            member=message.author, cooldown=self.xp_cooldown
+        )
 
-        verified_role_id = self.db.get_config('verified_role')
-        if verified_role_id:
-            member_role_ids = [role.id for role in message.author.roles]
-            if verified_role_id in member_role_ids:
-                xp_gain += 5
+    async def on_level_up(self, event):
+        """Announcement, milestone roles and rewards for every level-up, from messages or voice"""
+        member = event.member
+        guild = self.bot.get_guild(event.guild_id)
+        if not member or not guild:
+            return
 
-        if len(set([m.id for m in message.channel.members if not m.bot])) >= 3:
-            xp_gain += 10
+        level_channel = guild.get_channel(self.level_channel_id)
+        if level_channel:
+            suffix = " (Voice Activity)" if event.source == 'voice' else ""
+            try:
+                await level_channel.send(
+                    f"{member.mention} is now **Level {event.new_level}**! 🎉{suffix}"
+                )
+            except:
+                pass
 
-        leveled_up, new_level = self.db.add_xp(message.guild.id, message.author.id, xp_gain)
+        for level in self.milestone_roles:
+            if event.crossed(level):
+                await self.grant_milestone_role(guild, member, level)
 
-        if leveled_up:
-            level_channel = message.guild.get_channel(self.level_channel_id)
-            if level_channel:
+        if event.crossed(5):
+            reward_coins = 500
+            if self.config.economy_enabled:
+                self.db.add_balance(event.guild_id, member.id, reward_coins)
                 try:
-                    await level_channel.send(
-                        f"{message.author.mention} is now **Level {new_level}**! 🎉"
-                    )
+                    await member.send(f"🎉 You reached Level 5! You earned **{reward_coins}** Spirit Coins!")
                 except:
                     pass
 
-            if new_level in self.milestone_roles:
-                await self.grant_milestone_role(message.guild, message.author, new_level)
+    async def grant_milestone_role(self, guild, member, level):
+        role = self.milestone_roles_for(guild).get(level)
 
-            if new_level == 5:
-                reward_coins = 500
-                if self.db.get_config('economy_enabled'):
-                    self.db.add_balance(message.guild.id, message.author.id, reward_coins)
-                    try:
-                        await message.author.send(f"🎉 You reached Level 5! You earned **{reward_coins}** Spirit Coins!")
-                    except:
-                        pass
+        if role:
+            try:
+                await member.add_roles(role, reason=f"Reached level {level}")
+            except:
+                pass
 
-        self.db.track_daily_message(message.guild.id)
+    def milestone_roles_for(self, guild):
+        """{level: role} for the guild, resolved by name once and cached until its roles change"""
+        roles = self.milestone_role_cache.get(guild.id)
+        if roles is None:
+            roles = self.milestone_role_cache[guild.id] = resolve_milestone_roles(guild, self.milestone_roles)
+        return roles
 
-    async def grant_milestone_role(self, guild, member, level):
-        milestone_info = self.milestone_roles.get(level)
-        if not milestone_info:
+    @commands.Cog.listener()
+    async def on_guild_role_create(self, role):
+        self.milestone_role_cache.pop(role.guild.id, None)
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role):
+        self.milestone_role_cache.pop(role.guild.id, None)
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before, after):
+        if before.name != after.name:
+            self.milestone_role_cache.pop(after.guild.id, None)
+
+    def start_milestone_sync(self, guild, remove_unearned=False):
+        """Plan and start a milestone role sync, resuming the guild's unfinished job if there is one"""
+        state = self.db.get_milestone_sync_state(guild.id)
+        if state.get('remaining'):
+            member_ids = state['remaining']
+            remove_unearned = state.get('remove_unearned', False)
+        else:
+            state.clear()
+            member_ids = None
+
+        self.db.xp.flush(save=False)
+        changes = plan_changes(
+            guild, self.db.xp.guild_levels(guild.id), self.milestone_roles_for(guild),
+            member_ids=member_ids, remove_unearned=remove_unearned
+        )
+        job = MilestoneSyncJob(guild, changes, get_scheduler(self.bot), state, self.db.save, remove_unearned)
+        self.db.save()
+        self.sync_jobs[guild.id] = job
+        job.start()
+        return job
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        for guild_id in self.db.get_unfinished_milestone_syncs():
+            guild = self.bot.get_guild(guild_id)
+            job = self.sync_jobs.get(guild_id)
+            if guild and not (job and job.running):
+                job = self.start_milestone_sync(guild)
+                print(f"Resumed milestone role sync in {guild.name}: {job.remaining} members left")
+
+    def milestone_sync_embed(self, job):
+        progress = job.progress()
+        finished = not job.running and not progress['remaining']
+        embed = discord.Embed(
+            title="✅ Milestone Roles Synced" if finished else "🔄 Syncing Milestone Roles",
+            color=discord.Color.green() if finished else discord.Color.blue(),
+            timestamp=datetime.utcnow()
+        )
+        bar = int(progress['percent'] / 5)
+        embed.add_field(name="Progress", value=f"`[{'█' * bar}{'░' * (20 - bar)}] {progress['percent']}%`", inline=False)
+        embed.add_field(name="Updated", value=str(progress['done']), inline=True)
+        embed.add_field(name="Failed", value=str(progress['failed']), inline=True)
+        embed.add_field(name="Skipped", value=str(progress['skipped']), inline=True)
+        embed.add_field(name="Remaining", value=str(progress['remaining']), inline=True)
+        if progress['eta'] and not finished:
+            embed.add_field(name="ETA", value=str(timedelta(seconds=int(progress['eta']))), inline=True)
+        return embed
+
+    @commands.hybrid_command(name='syncmilestones', description='Give every member the milestone roles their level has earned')
+    @commands.has_permissions(administrator=True)
+    async def syncmilestones(self, ctx, remove_unearned: bool = False):
+        job = self.sync_jobs.get(ctx.guild.id)
+        if job and job.running:
+            await ctx.send(embed=self.milestone_sync_embed(job), ephemeral=True)
             return
 
-        role = discord.utils.get(guild.roles, name=milestone_info['name'])
+        if not self.milestone_roles_for(ctx.guild):
+            await ctx.send("❌ None of the milestone roles exist in this server!", ephemeral=True)
+            return
 
-        if role:
+        job = self.start_milestone_sync(ctx.guild, remove_unearned)
+        message = await ctx.send(embed=self.milestone_sync_embed(job))
+        while job.running:
+            await asyncio.wait([job.task], timeout=10)
             try:
-                await member.add_roles(role, reason=f"Reached level {level}")
+                await message.edit(embed=self.milestone_sync_embed(job))
             except:
                 pass
 
+    @commands.hybrid_command(name='levelstats', description='Show how levels, voice time and coins are spread across the server')
+    @commands.has_permissions(administrator=True)
+    async def levelstats(self, ctx):
+        self.db.xp.flush(save=False)
+        table = self.db.stats.guilds.get(ctx.guild.id)
+        if table is None or not len(table):
+            await ctx.send("No member stats recorded yet!", ephemeral=True)
+            return
+
+        embed = discord.Embed(
+            title="📈 Level Statistics",
+            description=f"**{len(table):,}** members tracked",
+            color=discord.Color.blue(),
+            timestamp=datetime.utcnow()
+        )
+
+        levels = table.percentiles('level')
+        embed.add_field(
+            name="Level Percentiles",
+            value=f"Median **{levels[50]}** · 90th **{levels[90]}** · 99th **{levels[99]}**",
+            inline=False
+        )
+
+        edges = [1, *sorted(self.milestone_roles)]
+        counts = table.histogram('level', edges)
+        lines = [
+            f"Level {low}-{high - 1}: **{count:,}**" if high else f"Level {low}+: **{count:,}**"
+            for low, high, count in zip(edges, [*edges[1:], None], counts)
+        ]
+        embed.add_field(name="Level Distribution", value="\n".join(lines), inline=False)
+
+        voice_minutes = table.total('voice_minutes')
+        embed.add_field(name="Voice Time", value=f"{voice_minutes // 60:,}h across {table.count('voice_minutes'):,} members", inline=True)
+        if self.config.economy_enabled:
+            embed.add_field(name="Spirit Coins", value=f"{table.total('balance'):,} SC in circulation", inline=True)
+
+        await ctx.send(embed=embed, ephemeral=True)
+
     # DISABLED - /serverinfo command
     # @commands.hybrid_command(name='serverinfo', description='Get server information')
     async def server_info_disabled(self, ctx):
@@ -132,15 +277,7 @@ class Leveling(commands.Cog):
         xp = user_data.get('xp', 0)
         xp_needed = self.db.get_xp_for_level(level)
 
-        all_users = {}
-        for key, data in self.db.data.get('levels', {}).items():
-            if key.startswith(f"{ctx.guild.id}:"):
-                user_id = int(key.split(':')[1])
-                total_xp = (data['level'] - 1) * 1000 + data['xp']
-                all_users[user_id] = total_xp
-
-        sorted_users = sorted(all_users.items(), key=lambda x: x[1], reverse=True)
-        rank = next((i + 1 for i, (uid, _) in enumerate(sorted_users) if uid == member.id), 0)
+        rank = self.db.leaderboards.get('xp', ctx.guild.id).rank(member.id) or 0
 
         embed = discord.Embed(
             title=f"📊 Rank for {member.display_name}",
@@ -167,18 +304,10 @@ class Leveling(commands.Cog):
     # DISABLED - /leaderboard command
     # @commands.hybrid_command(name='leaderboard', description='Show the top 10 server levels')
     async def leaderboard_disabled(self, ctx):
-        all_users = {}
-        for key, data in self.db.data.get('levels', {}).items():
-            if key.startswith(f"{ctx.guild.id}:"):
-                user_id = int(key.split(':')[1])
-                total_xp = (data['level'] - 1) * 1000 + data.get('xp', 0)
-                all_users[user_id] = {
-                    'level': data.get('level', 1),
-                    'xp': data.get('xp', 0),
-                    'total_xp': total_xp
-                }
-
-        sorted_users = sorted(all_users.items(), key=lambda x: x[1]['total_xp'], reverse=True)[:10]
+        sorted_users = []
+        for _, user_id, _ in self.db.leaderboards.get('xp', ctx.guild.id).top(10):
+            record = self.db.xp.get(ctx.guild.id, user_id)
+            sorted_users.append((user_id, {'level': record.level, 'xp': record.xp}))
 
         if not sorted_users:
             await ctx.send("No users have earned XP yet!", ephemeral=True)
@@ -204,19 +333,9 @@ class Leveling(commands.Cog):
     # @commands.hybrid_command(name='setxp', description='Set a user\'s XP (Admin only)')
     # @commands.has_permissions(administrator=True)
     async def set_xp_disabled(self, ctx, member: discord.Member, amount: int):
-        user_data = self.db.get_user_level(ctx.guild.id, member.id)
-        old_level = user_data.get('level', 1)
-
-        user_data['xp'] = amount
-        self.db.save()
-
-        xp_needed = self.db.get_xp_for_level(old_level)
-        while user_data['xp'] >= xp_needed:
-            user_data['level'] += 1
-            user_data['xp'] -= xp_needed
-            xp_needed = self.db.get_xp_for_level(user_data['level'])
-
-        self.db.save()
+        record = self.db.xp.get(ctx.guild.id, member.id)
+        self.db.xp.set_total(ctx.guild.id, member.id, total_xp_for_level(record.level) + amount)
+        self.db.xp.flush()
 
         embed = discord.Embed(
             title="✅ XP Updated",
@@ -230,10 +349,8 @@ class Leveling(commands.Cog):
     # @commands.hybrid_command(name='resetlevel', description='Reset a user\'s level (Admin only)')
     # @commands.has_permissions(administrator=True)
     async def reset_level_disabled(self, ctx, member: discord.Member):
-        user_data = self.db.get_user_level(ctx.guild.id, member.id)
-        user_data['level'] = 1
-        user_data['xp'] = 0
-        self.db.save()
+        self.db.xp.set_total(ctx.guild.id, member.id, 0)
+        self.db.xp.flush()
 
         embed = discord.Embed(
             title="✅ Level Reset",
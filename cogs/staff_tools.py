@@ -1,8 +1,21 @@
+import asyncio
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from database import Database
 from datetime import datetime, timedelta
 from collections import defaultdict
+from message_pipeline import get_pipeline
+
+MOD_ROLES = frozenset([
+    1383270277147787294,
+    1409873374288674816,
+    1383175157186564286,
+    1409874361615388746,
+    1388254732543590492,
+    1409874452866400346,
+    1411739899639496704,
+    1383270529430978590
+])
 
 class StaffTools(commands.Cog):
     def __init__(self, bot):
@@ -10,24 +23,25 @@ class StaffTools(commands.Cog):
         self.db = Database()
         self.message_tracker = defaultdict(int)
         self.mod_action_tracker = defaultdict(int)
+        get_pipeline(bot).register('staff_activity', self.handle_message, order=50)
+        self.maintain_search.start()
     
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        if message.author.bot or not message.guild:
-            return
-        
-        mod_roles = [
-            1383270277147787294,
-            1409873374288674816,
-            1383175157186564286,
-            1409874361615388746,
-            1388254732543590492,
-            1409874452866400346,
-            1411739899639496704,
-            1383270529430978590
-        ]
-        
-        if any(role.id in mod_roles for role in message.author.roles):
+    def cog_unload(self):
+        get_pipeline(self.bot).unregister('staff_activity')
+        self.maintain_search.cancel()
+    
+    @tasks.loop(hours=6)
+    async def maintain_search(self):
+        """Build, load and compact the search index in a worker thread; the first run is the startup load"""
+        try:
+            done = await asyncio.to_thread(self.db.prepare_search)
+            if done:
+                print(f"Search index {done}: {len(self.db.search_index)} documents")
+        except Exception as e:
+            print(f"Search index maintenance error: {e}")
+    
+    async def handle_message(self, message, features):
+        if not MOD_ROLES.isdisjoint(features.role_ids):
             self.message_tracker[message.author.id] += 1
     
     # DISABLED - /note command
@@ -80,6 +94,34 @@ class StaffTools(commands.Cog):
         
         await ctx.send(embed=embed, ephemeral=True)
     
+    @commands.hybrid_command(name='search', description='Search tickets, cases, notes and bug reports (Staff only)')
+    @commands.has_permissions(moderate_members=True)
+    async def search(self, ctx, *, query: str):
+        """Full-text search over archived tickets and moderation history"""
+        # A search also replays any new journal entries, so it stays off the event loop
+        found = await asyncio.to_thread(self.db.search, query, None, 8)
+        
+        if not found['results']:
+            await ctx.send(f"No results found for `{query}`", ephemeral=True)
+            return
+        
+        embed = discord.Embed(
+            title=f"🔎 Search: {query[:200]}",
+            color=discord.Color.blue(),
+            timestamp=datetime.utcnow()
+        )
+        
+        for result in found['results']:
+            embed.add_field(
+                name=f"[{result['kind'].title()}] {result['title']}"[:256],
+                value=(result['snippet'] or "*No preview available*")[:1024],
+                inline=False
+            )
+        
+        embed.set_footer(text=f"{found['total']} matches • {found['took_ms']}ms")
+        
+        await ctx.send(embed=embed, ephemeral=True)
+    
     # DISABLED - /case command
     # @commands.hybrid_command(name='case', description='View details of a moderation case')
     # @commands.has_permissions(moderate_members=True)
@@ -1,6 +1,7 @@
 import discord
 from discord.ext import commands, tasks
 from config import Config
+from write_scheduler import get_scheduler
 
 class Stats(commands.Cog):
     def __init__(self, bot):
@@ -32,22 +33,20 @@ class Stats(commands.Cog):
             bots = [m for m in guild.members if m.bot]
             total_members = len(guild.members)
             
-            all_members_channel = guild.get_channel(Config.ALL_MEMBERS_CHANNEL)
-            if all_members_channel:
-                await all_members_channel.edit(name=f"All Members: {total_members}")
-            
-            members_only_channel = guild.get_channel(Config.MEMBERS_ONLY_CHANNEL)
-            if members_only_channel:
-                await members_only_channel.edit(name=f"Members: {len(members)}")
-            
-            bots_channel = guild.get_channel(Config.BOTS_CHANNEL)
-            if bots_channel:
-                await bots_channel.edit(name=f"Bots: {len(bots)}")
-            
             current_goal = self.get_next_goal(total_members)
-            goal_channel = guild.get_channel(Config.GOAL_CHANNEL)
-            if goal_channel:
-                await goal_channel.edit(name=f"Goal: {current_goal}")
+            
+            # Renames are paced per channel and skipped when the name would not change
+            scheduler = get_scheduler(self.bot)
+            channel_names = [
+                (Config.ALL_MEMBERS_CHANNEL, f"All Members: {total_members}"),
+                (Config.MEMBERS_ONLY_CHANNEL, f"Members: {len(members)}"),
+                (Config.BOTS_CHANNEL, f"Bots: {len(bots)}"),
+                (Config.GOAL_CHANNEL, f"Goal: {current_goal}")
+            ]
+            for channel_id, name in channel_names:
+                channel = guild.get_channel(channel_id)
+                if channel:
+                    scheduler.rename_channel(channel, name)
             
             print(f"Stats updated - Total: {total_members}, Members: {len(members)}, Bots: {len(bots)}, Goal: {current_goal}")
         
@@ -2,26 +2,29 @@ import discord
 from discord.ext import commands
 from database import Database
 from datetime import datetime
+from message_pipeline import get_pipeline
 
 class SuggestionsBugs(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.db = Database()
+        self.config = self.db.config.subscribe(self.on_config_change)
+        get_pipeline(bot).register(
+            'suggestions_bugs', self.handle_message, order=30,
+            channels=lambda config: (config.suggestion_channel, config.bug_channel)
+        )
     
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        if message.author.bot:
-            return
-        
-        if not message.guild:
-            return
-        
-        suggestion_channel_id = self.db.get_config('suggestion_channel')
-        bug_channel_id = self.db.get_config('bug_channel')
-        
-        if message.channel.id == suggestion_channel_id:
+    def cog_unload(self):
+        self.db.config.unsubscribe(self.on_config_change)
+        get_pipeline(self.bot).unregister('suggestions_bugs')
+    
+    def on_config_change(self, config):
+        self.config = config
+    
+    async def handle_message(self, message, features):
+        if message.channel.id == self.config.suggestion_channel:
             await self.handle_suggestion(message)
-        elif message.channel.id == bug_channel_id:
+        elif message.channel.id == self.config.bug_channel:
             await self.handle_bug_report(message)
     
     async def handle_suggestion(self, message):
@@ -6,14 +6,16 @@ import discord
 import os
 from datetime import datetime
 from ticket_ai_config import TicketAIConfig
+from transcripts import TranscriptRecorder, transcript_header
 import aiohttp
 
 
 class TicketAIManager:
     """Manages AI behavior and responses in tickets"""
     
-    def __init__(self, db):
+    def __init__(self, db, transcripts=None):
         self.db = db
+        self.transcripts = transcripts or TranscriptRecorder()
         self.api_key = os.getenv('HUGGINGFACE_API_KEY')
         self.api_url = "https://router.huggingface.co/v1/chat/completions"
         self.config = TicketAIConfig
@@ -220,7 +222,7 @@ REMEMBER:
         
         messages = [{"role": "system", "content": system_prompt}]
         
-        for msg in ticket_data.get('messages', [])[-10:]:
+        for msg in self.db.get_ticket_messages(channel.id, limit=10):
             messages.append({
                 "role": msg.get('role', 'user'),
                 "content": msg.get('content', '')
@@ -253,14 +255,7 @@ REMEMBER:
                         ai_response = data['choices'][0]['message']['content']
                         
                         # Save AI response to history
-                        if 'messages' not in ticket_data:
-                            ticket_data['messages'] = []
-                        
-                        ticket_data['messages'].append({
-                            'role': 'assistant',
-                            'content': ai_response,
-                            'timestamp': datetime.utcnow().isoformat()
-                        })
+                        self.db.add_ticket_message(channel.id, ticket_data, 'assistant', ai_response)
                         
                         return ai_response
                     else:
@@ -271,7 +266,7 @@ REMEMBER:
             print(f"AI response error: {e}")
             return None
     
-    def check_message_intent(self, message_content, ticket_data):
+    def check_message_intent(self, message_content, ticket_data, intents=None):
         """Check message for special intents (stop, human request, disrespect, close request, etc.)"""
         
         result = {
@@ -280,44 +275,38 @@ REMEMBER:
             'should_respond': True
         }
         
-        msg_lower = message_content.lower().strip()
+        if intents is None:
+            intents = self.config.classify(message_content)
+        
+        # Precedence between intents is declared in TicketAIConfig.INTENT_PRECEDENCE
+        intent = self.config.primary_intent(intents)
         
-        # Check for close request
-        if self.config.is_close_request(message_content):
+        if intent == 'close_request':
             result['action'] = 'close_request'
             result['should_respond'] = True
-            return result
         
-        # Check for stop command
-        if self.config.is_stop_command(message_content):
+        elif intent == 'stop':
             result['action'] = 'stop'
             result['response'] = self.config.MESSAGES['stopped']
             result['should_respond'] = False
-            return result
         
-        # Check for resume command
-        if self.config.is_resume_command(message_content):
+        elif intent == 'resume':
             result['action'] = 'resume'
             result['should_respond'] = True
-            return result
         
-        # Check for human support request
-        if self.config.is_human_request(message_content):
+        elif intent == 'human_request':
             result['action'] = 'human_request'
             result['response'] = self.config.MESSAGES['human_handoff']
             result['should_respond'] = False
-            return result
         
-        # Check for disallowed topics
-        redirect = self.config.check_disallowed_topic(message_content)
-        if redirect:
+        elif intent == 'disallowed_topic':
             result['action'] = 'disallowed_topic'
-            result['response'] = self.config.MESSAGES['topic_disallowed'].format(redirect=redirect)
+            result['response'] = self.config.MESSAGES['topic_disallowed'].format(
+                redirect=self.config.disallowed_redirect(intents)
+            )
             result['should_respond'] = False
-            return result
         
-        # Check for disrespectful language
-        if self.config.is_disrespectful(message_content):
+        elif intent == 'disrespect':
             warnings_given = ticket_data.get('ai_warnings_given', 0)
             if warnings_given >= self.config.BEHAVIOR['max_warnings']:
                 result['action'] = 'disrespect_escalate'
@@ -328,7 +317,6 @@ REMEMBER:
                 result['response'] = self.config.MESSAGES['disrespect_warning']
                 ticket_data['ai_warnings_given'] = warnings_given + 1
                 result['should_respond'] = True
-            return result
         
         return result
     
@@ -365,6 +353,16 @@ REMEMBER:
         formatted_name = ticket_config['name_format'].format(username=username.lower())
         return formatted_name.replace(" ", "-")[:100]
     
+    def claimed_channel_name(self, username, ticket_type):
+        """Channel name for a ticket claimed by the AI, with a green emoji"""
+        category_titles = {
+            'support': 'support',
+            'cc': 'request',
+            'appeal': 'warning-appeal'
+        }
+        title_word = category_titles.get(ticket_type, ticket_type)
+        return f"《🟢》・{username}-{title_word}"[:100]
+    
     async def claim_ticket(self, bot, channel, ticket_data):
         """Auto-claim the ticket for AI handling"""
         
@@ -395,21 +393,17 @@ REMEMBER:
             creator = await channel.guild.fetch_member(ticket_data.get('creator'))
             username = creator.name.lower().replace(" ", "-").replace("_", "-") if creator else 'user'
             
-            # Adjust title based on category
-            ticket_type = ticket_data.get('type', '')
-            category_titles = {
-                'support': 'support',
-                'cc': 'request',
-                'appeal': 'warning-appeal'
-            }
-            title_word = category_titles.get(ticket_type, ticket_type)
+            new_name = self.claimed_channel_name(username, ticket_data.get('type', ''))
+            topic = f"Ticket by {username} | Status: CLAIMED (AI)"
             
-            # Update channel name to show claimed status with green emoji
-            new_name = f"《🟢》・{username}-{title_word}"[:100]
-            await channel.edit(
-                name=new_name,
-                topic=f"Ticket by {username} | Status: CLAIMED (AI)"
-            )
+            # Pooled and new channels are usually created with these already; renames are limited to 2 per 10 minutes
+            changes = {}
+            if channel.name != new_name:
+                changes['name'] = new_name
+            if channel.topic != topic:
+                changes['topic'] = topic
+            if changes:
+                await channel.edit(**changes)
         except:
             pass
         
@@ -491,17 +485,11 @@ REMEMBER:
         greeting_user_message = f"User opened a {ticket_data.get('label', 'ticket')} with reason: {ticket_reason}\n\nIMPORTANT: The user's specific reason for opening this ticket is: \"{ticket_reason}\"\nYou MUST acknowledge their specific reason and address it directly in your greeting."
         
         try:
-            response = await self.call_ai_api(system_prompt, greeting_user_message, ticket_data.get('messages', []))
+            history = self.db.get_ticket_messages(channel.id, limit=10)
+            response = await self.call_ai_api(system_prompt, greeting_user_message, history)
             
             if response:
-                if 'messages' not in ticket_data:
-                    ticket_data['messages'] = []
-                
-                ticket_data['messages'].append({
-                    'role': 'assistant',
-                    'content': response,
-                    'timestamp': datetime.utcnow().isoformat()
-                })
+                self.db.add_ticket_message(channel.id, ticket_data, 'assistant', response)
                 
                 self.db.save_ticket_data(channel.id, ticket_data)
                 
@@ -519,34 +507,10 @@ REMEMBER:
         """Close the ticket and send transcript"""
         import io
         
-        # Generate transcript
-        transcript_lines = []
-        transcript_lines.append(f"Ticket Transcript - {channel.name}")
-        transcript_lines.append(f"Ticket ID: {channel.id}")
-        transcript_lines.append(f"Type: {ticket_data.get('label', 'Unknown')}")
-        transcript_lines.append(f"Creator: <@{ticket_data.get('creator')}>")
-        transcript_lines.append(f"Created: {ticket_data.get('created_at', 'Unknown')}")
-        transcript_lines.append(f"Closed by: {closer.name} ({closer.id})")
-        transcript_lines.append(f"Close Reason: {close_reason}")
-        transcript_lines.append("=" * 80)
-        transcript_lines.append("")
-        
-        try:
-            async for message in channel.history(limit=500, oldest_first=True):
-                timestamp = message.created_at.strftime("%Y-%m-%d %H:%M:%S")
-                transcript_lines.append(f"[{timestamp}] {message.author.name}: {message.content}")
-                
-                if message.embeds:
-                    for embed in message.embeds:
-                        transcript_lines.append(f"  [Embed: {embed.title or 'No title'}]")
-                
-                if message.attachments:
-                    for attachment in message.attachments:
-                        transcript_lines.append(f"  [Attachment: {attachment.filename} - {attachment.url}]")
-        except:
-            transcript_lines.append("[Error fetching message history]")
-        
-        transcript = "\n".join(transcript_lines)
+        # Render the transcript captured while the ticket was open
+        transcript = await self.transcripts.build(
+            channel, transcript_header(channel, ticket_data, closer, close_reason)
+        )
         
         # Send transcript to category-specific channel (ticket logs channel)
         ticket_type = ticket_data.get('type', 'unknown')
@@ -577,6 +541,7 @@ REMEMBER:
         ticket_data['closed_by'] = closer.id
         ticket_data['close_reason'] = close_reason
         self.db.save_ticket_data(channel.id, ticket_data)
+        self.db.archive_ticket(channel.id, transcript=transcript)
         
         # Remove from open tickets
         creator_id = ticket_data.get('creator')
@@ -588,6 +553,7 @@ REMEMBER:
         
         # Delete the channel
         await channel.delete(reason=f"Ticket closed by {closer.name}")
+        self.transcripts.discard(channel.id)
     
     async def log_ticket_closure(self, bot, ticket_data, closer, close_reason, resolved=True):
         """Log ticket closure to the ticket logs channel"""
@@ -604,7 +570,7 @@ REMEMBER:
         created_at = ticket_data.get('created_at', 'Unknown')
         
         # Create summary from messages
-        message_count = len(ticket_data.get('messages', []))
+        message_count = ticket_data.get('message_count', 0)
         summary = f"{message_count} messages exchanged"
         
         embed = discord.Embed(
@@ -641,10 +607,13 @@ REMEMBER:
                 await channel.send(self.config.MESSAGES['another_user_joined'])
             return (False, None)
         
+        # Classify the message once for every keyword rule
+        intents = self.config.classify(message.content)
+        
         # Check if AI is currently stopped/paused
         if ticket_data.get('ai_stopped', False):
             # Check if user wants to resume
-            if self.config.is_resume_command(message.content):
+            if 'resume' in intents:
                 ticket_data['ai_stopped'] = False
                 ticket_data['ai_paused_other_user'] = False
                 self.db.save_ticket_data(channel.id, ticket_data)
@@ -655,7 +624,7 @@ REMEMBER:
                 return (True, None)  # Still save message for history
         
         # Check message intent (stop commands, human requests, disrespect, close request, etc.)
-        intent = self.check_message_intent(message.content, ticket_data)
+        intent = self.check_message_intent(message.content, ticket_data, intents)
         
         # Handle close request - Mark for closure and let AI respond naturally
         if intent['action'] == 'close_request':
@@ -696,16 +665,11 @@ REMEMBER:
         # Normal AI response
         if self.should_ai_respond_to_message(message, ticket_data):
             # Save user message to history
-            if 'messages' not in ticket_data:
-                ticket_data['messages'] = []
-            
-            ticket_data['messages'].append({
-                'role': 'user',
-                'content': message.content,
-                'author': str(message.author),
-                'author_id': message.author.id,
-                'timestamp': datetime.utcnow().isoformat()
-            })
+            self.db.add_ticket_message(
+                channel.id, ticket_data, 'user', message.content,
+                author=str(message.author),
+                author_id=message.author.id
+            )
             
             # Generate AI response
             ai_response = await self.send_ai_message(channel, ticket_data)
@@ -2,13 +2,17 @@ import discord
 from discord.ext import commands, tasks
 from discord import app_commands
 from discord.ui import View, Select, Button, Modal, TextInput
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from database import Database
 import io
 import asyncio
 import aiohttp
 from ticket_ai_config import TicketAIConfig
 from cogs.tickets_ai_enhanced import TicketAIManager
+from transcripts import TranscriptRecorder, transcript_header
+from scheduler import DeadlineScheduler
+from ticket_pool import TicketChannelPool
+from message_pipeline import get_pipeline
 
 class TicketSelect(Select):
     def __init__(self):
@@ -129,12 +133,27 @@ class TicketReasonModal(Modal):
                 )
                 return
 
-            ticket_channel = await interaction.guild.create_text_channel(
-                name=channel_name,
-                category=category,
-                overwrites=overwrites,
-                topic=f"Ticket by {interaction.user.name} | Status: UNCLAIMED"
-            )
+            topic = f"Ticket by {interaction.user.name} | Status: UNCLAIMED"
+            cog = interaction.client.get_cog('Tickets')
+            # AI-claimed tickets get their claimed name up front so claiming doesn't spend a second rename
+            allowed_categories = [1436498409153626213, 1436498445216256031, 1436498528544227428]
+            ai_claim = cog and db.get_ai_ops_status() and self.category_id in allowed_categories
+            if ai_claim:
+                username = interaction.user.name.lower().replace(" ", "-").replace("_", "-")
+                channel_name = cog.ai_manager.claimed_channel_name(username, self.ticket_type)
+                topic = f"Ticket by {username} | Status: CLAIMED (AI)"
+            ticket_channel = cog.pool.claim(interaction.guild, self.category_id) if cog else None
+            if ticket_channel:
+                # Overwrites, name and topic go out in a single channel edit
+                ticket_channel = await ticket_channel.edit(name=channel_name, overwrites=overwrites, topic=topic) or ticket_channel
+                cog.request_pool_refill()
+            else:
+                ticket_channel = await interaction.guild.create_text_channel(
+                    name=channel_name,
+                    category=category,
+                    overwrites=overwrites,
+                    topic=topic
+                )
 
             # Save ticket data BEFORE sending embed
             ticket_data = {
@@ -149,14 +168,12 @@ class TicketReasonModal(Modal):
                 'reason': self.reason_input.value,
                 'embed_message_id': None,
                 'ai_active': db.get_ai_ops_status(),
-                'messages': []
+                'message_count': 0
             }
-            db.save_ticket_data(ticket_channel.id, ticket_data)
-
             if 'open_tickets' not in db.data:
                 db.data['open_tickets'] = {}
             db.data['open_tickets'][existing_key] = ticket_channel.id
-            db.save()
+            db.save_ticket_data(ticket_channel.id, ticket_data)
 
             embed = discord.Embed(
                 title=f"{self.ticket_label}",
@@ -171,23 +188,27 @@ class TicketReasonModal(Modal):
             
             bot_id = 1436208461112148060
             ping_message = f"{interaction.user.mention} <@{bot_id}>"
-            await ticket_channel.send(ping_message, delete_after=1)
             
-            ticket_message = await ticket_channel.send(embed=embed, view=view)
+            async def post_ticket_messages():
+                # The ping must land before the embed, so these two stay sequential
+                await ticket_channel.send(ping_message, delete_after=1)
+                return await ticket_channel.send(embed=embed, view=view)
+            
+            # Only the ephemeral followup is independent of the channel messages
+            ticket_message, _ = await asyncio.gather(
+                post_ticket_messages(),
+                interaction.followup.send(
+                    f"Your ticket has been created: {ticket_channel.mention}",
+                    ephemeral=True
+                )
+            )
 
             # Update ticket data with message ID
             ticket_data['embed_message_id'] = ticket_message.id
             db.save_ticket_data(ticket_channel.id, ticket_data)
-
-            await interaction.followup.send(
-                f"Your ticket has been created: {ticket_channel.mention}",
-                ephemeral=True
-            )
             
             # Trigger AI auto-claim and greeting ONLY for allowed categories
-            allowed_categories = [1436498409153626213, 1436498445216256031, 1436498528544227428]
-            cog = interaction.client.get_cog('Tickets')
-            if cog and db.get_ai_ops_status() and self.category_id in allowed_categories:
+            if ai_claim:
                 await cog.ai_autoclaim_and_greet(ticket_channel, ticket_data)
 
         except Exception as e:
@@ -253,7 +274,7 @@ class ClaimButton(Button):
                 'reason': 'N/A',
                 'embed_message_id': None,
                 'ai_active': False,
-                'messages': []
+                'message_count': 0
             }
             
             for member in interaction.channel.members:
@@ -329,7 +350,7 @@ class UnclaimButton(Button):
                 'reason': 'N/A',
                 'embed_message_id': None,
                 'ai_active': False,
-                'messages': []
+                'message_count': 0
             }
             
             for member in interaction.channel.members:
@@ -383,7 +404,7 @@ class CloseReasonModal(Modal):
                 'reason': 'N/A',
                 'embed_message_id': None,
                 'ai_active': False,
-                'messages': []
+                'message_count': 0
             }
             
             for member in interaction.channel.members:
@@ -400,7 +421,12 @@ class CloseReasonModal(Modal):
         
         await asyncio.sleep(2)
         
-        transcript = await self.generate_transcript(interaction.channel, ticket_data, self.reason_input.value, interaction.user)
+        cog = interaction.client.get_cog('Tickets')
+        transcripts = cog.transcripts if cog else TranscriptRecorder()
+        transcript = await transcripts.build(
+            interaction.channel,
+            transcript_header(interaction.channel, ticket_data, interaction.user, self.reason_input.value)
+        )
         
         transcript_channel_id = db.get_config('transcript_channel')
         if transcript_channel_id:
@@ -422,171 +448,218 @@ class CloseReasonModal(Modal):
                 
                 await transcript_channel.send(embed=transcript_embed, file=transcript_file)
         
+        ticket_data['status'] = 'closed'
+        ticket_data['closed_at'] = datetime.utcnow().isoformat()
+        ticket_data['closed_by'] = interaction.user.id
+        ticket_data['close_reason'] = self.reason_input.value
+        db.save_ticket_data(interaction.channel.id, ticket_data)
+        db.archive_ticket(interaction.channel.id, transcript=transcript)
+        
         existing_key = f"{interaction.guild.id}:{creator_id}:{ticket_data.get('type')}"
         if existing_key in db.data.get('open_tickets', {}):
             del db.data['open_tickets'][existing_key]
             db.save()
         
         await interaction.channel.delete(reason=f"Ticket closed by {interaction.user.name}")
-    
-    async def generate_transcript(self, channel, ticket_data, close_reason, closer):
-        transcript_lines = []
-        transcript_lines.append(f"Ticket Transcript - {channel.name}")
-        transcript_lines.append(f"Ticket ID: {channel.id}")
-        transcript_lines.append(f"Type: {ticket_data.get('label', 'Unknown')}")
-        transcript_lines.append(f"Creator: {ticket_data.get('creator')}")
-        transcript_lines.append(f"Created: {ticket_data.get('created_at', 'Unknown')}")
-        transcript_lines.append(f"Closed by: {closer.name} ({closer.id})")
-        transcript_lines.append(f"Close Reason: {close_reason}")
-        transcript_lines.append("=" * 80)
-        transcript_lines.append("")
-        
-        try:
-            async for message in channel.history(limit=500, oldest_first=True):
-                timestamp = message.created_at.strftime("%Y-%m-%d %H:%M:%S")
-                transcript_lines.append(f"[{timestamp}] {message.author.name}: {message.content}")
-                
-                if message.embeds:
-                    for embed in message.embeds:
-                        transcript_lines.append(f"  [Embed: {embed.title or 'No title'}]")
-                
-                if message.attachments:
-                    for attachment in message.attachments:
-                        transcript_lines.append(f"  [Attachment: {attachment.filename} - {attachment.url}]")
-        except:
-            transcript_lines.append("[Error fetching message history]")
-        
-        return "\n".join(transcript_lines)
+        transcripts.discard(interaction.channel.id)
 
 class Tickets(commands.Cog):
+    INACTIVITY_TIMEOUT = timedelta(hours=24)
+    
     def __init__(self, bot):
         self.bot = bot
         self.db = Database()
-        self.ai_manager = TicketAIManager(self.db)
-        self.check_inactive_tickets.start()
+        self.transcripts = TranscriptRecorder()
+        self.ai_manager = TicketAIManager(self.db, self.transcripts)
+        self.inactivity = DeadlineScheduler(self.auto_close_ticket, concurrency=5, name='ticket inactivity')
+        self.inactivity.start()
+        pipeline = get_pipeline(bot)
+        # Unclaimed pool channels sit in ticket categories but must not be treated as tickets
+        self.pool = TicketChannelPool(on_reserve=pipeline.reserve, on_release=pipeline.release)
+        self.pool_discovered = False
+        self.refill_ticket_pool.start()
+        
+        pipeline.register(
+            'ticket_transcripts', self.record_ticket_message, order=0,
+            categories=lambda config: (config.ticket_categories or {}).values(), include_bots=True
+        )
+        # CRITICAL: AI must ONLY respond in these 3 specific categories
+        # Support: 1436498409153626213, Request CC: 1436498445216256031, Warning Appeal: 1436498528544227428
+        pipeline.register(
+            'ticket_ai', self.handle_ticket_message, order=90,
+            categories=lambda config: (1436498409153626213, 1436498445216256031, 1436498528544227428)
+        )
     
     async def cog_unload(self):
-        self.check_inactive_tickets.cancel()
+        self.inactivity.stop()
+        self.refill_ticket_pool.cancel()
+        pipeline = get_pipeline(self.bot)
+        pipeline.unregister('ticket_transcripts')
+        pipeline.unregister('ticket_ai')
+        for channel_id in list(self.pool.reserved):
+            pipeline.release(channel_id)
+    
+    @tasks.loop(minutes=10)
+    async def refill_ticket_pool(self):
+        """Keep `ticket_pool_size` hidden channels ready in every ticket category (0 disables the pool)"""
+        size = self.db.get_config('ticket_pool_size') or 0
+        category_ids = list(dict.fromkeys((self.db.get_config('ticket_categories') or {}).values()))
+        for guild in self.bot.guilds:
+            if not self.pool_discovered:
+                self.pool.discover(guild, category_ids)
+            try:
+                await self.pool.refill(guild, category_ids, size)
+            except Exception as e:
+                print(f"Error refilling ticket pool: {e}")
+        self.pool_discovered = True
+    
+    @refill_ticket_pool.before_loop
+    async def before_refill_ticket_pool(self):
+        await self.bot.wait_until_ready()
     
-    @tasks.loop(hours=1)
-    async def check_inactive_tickets(self):
-        """Check for inactive tickets and auto-close them after 24h"""
+    def request_pool_refill(self):
+        """Refill right after a claim instead of waiting for the next loop"""
+        if self.pool_discovered:
+            asyncio.create_task(self.refill_ticket_pool())
+    
+    def schedule_inactivity(self, channel_id, ticket_data):
+        """Queue a ticket's auto-close 24h after its latest recorded activity"""
+        candidates = [self.transcripts.last_activity(channel_id)]
+        for field in ('last_message_at', 'created_at'):
+            try:
+                candidates.append(datetime.fromisoformat(ticket_data[field]))
+            except:
+                pass
+        candidates = [c for c in candidates if c]
+        if not candidates:
+            return
+        last_activity = max(candidates)
+        deadline = (last_activity + self.INACTIVITY_TIMEOUT).replace(tzinfo=timezone.utc).timestamp()
+        self.inactivity.schedule(channel_id, deadline)
+    
+    async def auto_close_ticket(self, channel_id):
+        """Auto-close a ticket whose inactivity deadline has passed"""
+        ticket_data = self.db.get_ticket_data(channel_id)
+        if not ticket_data or ticket_data.get('status') == 'closed':
+            return
+        
+        channel = self.bot.get_channel(channel_id)
+        if not channel:
+            return
+        
         try:
-            now = datetime.utcnow()
+            await channel.send(
+                "⚠️ This ticket has been inactive for 24 hours and will now be automatically closed.\n"
+                "If you need further assistance, please open a new ticket."
+            )
             
-            if 'tickets' not in self.db.data or not isinstance(self.db.data['tickets'], dict):
-                return
+            await asyncio.sleep(5)
+            
+            # Update ticket status in the database
+            ticket_data['status'] = 'closed'
+            ticket_data['closed_at'] = datetime.utcnow().isoformat()
+            ticket_data['closed_by'] = self.bot.user.id
+            ticket_data['close_reason'] = 'Auto-closed due to inactivity (24h no reply)'
+            self.db.save_ticket_data(channel_id, ticket_data)
+            
+            # Remove from open_tickets
+            open_ticket_key = f"{channel.guild.id}:{ticket_data.get('creator')}:{ticket_data.get('type')}"
+            if open_ticket_key in self.db.data.get('open_tickets', {}):
+                del self.db.data['open_tickets'][open_ticket_key]
+                self.db.save()
+            
+            # Render the captured transcript before deleting channel
+            closer_user = self.bot.user
+            transcript = await self.transcripts.build(
+                channel,
+                transcript_header(channel, ticket_data, closer_user, 'Auto-closed due to inactivity')
+            )
+            
+            # Send transcript to logs channel
+            logs_channel_id = self.db.get_config('ticket_logs_channel') or TicketAIConfig.CHANNELS.get('ticket_logs')
+            if logs_channel_id:
+                logs_channel = self.bot.get_channel(logs_channel_id)
+                if logs_channel:
+                    transcript_file = discord.File(
+                        fp=io.BytesIO(transcript.encode('utf-8')),
+                        filename=f"ticket-{channel_id}-transcript.txt"
+                    )
+                    await logs_channel.send(
+                        f"Ticket auto-closed: {channel.name} (Inactive for 24h)",
+                        file=transcript_file
+                    )
+            
+            self.db.archive_ticket(channel_id, transcript=transcript)
+            await channel.delete(reason="Auto-closed due to inactivity")
+            self.transcripts.discard(channel_id)
             
-            # Iterate over the tickets dictionary (key=channel_id, value=ticket_data)
-            for channel_id_str, ticket_data in list(self.db.data['tickets'].items()):
-                if ticket_data.get('status') == 'closed':
-                    continue
-                
-                try:
-                    channel_id = int(channel_id_str)
-                except ValueError:
-                    continue
-                
-                messages = ticket_data.get('messages', [])
-                
-                last_message_time = None
-                if messages:
-                    try:
-                        last_msg = messages[-1]
-                        last_message_time = datetime.fromisoformat(last_msg.get('timestamp', ''))
-                    except:
-                        pass
-                
-                if not last_message_time:
-                    created_at = ticket_data.get('created_at')
-                    if created_at:
-                        try:
-                            last_message_time = datetime.fromisoformat(created_at)
-                        except:
-                            continue
-                    else:
-                        continue
-                
-                time_since_last_message = now - last_message_time
-                
-                if time_since_last_message >= timedelta(hours=24):
-                    channel = self.bot.get_channel(channel_id)
-                    if channel:
-                        try:
-                            await channel.send(
-                                "⚠️ This ticket has been inactive for 24 hours and will now be automatically closed.\n"
-                                "If you need further assistance, please open a new ticket."
-                            )
-                            
-                            await asyncio.sleep(5)
-                            
-                            # Update ticket status in the database
-                            ticket_data['status'] = 'closed'
-                            ticket_data['closed_at'] = now.isoformat()
-                            ticket_data['closed_by'] = self.bot.user.id
-                            ticket_data['close_reason'] = 'Auto-closed due to inactivity (24h no reply)'
-                            self.db.save_ticket_data(channel_id, ticket_data)
-                            
-                            # Remove from open_tickets
-                            open_ticket_key = f"{channel.guild.id}:{ticket_data.get('creator')}:{ticket_data.get('type')}"
-                            if open_ticket_key in self.db.data.get('open_tickets', {}):
-                                del self.db.data['open_tickets'][open_ticket_key]
-                                self.db.save()
-                            
-                            # Save transcript before deleting channel
-                            closer_user = self.bot.user
-                            transcript = await self.generate_transcript(channel, ticket_data, 'Auto-closed due to inactivity', closer_user)
-                            
-                            # Send transcript to logs channel
-                            logs_channel_id = self.db.get_config('ticket_logs_channel') or TicketAIConfig.CHANNELS.get('ticket_logs')
-                            if logs_channel_id:
-                                logs_channel = self.bot.get_channel(logs_channel_id)
-                                if logs_channel:
-                                    transcript_file = discord.File(
-                                        fp=io.BytesIO(transcript.encode('utf-8')),
-                                        filename=f"ticket-{channel_id}-transcript.txt"
-                                    )
-                                    await logs_channel.send(
-                                        f"Ticket auto-closed: {channel.name} (Inactive for 24h)",
-                                        file=transcript_file
-                                    )
-                            
-                            await channel.delete(reason="Auto-closed due to inactivity")
-                            
-                        except Exception as e:
-                            print(f"Error auto-closing ticket {channel_id}: {e}")
         except Exception as e:
-            print(f"Error in check_inactive_tickets task: {e}")
-            import traceback
-            traceback.print_exc()
+            print(f"Error auto-closing ticket {channel_id}: {e}")
     
-    @check_inactive_tickets.before_loop
-    async def before_check_inactive_tickets(self):
-        await self.bot.wait_until_ready()
+    def is_ticket_channel(self, channel):
+        """Whether a channel lives in one of the configured ticket categories (unclaimed pool channels excluded)"""
+        if channel.id in self.pool.reserved:
+            return False
+        ticket_categories = self.db.get_config('ticket_categories') or {}
+        return getattr(channel, 'category_id', None) in ticket_categories.values()
     
     @commands.Cog.listener()
-    async def on_message(self, message):
-        """Thin adapter - delegates to AI manager with role-ping enforcement"""
-        if message.author.bot:
-            return
-        
-        if not message.guild:
+    async def on_ready(self):
+        """Backfill transcripts missed while offline and queue each open ticket's auto-close"""
+        for channel_id_str, ticket_data in list(self.db.data.get('tickets', {}).items()):
+            if ticket_data.get('status') == 'closed':
+                continue
+            channel = self.bot.get_channel(int(channel_id_str))
+            if not channel:
+                continue
+            try:
+                await self.transcripts.backfill(channel)
+            except Exception as e:
+                print(f"Error backfilling transcript for ticket {channel_id_str}: {e}")
+            self.schedule_inactivity(channel.id, ticket_data)
+    
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel):
+        self.inactivity.cancel(channel.id)
+    
+    @commands.Cog.listener()
+    async def on_raw_message_edit(self, payload):
+        if 'content' not in payload.data:
             return
-        
+        channel = self.bot.get_channel(payload.channel_id)
+        if channel and self.is_ticket_channel(channel):
+            self.transcripts.record_edit(payload.channel_id, payload.message_id, payload.data['content'])
+    
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload):
+        channel = self.bot.get_channel(payload.channel_id)
+        if channel and self.is_ticket_channel(channel):
+            self.transcripts.record_delete(payload.channel_id, payload.message_id)
+    
+    @commands.Cog.listener()
+    async def on_raw_bulk_message_delete(self, payload):
+        channel = self.bot.get_channel(payload.channel_id)
+        if channel and self.is_ticket_channel(channel):
+            for message_id in payload.message_ids:
+                self.transcripts.record_delete(payload.channel_id, message_id)
+    
+    async def record_ticket_message(self, message, features):
+        """Capture every ticket message (bots included) for the transcript"""
+        self.transcripts.record_message(message)
+        self.inactivity.schedule(
+            message.channel.id,
+            (message.created_at + self.INACTIVITY_TIMEOUT).timestamp()
+        )
+    
+    async def handle_ticket_message(self, message, features):
+        """Thin adapter - delegates to AI manager with role-ping enforcement"""
         # Check if message is in a ticket channel
         ticket_data = self.db.get_ticket_data(message.channel.id)
         if not ticket_data:
             return
         
-        # CRITICAL: AI must ONLY respond in these 3 specific categories
-        # Support: 1436498409153626213, Request CC: 1436498445216256031, Warning Appeal: 1436498528544227428
-        allowed_categories = [1436498409153626213, 1436498445216256031, 1436498528544227428]
-        if message.channel.category_id not in allowed_categories:
-            # AI must ignore messages in any other category (including Report Player)
-            return
-        
         # Check global AI ops status
-        if not self.db.get_ai_ops_status():
+        if not features.config.get('ai_ops_enabled', True):
             return
         
         # Check if ticket has AI enabled
@@ -595,7 +668,7 @@ class Tickets(commands.Cog):
         
         # CRITICAL: Check for unauthorized role pings
         # Messages with @everyone, @here, or role pings are IGNORED unless from Ticket Manager or Appeal Manager
-        user_role_ids = [role.id for role in message.author.roles]
+        user_role_ids = features.role_ids
         ticket_manager_id = TicketAIConfig.ROLES['ticket_manager']
         appeal_manager_id = TicketAIConfig.ROLES['appeal_manager']
         
@@ -603,7 +676,7 @@ class Tickets(commands.Cog):
         
         # Check if message contains pings
         has_everyone_ping = message.mention_everyone
-        has_role_ping = len(message.role_mentions) > 0
+        has_role_ping = bool(features.role_mention_ids)
         
         # If message has pings but user is not authorized, ignore it
         if (has_everyone_ping or has_role_ping) and not has_authorized_role:
@@ -638,11 +711,11 @@ class Tickets(commands.Cog):
     async def ai_autoclaim_and_greet(self, channel, ticket_data):
         """Auto-claim ticket and send initial AI greeting"""
         try:
-            # Auto-claim the ticket
-            await self.ai_manager.claim_ticket(self.bot, channel, ticket_data)
-            
-            # Send initial AI greeting
-            await self.ai_manager.send_initial_greeting(channel, ticket_data)
+            # Auto-claim the ticket and send the initial AI greeting side by side
+            await asyncio.gather(
+                self.ai_manager.claim_ticket(self.bot, channel, ticket_data),
+                self.ai_manager.send_initial_greeting(channel, ticket_data)
+            )
         except Exception as e:
             print(f"Error in AI auto-claim and greet: {e}")
             import traceback
@@ -708,14 +781,7 @@ Respond naturally in plain text only."""
                         data = await resp.json()
                         ai_response = data['choices'][0]['message']['content']
                         
-                        if 'messages' not in ticket_data:
-                            ticket_data['messages'] = []
-                        
-                        ticket_data['messages'].append({
-                            'role': 'assistant',
-                            'content': ai_response,
-                            'timestamp': datetime.utcnow().isoformat()
-                        })
+                        self.db.add_ticket_message(channel.id, ticket_data, 'assistant', ai_response)
                         self.db.save_ticket_data(channel.id, ticket_data)
                         
                         # Ping both user and bot ID in ticket response
@@ -820,7 +886,7 @@ Important: Respond naturally in plain text, NOT in embeds. Keep responses short
         # Build message history for OpenAI-compatible format
         messages = [{"role": "system", "content": system_prompt}]
         
-        for msg in ticket_data.get('messages', [])[-10:]:
+        for msg in self.db.get_ticket_messages(channel.id, limit=10):
             messages.append({
                 "role": msg.get('role', 'user'),
                 "content": msg.get('content', '')
@@ -847,11 +913,7 @@ Important: Respond naturally in plain text, NOT in embeds. Keep responses short
                         data = await resp.json()
                         ai_response = data['choices'][0]['message']['content']
                         
-                        ticket_data['messages'].append({
-                            'role': 'assistant',
-                            'content': ai_response,
-                            'timestamp': datetime.utcnow().isoformat()
-                        })
+                        self.db.add_ticket_message(channel.id, ticket_data, 'assistant', ai_response)
                         self.db.save_ticket_data(channel.id, ticket_data)
                         
                         # Ping both user and bot ID in ticket response
@@ -865,14 +927,7 @@ Important: Respond naturally in plain text, NOT in embeds. Keep responses short
     @commands.hybrid_command(name='summarize', description='Get a summary of the current ticket')
     async def summarize(self, ctx):
         """Get a summary of the current ticket (Ticket Manager and Appeal Manager only)"""
-        from ticket_ai_config import TicketAIConfig
-        
-        ticket_manager_id = TicketAIConfig.ROLES['ticket_manager']
-        appeal_manager_id = TicketAIConfig.ROLES['appeal_manager']
-        
-        user_role_ids = [role.id for role in ctx.author.roles]
-        
-        if ticket_manager_id not in user_role_ids and appeal_manager_id not in user_role_ids:
+        if not self.is_ticket_staff(ctx.author):
             await ctx.send("❌ You must be a Ticket Manager or Appeal Manager to use this command.", ephemeral=True)
             return
         
@@ -890,7 +945,7 @@ Important: Respond naturally in plain text, NOT in embeds. Keep responses short
         claimed_by = ticket_data.get('claimed_by')
         claimed_mention = f"<@{claimed_by}>" if claimed_by else "Unclaimed"
         status = ticket_data.get('status', 'Open')
-        messages = ticket_data.get('messages', [])
+        messages = self.db.get_ticket_messages(ctx.channel.id, limit=None)
         
         from datetime import datetime
         try:
@@ -939,6 +994,55 @@ Important: Respond naturally in plain text, NOT in embeds. Keep responses short
         
         await ctx.send(embed=embed)
     
+    def is_ticket_staff(self, member):
+        staff_roles = {TicketAIConfig.ROLES['ticket_manager'], TicketAIConfig.ROLES['appeal_manager']}
+        return any(role.id in staff_roles for role in member.roles)
+    
+    @commands.hybrid_command(name='tickethistory', description='List archived tickets opened by a member')
+    async def tickethistory(self, ctx, member: discord.User):
+        """List a member's closed tickets from the archive (Ticket Manager and Appeal Manager only)"""
+        if not self.is_ticket_staff(ctx.author):
+            await ctx.send("❌ You must be a Ticket Manager or Appeal Manager to use this command.", ephemeral=True)
+            return
+        
+        entries = self.db.get_archived_tickets_by_creator(member.id, limit=10)
+        if not entries:
+            await ctx.send(f"No archived tickets found for {member.mention}.", ephemeral=True)
+            return
+        
+        embed = discord.Embed(
+            title=f"📁 Archived Tickets - {member.name}",
+            color=0x5865F2,
+            timestamp=datetime.utcnow()
+        )
+        for entry in entries:
+            closed_at = (entry.get('closed_at') or 'Unknown')[:16].replace('T', ' ')
+            embed.add_field(
+                name=f"{(entry.get('type') or 'unknown').capitalize()} • {entry['channel_id']}",
+                value=f"Closed: {closed_at}",
+                inline=False
+            )
+        embed.set_footer(text="Use /tickettranscript <ticket id> to view a transcript")
+        await ctx.send(embed=embed, ephemeral=True)
+    
+    @commands.hybrid_command(name='tickettranscript', description='Fetch the transcript of an archived ticket')
+    async def tickettranscript(self, ctx, ticket_id: str):
+        """Re-upload an archived ticket transcript (Ticket Manager and Appeal Manager only)"""
+        if not self.is_ticket_staff(ctx.author):
+            await ctx.send("❌ You must be a Ticket Manager or Appeal Manager to use this command.", ephemeral=True)
+            return
+        
+        record = self.db.get_archived_ticket(ticket_id.strip())
+        if not record or not record.get('transcript'):
+            await ctx.send("❌ No archived transcript found for that ticket.", ephemeral=True)
+            return
+        
+        transcript_file = discord.File(
+            io.BytesIO(record['transcript'].encode('utf-8')),
+            filename=f"transcript-{ticket_id.strip()}.txt"
+        )
+        await ctx.send(file=transcript_file, ephemeral=True)
+    
     @commands.hybrid_command(name='ticketpanel', description='Setup the ticket panel')
     @commands.has_permissions(administrator=True)
     async def ticketpanel(self, ctx):
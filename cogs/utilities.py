@@ -1,20 +1,23 @@
 import discord
 from discord.ext import commands, tasks
 from database import Database
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import asyncio
+from write_scheduler import get_scheduler
+from scheduler import DeadlineScheduler
 
 class Utilities(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.db = Database()
         self.status_rotation.start()
-        self.check_reminders.start()
+        self.reminders = DeadlineScheduler(self.deliver_reminder, concurrency=5, name='reminders')
+        self.reminders.start()
         self.current_status_index = 0
     
     def cog_unload(self):
         self.status_rotation.cancel()
-        self.check_reminders.cancel()
+        self.reminders.stop()
     
     @tasks.loop(minutes=5)
     async def status_rotation(self):
@@ -34,9 +37,10 @@ class Utilities(commands.Cog):
             discord.Activity(type=discord.ActivityType.playing, name="Type /help for commands")
         ]
         
-        await self.bot.change_presence(
-            status=discord.Status.online,
-            activity=statuses[self.current_status_index % len(statuses)]
+        await get_scheduler(self.bot).change_presence(
+            self.bot,
+            discord.Status.online,
+            statuses[self.current_status_index % len(statuses)]
         )
         
         self.current_status_index += 1
@@ -45,32 +49,38 @@ class Utilities(commands.Cog):
     async def before_status_rotation(self):
         await self.bot.wait_until_ready()
     
-    @tasks.loop(minutes=1)
-    async def check_reminders(self):
-        pending_reminders = self.db.get_pending_reminders()
-        
-        for reminder in pending_reminders:
-            user = self.bot.get_user(reminder['user_id'])
-            if user:
-                embed = discord.Embed(
-                    title="⏰ Reminder",
-                    description=reminder['message'],
-                    color=discord.Color.blue(),
-                    timestamp=datetime.utcnow()
-                )
-                
-                try:
-                    await user.send(embed=embed)
-                except:
-                    channel = self.bot.get_channel(reminder['channel_id'])
-                    if channel:
-                        await channel.send(f"{user.mention}", embed=embed)
-            
-            self.db.complete_reminder(reminder['id'])
+    def schedule_reminder(self, reminder_id, remind_at):
+        """Queue a reminder on the deadline heap; `remind_at` is a naive UTC datetime"""
+        self.reminders.schedule(reminder_id, remind_at.replace(tzinfo=timezone.utc).timestamp())
     
-    @check_reminders.before_loop
-    async def before_check_reminders(self):
-        await self.bot.wait_until_ready()
+    @commands.Cog.listener()
+    async def on_ready(self):
+        """Queue every pending reminder; overdue ones fire straight away"""
+        for reminder in self.db.get_pending_reminders():
+            self.schedule_reminder(reminder['id'], datetime.fromisoformat(reminder['remind_at']))
+    
+    async def deliver_reminder(self, reminder_id):
+        reminder = self.db.get_reminder(reminder_id)
+        if not reminder:
+            return
+        
+        user = self.bot.get_user(reminder['user_id'])
+        if user:
+            embed = discord.Embed(
+                title="⏰ Reminder",
+                description=reminder['message'],
+                color=discord.Color.blue(),
+                timestamp=datetime.utcnow()
+            )
+            
+            try:
+                await user.send(embed=embed)
+            except:
+                channel = self.bot.get_channel(reminder['channel_id'])
+                if channel:
+                    await channel.send(f"{user.mention}", embed=embed)
+        
+        self.db.complete_reminder(reminder_id)
     
     @commands.Cog.listener()
     async def on_message_delete(self, message):
@@ -293,6 +303,7 @@ class Utilities(commands.Cog):
             
             remind_at = datetime.utcnow() + timedelta(seconds=seconds)
             reminder_id = self.db.add_reminder(ctx.author.id, ctx.channel.id, message, remind_at)
+            self.schedule_reminder(reminder_id, remind_at)
             
             embed = discord.Embed(
                 title="✅ Reminder Set",
@@ -305,6 +316,17 @@ class Utilities(commands.Cog):
         except (ValueError, IndexError):
             await ctx.send("❌ Invalid time format. Examples: 30s, 5m, 2h, 1d", ephemeral=True)
     
+    @commands.hybrid_command(name='cancelreminder', description='Cancel one of your reminders')
+    async def cancelreminder(self, ctx, reminder_id: str):
+        reminder = self.db.get_reminder(reminder_id)
+        if not reminder or reminder['user_id'] != ctx.author.id:
+            await ctx.send("❌ You have no pending reminder with that ID", ephemeral=True)
+            return
+        
+        self.reminders.cancel(reminder_id)
+        self.db.complete_reminder(reminder_id, status='cancelled')
+        await ctx.send(f"✅ Reminder `{reminder_id}` cancelled", ephemeral=True)
+    
     # DISABLED - /dm command
     # @commands.hybrid_command(name='dm', description='Send a DM to a user through the bot')
     # @commands.has_permissions(moderate_members=True)
@@ -52,6 +52,12 @@ class RobloxVerificationModal(Modal):
         db = Database()
         username = self.roblox_username.value.strip()
         
+        # During a raid, Roblox lookups are batched instead of made one per submission
+        anti_raid = interaction.client.get_cog('AntiRaid')
+        if anti_raid and anti_raid.is_raid_active(interaction.guild.id):
+            anti_raid.queue_verification(interaction, username)
+            return
+        
         try:
             async with aiohttp.ClientSession() as session:
                 async with session.post(
@@ -71,55 +77,7 @@ class RobloxVerificationModal(Modal):
                                     if avatar_data.get('data'):
                                         avatar_url = avatar_data['data'][0]['imageUrl']
                             
-                            db.set_verification_data(interaction.user.id, roblox_id, roblox_name)
-                            
-                            verified_role_id = db.get_config('verified_role') or 1423669554441355284
-                            verified_role = interaction.guild.get_role(verified_role_id)
-                            
-                            if verified_role:
-                                await interaction.user.add_roles(verified_role, reason="User verified with Roblox")
-                            
-                            try:
-                                dm_embed = discord.Embed(
-                                    title="Verification Complete",
-                                    description=f"> **Verification Complete.** You have successfully verified in **{interaction.guild.name}**",
-                                    color=discord.Color.green(),
-                                    timestamp=discord.utils.utcnow()
-                                )
-                                
-                                if avatar_url:
-                                    dm_embed.set_thumbnail(url=avatar_url)
-                                
-                                dm_embed.add_field(
-                                    name="Roblox Account",
-                                    value=f"**Username:** {roblox_name}\n**Profile:** [View Profile](https://www.roblox.com/users/{roblox_id}/profile)",
-                                    inline=False
-                                )
-                                
-                                await interaction.user.send(embed=dm_embed)
-                            except:
-                                pass
-                            
-                            log_channel_id = db.get_config('log_channel') or 1411710143598690404
-                            log_channel = interaction.guild.get_channel(log_channel_id)
-                            if log_channel:
-                                log_embed = discord.Embed(
-                                    title="User Verified",
-                                    description=f"> {interaction.user.mention} has been verified",
-                                    color=discord.Color.green(),
-                                    timestamp=discord.utils.utcnow()
-                                )
-                                log_embed.add_field(name="User ID", value=str(interaction.user.id), inline=True)
-                                log_embed.add_field(name="Roblox", value=f"[{roblox_name}](https://www.roblox.com/users/{roblox_id}/profile)", inline=True)
-                                
-                                if avatar_url:
-                                    log_embed.set_thumbnail(url=avatar_url)
-                                else:
-                                    log_embed.set_thumbnail(url=interaction.user.display_avatar.url)
-                                
-                                await log_channel.send(embed=log_embed)
-                            
-                            await interaction.followup.send(f"✅ Successfully verified as **{roblox_name}**!", ephemeral=True)
+                            await complete_verification(interaction, db, roblox_id, roblox_name, avatar_url)
                         else:
                             await interaction.followup.send("❌ Roblox username not found. Please check your username and try again.", ephemeral=True)
                     else:
@@ -144,6 +102,58 @@ class HelpButton(Button):
             ephemeral=True
         )
 
+async def complete_verification(interaction, db, roblox_id, roblox_name, avatar_url):
+    """Grant the verified role once a Roblox account has been resolved"""
+    db.set_verification_data(interaction.user.id, roblox_id, roblox_name)
+
+    verified_role_id = db.get_config('verified_role') or 1423669554441355284
+    verified_role = interaction.guild.get_role(verified_role_id)
+
+    if verified_role:
+        await interaction.user.add_roles(verified_role, reason="User verified with Roblox")
+
+    try:
+        dm_embed = discord.Embed(
+            title="Verification Complete",
+            description=f"> **Verification Complete.** You have successfully verified in **{interaction.guild.name}**",
+            color=discord.Color.green(),
+            timestamp=discord.utils.utcnow()
+        )
+
+        if avatar_url:
+            dm_embed.set_thumbnail(url=avatar_url)
+
+        dm_embed.add_field(
+            name="Roblox Account",
+            value=f"**Username:** {roblox_name}\n**Profile:** [View Profile](https://www.roblox.com/users/{roblox_id}/profile)",
+            inline=False
+        )
+
+        await interaction.user.send(embed=dm_embed)
+    except:
+        pass
+
+    log_channel_id = db.get_config('log_channel') or 1411710143598690404
+    log_channel = interaction.guild.get_channel(log_channel_id)
+    if log_channel:
+        log_embed = discord.Embed(
+            title="User Verified",
+            description=f"> {interaction.user.mention} has been verified",
+            color=discord.Color.green(),
+            timestamp=discord.utils.utcnow()
+        )
+        log_embed.add_field(name="User ID", value=str(interaction.user.id), inline=True)
+        log_embed.add_field(name="Roblox", value=f"[{roblox_name}](https://www.roblox.com/users/{roblox_id}/profile)", inline=True)
+
+        if avatar_url:
+            log_embed.set_thumbnail(url=avatar_url)
+        else:
+            log_embed.set_thumbnail(url=interaction.user.display_avatar.url)
+
+        await log_channel.send(embed=log_embed)
+
+    await interaction.followup.send(f"✅ Successfully verified as **{roblox_name}**!", ephemeral=True)
+
 class Verification(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
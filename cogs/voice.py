@@ -44,34 +44,8 @@ class Voice(commands.Cog):
             await ctx.send("I'm not in a voice channel.")
     
     async def award_voice_xp(self, member, guild_id, xp_amount):
-        """Award voice XP and handle level-ups with milestone rewards"""
-        leveled_up, new_level = self.db.add_xp(guild_id, member.id, xp_amount)
-        
-        if leveled_up:
-            leveling_cog = self.bot.get_cog('Leveling')
-            if leveling_cog and hasattr(leveling_cog, 'level_channel_id'):
-                guild = self.bot.get_guild(guild_id)
-                if guild:
-                    level_channel = guild.get_channel(leveling_cog.level_channel_id)
-                    if level_channel:
-                        try:
-                            await level_channel.send(
-                                f"{member.mention} is now **Level {new_level}**! 🎉 (Voice Activity)"
-                            )
-                        except:
-                            pass
-                    
-                    if new_level in leveling_cog.milestone_roles:
-                        await leveling_cog.grant_milestone_role(guild, member, new_level)
-                    
-                    if new_level == 5:
-                        reward_coins = 500
-                        if self.db.get_config('economy_enabled'):
-                            self.db.add_balance(guild_id, member.id, reward_coins)
-                            try:
-                                await member.send(f"🎉 You reached Level 5! You earned **{reward_coins}** Spirit Coins!")
-                            except:
-                                pass
+        """Award voice XP; level-ups are announced by Leveling's XP engine listener"""
+        self.db.xp.award(guild_id, member.id, xp_amount, member=member, source='voice')
     
     @commands.Cog.listener()
     async def on_voice_state_update(self, member, before, after):
@@ -140,20 +114,12 @@ class Voice(commands.Cog):
     # DISABLED - /voiceleaderboard command
     # @commands.hybrid_command(name='voiceleaderboard', description='Show the voice activity leaderboard')
     async def voice_leaderboard_disabled(self, ctx):
-        voice_data = self.db.data.get('voice_activity', {})
-        
-        guild_voice = {}
-        for key, data in voice_data.items():
-            if key.startswith(f"{ctx.guild.id}:"):
-                user_id = int(key.split(':')[1])
-                guild_voice[user_id] = data.get('total_minutes', 0)
+        sorted_users = [(user_id, minutes) for _, user_id, minutes in self.db.leaderboards.get('voice', ctx.guild.id).top(10)]
         
-        if not guild_voice:
+        if not sorted_users:
             await ctx.send("No voice activity recorded yet!", ephemeral=True)
             return
         
-        sorted_users = sorted(guild_voice.items(), key=lambda x: x[1], reverse=True)[:10]
-        
         embed = discord.Embed(
             title="🎙️ Voice Activity Leaderboard",
             description="Top 10 members by voice chat time",
@@ -10,6 +10,11 @@ class Welcome(commands.Cog):
 
     @commands.Cog.listener()
     async def on_member_join(self, member):
+        # Raid mode holds welcomes and sends one batched message when it ends
+        anti_raid = self.bot.get_cog('AntiRaid')
+        if anti_raid and anti_raid.is_raid_active(member.guild.id):
+            return
+        
         try:
             welcome_channel = member.guild.get_channel(self.welcome_channel_id)
             if welcome_channel:
@@ -0,0 +1,68 @@
+"""
+Config Service
+Immutable, versioned config snapshots published to subscribing cogs on every change
+"""
+from types import MappingProxyType
+
+# Settings stored as ID/domain lists that are only ever used for membership tests
+SET_KEYS = ('excluded_xp_channels', 'automod_exempt_roles', 'whitelisted_domains')
+
+
+class ConfigSnapshot:
+    """Config values as attributes (missing keys read as None); cannot be modified"""
+
+    def __init__(self, values, version):
+        frozen = {key: frozenset() for key in SET_KEYS}
+        for key, value in values.items():
+            if key in SET_KEYS:
+                value = frozenset(value or ())
+            elif isinstance(value, dict):
+                value = MappingProxyType(dict(value))
+            elif isinstance(value, list):
+                value = tuple(value)
+            frozen[key] = value
+        self.__dict__.update(frozen)
+        self.__dict__['version'] = version
+        self.__dict__['values'] = MappingProxyType(frozen)
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return None
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ConfigSnapshot is read-only; use Database.set_config")
+
+    def get(self, key, default=None):
+        value = self.values.get(key)
+        return default if value is None else value
+
+
+class ConfigService:
+    """Holds the current snapshot and notifies subscribers whenever a new one is published"""
+
+    def __init__(self, values):
+        self.snapshot = ConfigSnapshot(values, 1)
+        self.subscribers = []
+
+    @property
+    def version(self):
+        return self.snapshot.version
+
+    def subscribe(self, callback):
+        """Register callback(snapshot) and return the current snapshot"""
+        self.subscribers.append(callback)
+        return self.snapshot
+
+    def unsubscribe(self, callback):
+        if callback in self.subscribers:
+            self.subscribers.remove(callback)
+
+    def publish(self, values):
+        self.snapshot = ConfigSnapshot(values, self.snapshot.version + 1)
+        for callback in list(self.subscribers):
+            try:
+                callback(self.snapshot)
+            except Exception as e:
+                print(f"Config subscriber error: {e}")
+        return self.snapshot
@@ -0,0 +1,164 @@
+"""
+Counting State
+In-memory counting game with synchronous transitions and periodic checkpoints into the database
+"""
+
+# Outcomes of CountingState.submit
+ACCEPTED = 'accepted'
+MILESTONE = 'milestone'
+LOCKED = 'locked'
+COOLDOWN = 'cooldown'
+NOT_NUMBER = 'not_number'
+DOUBLE_COUNT = 'double_count'
+WRONG_NUMBER = 'wrong_number'
+
+
+class CountResult:
+    __slots__ = ('outcome', 'number', 'expected', 'mistakes', 'locked_out', 'remaining', 'leaderboard')
+
+    def __init__(self, outcome, number=None, expected=None, mistakes=0, locked_out=False, remaining=0, leaderboard=None):
+        self.outcome = outcome
+        self.number = number
+        self.expected = expected
+        self.mistakes = mistakes
+        self.locked_out = locked_out      # this mistake triggered a lockout
+        self.remaining = remaining        # seconds left on a cooldown or lockout
+        self.leaderboard = leaderboard    # [(user_id, count), ...] at a milestone, before the reset
+
+    @property
+    def accepted(self):
+        return self.outcome in (ACCEPTED, MILESTONE)
+
+
+class CountingState:
+    """Current number and last counter per guild, per-user mistakes and contribution counts.
+
+    `submit` never awaits, so transitions are serialized on the event loop: of two messages with
+    the same correct number, only the first to be submitted is accepted. Cooldowns and lockouts
+    live in the expiry wheel. `checkpoint` writes everything back into the database dict.
+    """
+
+    def __init__(self, data, expiries, save):
+        self.data = data
+        self.expiries = expiries
+        self.save = save
+        self.cooldown = 5
+        self.max_mistakes = 5
+        self.lockout = 3600
+        self.celebration = 5000
+        self.on_contribution = None     # optional callback(user_id, count) after every counted number
+        self.on_reset = None            # optional callback() when contributions are cleared
+        self.dirty = False
+
+        self.guilds = {
+            int(guild_id): [state.get('last_number', 0), state.get('last_user_id')]
+            for guild_id, state in data.get('counting_state', {}).items()
+        }
+        self.mistakes = {int(user_id): count for user_id, count in data.get('counting_mistakes', {}).items() if count}
+        self.contributions = {int(user_id): count for user_id, count in data.get('counting_contributions', {}).items()}
+
+    def configure(self, cooldown=None, max_mistakes=None, lockout=None, celebration=None):
+        if cooldown is not None:
+            self.cooldown = cooldown
+        if max_mistakes is not None:
+            self.max_mistakes = max_mistakes
+        if lockout is not None:
+            self.lockout = lockout
+        if celebration is not None:
+            self.celebration = celebration
+
+    def state(self, guild_id):
+        """(last_number, last_user_id) for a guild"""
+        last_number, last_user_id = self.guilds.get(guild_id, (0, None))
+        return last_number, last_user_id
+
+    def submit(self, guild_id, user_id, content):
+        """Apply one message to the game and return what happened; callers act on the CountResult"""
+        remaining = self.expiries.remaining('counting_lockout', user_id)
+        if remaining:
+            return CountResult(LOCKED, remaining=remaining)
+
+        remaining = self.expiries.remaining('counting_cooldown', user_id)
+        if remaining:
+            return CountResult(COOLDOWN, remaining=remaining)
+
+        content = content.strip()
+        if not content.isdigit():
+            return CountResult(NOT_NUMBER)
+
+        number = int(content)
+        state = self.guilds.get(guild_id)
+        if state is None:
+            state = self.guilds[guild_id] = [0, None]
+        expected = state[0] + 1
+
+        if state[1] == user_id:
+            return self._mistake(DOUBLE_COUNT, user_id, number, expected)
+        if number != expected:
+            return self._mistake(WRONG_NUMBER, user_id, number, expected)
+
+        state[0], state[1] = number, user_id
+        self.add_contribution(user_id)
+        self.expiries.set('counting_cooldown', user_id, self.cooldown)
+        self.dirty = True
+
+        if number != self.celebration:
+            return CountResult(ACCEPTED, number, expected)
+
+        leaderboard = sorted(self.contributions.items(), key=lambda item: item[1], reverse=True)[:10]
+        state[0], state[1] = 0, None
+        self.reset_contributions()
+        return CountResult(MILESTONE, number, expected, leaderboard=leaderboard)
+
+    def _mistake(self, outcome, user_id, number, expected):
+        mistakes = self.mistakes.get(user_id, 0) + 1
+        locked_out = mistakes >= self.max_mistakes
+        if locked_out:
+            self.expiries.set('counting_lockout', user_id, self.lockout)
+            self.mistakes.pop(user_id, None)
+        else:
+            self.mistakes[user_id] = mistakes
+        self.dirty = True
+        return CountResult(outcome, number, expected, mistakes=mistakes, locked_out=locked_out)
+
+    def set_state(self, guild_id, last_number, last_user_id):
+        self.guilds[guild_id] = [last_number, last_user_id]
+        self.dirty = True
+
+    def add_mistake(self, user_id):
+        self.mistakes[user_id] = self.mistakes.get(user_id, 0) + 1
+        self.dirty = True
+        return self.mistakes[user_id]
+
+    def reset_mistakes(self, user_id):
+        self.mistakes.pop(user_id, None)
+        self.dirty = True
+
+    def add_contribution(self, user_id):
+        count = self.contributions.get(user_id, 0) + 1
+        self.contributions[user_id] = count
+        if self.on_contribution:
+            self.on_contribution(user_id, count)
+        self.dirty = True
+        return count
+
+    def reset_contributions(self):
+        self.contributions = {}
+        if self.on_reset:
+            self.on_reset()
+        self.dirty = True
+
+    def checkpoint(self, save=True):
+        """Write the game into the database dict; saves only when something changed"""
+        if not self.dirty:
+            return False
+        self.data['counting_state'] = {
+            str(guild_id): {'last_number': last_number, 'last_user_id': last_user_id}
+            for guild_id, (last_number, last_user_id) in self.guilds.items()
+        }
+        self.data['counting_mistakes'] = {str(user_id): count for user_id, count in self.mistakes.items()}
+        self.data['counting_contributions'] = {str(user_id): count for user_id, count in self.contributions.items()}
+        self.dirty = False
+        if save:
+            self.save()
+        return True
@@ -1,13 +1,57 @@
 import json
 import os
 from datetime import datetime, timedelta
+from ticket_logs import TicketMessageLog
+from ticket_archive import TicketArchive
+from search_index import SearchIndex
+from config_service import ConfigService
+from xp_engine import XPEngine, xp_for_level, total_xp_for_level
+from leaderboard import Leaderboards
+from stats_tables import StatsTables
+from timeseries import TimeSeriesStore
+from expiry_wheel import ExpiryWheel
+from counting_state import CountingState
 
 class Database:
+    # Every instance for a file shares one data dict and config service, so writes are seen everywhere
+    _shared = {}
+
     def __init__(self, filename='database.json'):
         self.filename = filename
-        self.data = self.load()
+        shared = Database._shared.get(filename)
+        if shared is None:
+            shared = Database._shared[filename] = {
+                'data': self.load(), 'stats': StatsTables(), 'analytics': TimeSeriesStore(), 'expiries': ExpiryWheel(),
+                'ticket_archive': TicketArchive(), 'search_index': None,
+                'config': None, 'xp': None, 'leaderboards': None, 'counting': None
+            }
+            shared['search_index'] = SearchIndex(loader=self._search_document_text)
+        self.data = shared['data']
+        self.stats = shared['stats']
+        self.analytics = shared['analytics']
+        self.expiries = shared['expiries']
+        self.counting = shared['counting']
         self.last_save = datetime.utcnow()
-        self._initialize_defaults()
+        self.ticket_logs = TicketMessageLog()
+        self.ticket_archive = shared['ticket_archive']
+        self.search_index = shared['search_index']
+        self.reminder_archive_path = os.path.join('reminders', 'archive.jsonl')
+        if shared['config'] is None:
+            self._initialize_defaults()
+            shared['config'] = ConfigService(self.data['config'])
+            shared['xp'] = XPEngine(self.stats, self.save)
+            shared['leaderboards'] = Leaderboards(self._leaderboard_scores)
+            shared['xp'].on_change = lambda guild_id, user_id, total: shared['leaderboards'].update('xp', guild_id, user_id, total)
+            self.counting = shared['counting'] = CountingState(self.data, self.expiries, self.save)
+            self.counting.on_contribution = lambda user_id, count: shared['leaderboards'].update('counting', 0, user_id, count)
+            self.counting.on_reset = lambda: shared['leaderboards'].reset('counting')
+        self.config = shared['config']
+        self.xp = shared['xp']
+        self.leaderboards = shared['leaderboards']
+
+    @property
+    def config_version(self):
+        return self.config.version
 
     def load(self):
         if os.path.exists(self.filename):
@@ -20,7 +64,6 @@ class Database:
 
     def default_structure(self):
         return {
-            'levels': {},
             'counting': {
                 'current': 0,
                 'last_user': None,
@@ -29,7 +72,6 @@ class Database:
             'tickets': {},
             'ticket_transcripts': {},
             'warnings': {},
-            'cooldowns': {},
             'afk_states': {},
             'teach_database': {},
             'verifications': {},
@@ -39,14 +81,12 @@ class Database:
             'staff_notes': {},
             'events': {},
             'economy': {
-                'balances': {},
                 'transactions': [],
                 'shop_items': {}
             },
             'moderation_cases': {},
             'starboard': {},
             'reminders': {},
-            'voice_activity': {},
             'deleted_messages': [],
             'edited_messages': [],
             'giveaways': {},
@@ -60,8 +100,6 @@ class Database:
             },
             'ticket_ai_state': {},
             'analytics': {
-                'daily_messages': {},
-                'command_usage': {},
                 'ticket_stats': {}
             },
             'config': {
@@ -77,6 +115,7 @@ class Database:
                 'staff_ping_user': 1383270362707656774,
                 'transcript_channel': 1420538005936013403,
                 'ai_enabled': True,
+                'ticket_pool_size': 0,
                 'ai_ops_enabled': True,
                 'ai_endpoint': 'https://api.sampleapis.com/ai/v1/chat/completions',
                 'ai_model': 'meta-llama/Llama-3.2-3B-Instruct:fastest',
@@ -98,7 +137,9 @@ class Database:
                 'starboard_threshold': 5,
                 'economy_enabled': False,
                 'anti_raid_enabled': True,
+                'anti_raid_action': 'timeout',
                 'auto_mod_enabled': True,
+                'phishing_filter_enabled': True,
                 'excluded_xp_channels': []
             }
         }
@@ -129,36 +170,132 @@ class Database:
             if key not in self.data['config']:
                 self.data['config'][key] = value
 
+        # Per-member XP, voice time and balances live in the columnar stats tables
+        imported = self.stats.import_legacy(self.data)
+        if imported:
+            print(f"Moved {imported} member stat rows into stats tables")
+        imported = self.analytics.import_legacy(self.data.get('analytics', {}))
+        if imported:
+            print(f"Moved {imported} analytics counters into the time series store")
+
+        # Cooldowns, lockouts, AFK deadlines and locks expire in the wheel instead of as ISO strings
+        self.expiries.restore(self.data.get('expiries'))
+        self._import_legacy_expiries()
+        self.expiries.on_expire('afk', lambda user_id, payload: self.remove_afk(user_id))
+
+        # Archived reminders used to sit inside the ticket archive's directory
+        legacy_reminders = os.path.join(self.ticket_archive.directory, 'reminders.jsonl')
+        if os.path.exists(legacy_reminders) and not os.path.exists(self.reminder_archive_path):
+            os.makedirs(os.path.dirname(self.reminder_archive_path), exist_ok=True)
+            os.replace(legacy_reminders, self.reminder_archive_path)
+
+        # Delivered reminders used to stay in database.json forever
+        reminders = self.data.get('reminders', {})
+        completed = {rid: reminder for rid, reminder in reminders.items() if reminder.get('completed')}
+        if completed:
+            self._seed_reminder_ids()
+            self._archive_reminders(completed, 'completed')
+            for reminder_id in completed:
+                del reminders[reminder_id]
+
+        # Staff notes used to be identified by their position in the user's list
+        for user_id, notes in self.data.get('staff_notes', {}).items():
+            for position, note in enumerate(notes):
+                if 'id' not in note:
+                    note['id'] = self._next_staff_note_id()
+                    if self.search_index.exists():
+                        self.search_index.remove(f"note:{user_id}:{position}")
+                        self._index_staff_note(user_id, note)
+
+        # Move conversation histories still embedded in ticket records into their logs
+        for ticket_id, ticket_data in self.data.get('tickets', {}).items():
+            self._extract_ticket_messages(ticket_id, ticket_data)
+
+        # Closed tickets and stored transcripts belong in cold storage, not database.json
+        for ticket_id, ticket_data in list(self.data.get('tickets', {}).items()):
+            if isinstance(ticket_data, dict) and ticket_data.get('status') == 'closed':
+                self.archive_ticket(ticket_id, save=False)
+        for ticket_id in list(self.data.get('ticket_transcripts', {})):
+            self.archive_ticket(ticket_id, save=False)
+
         self.save()
 
 
+    def _import_legacy_expiries(self):
+        def remaining(value):
+            try:
+                return (datetime.fromisoformat(value) - datetime.utcnow()).total_seconds()
+            except (TypeError, ValueError):
+                return 0
+
+        for user_id, lockout in self.data.pop('counting_lockouts', {}).items():
+            if remaining(lockout.get('lockout_until')) > 0:
+                self.expiries.set('counting_lockout', int(user_id), remaining(lockout['lockout_until']))
+        self.data.pop('counting_cooldowns', None)
+        for user_id, mistakes in self.data.get('counting', {}).get('mistakes', {}).items():
+            locked_until = mistakes.pop('locked_until', None)
+            if remaining(locked_until) > 0:
+                self.expiries.set('counting_lockout', int(user_id), remaining(locked_until))
+        for lock_key, lock in self.data.pop('locks', {}).items():
+            if remaining(lock.get('expires_at')) > 0:
+                self.expiries.set('lock', lock_key, remaining(lock['expires_at']))
+        for user_id, afk_data in list(self.data.get('afk_states', {}).items()):
+            if afk_data.get('until') and not self.expiries.active('afk', int(user_id)):
+                if remaining(afk_data['until']) > 0:
+                    self.expiries.set('afk', int(user_id), remaining(afk_data['until']))
+                else:
+                    del self.data['afk_states'][user_id]
+        self.data.pop('cooldowns', None)
+
     def save(self):
+        # Stats first: if the JSON write fails the legacy rows are simply imported again
+        self.stats.save()
+        self.analytics.save()
+        self.data['expiries'] = self.expiries.checkpoint()
+        if self.counting is not None:
+            self.counting.checkpoint(save=False)
         with open(self.filename, 'w') as f:
             json.dump(self.data, f, indent=4)
 
     def get_user_level(self, guild_id, user_id):
-        key = f"{guild_id}:{user_id}"
-        if key not in self.data['levels']:
-            self.data['levels'][key] = {'xp': 0, 'level': 1, 'last_message': None}
-        return self.data['levels'][key]
+        # Read-only view; XP changes go through self.xp so they are not overwritten by the engine
+        self.xp.sync(guild_id, user_id)
+        last_message = self.stats.get(guild_id, user_id, 'last_message')
+        return {
+            'xp': self.stats.get(guild_id, user_id, 'xp'),
+            'level': self.stats.get(guild_id, user_id, 'level'),
+            'last_message': datetime.utcfromtimestamp(last_message).isoformat() if last_message else None
+        }
 
     def add_xp(self, guild_id, user_id, amount):
-        key = f"{guild_id}:{user_id}"
-        user_data = self.get_user_level(guild_id, user_id)
-        user_data['xp'] += amount
-
-        xp_needed = self.get_xp_for_level(user_data['level'])
-        if user_data['xp'] >= xp_needed:
-            user_data['level'] += 1
-            user_data['xp'] = 0
-            self.save()
-            return True, user_data['level']
-
-        self.save()
-        return False, user_data['level']
+        """Award XP through the XP engine; saved with the engine's next batch"""
+        event = self.xp.award(guild_id, user_id, amount)
+        if event:
+            return True, event.new_level
+        return False, self.xp.get(guild_id, user_id).level
 
     def get_xp_for_level(self, level):
-        return 5 * (level ** 2) + (50 * level) + 100
+        return xp_for_level(level)
+
+    def _leaderboard_scores(self, metric, guild_id):
+        """(member_id, score) pairs for building a leaderboard from the stored data"""
+        table = self.stats.guilds.get(guild_id)
+        if metric == 'xp':
+            self.xp.flush(save=False)
+            if table is None:
+                return []
+            columns = table.columns
+            return [
+                (user_id, total_xp_for_level(level) + xp)
+                for user_id, level, xp in zip(table.user_ids, columns['level'], columns['xp'])
+            ]
+        if metric == 'voice':
+            return table.items('voice_minutes') if table is not None else []
+        if metric == 'counting':
+            return list(self.counting.contributions.items())
+        if metric == 'contributions':
+            return [(int(key), sum(counts.values())) for key, counts in self.data.get('user_contributions', {}).items()]
+        return []
 
     def get_counting_data(self):
         return self.data['counting']
@@ -170,31 +307,16 @@ class Database:
 
     def add_counting_mistake(self, user_id):
         if user_id not in self.data['counting']['mistakes']:
-            self.data['counting']['mistakes'][user_id] = {
-                'count': 0,
-                'locked_until': None
-            }
+            self.data['counting']['mistakes'][user_id] = {'count': 0}
         self.data['counting']['mistakes'][user_id]['count'] += 1
         self.save()
         return self.data['counting']['mistakes'][user_id]['count']
 
     def lock_user_from_counting(self, user_id, hours=1):
-        if user_id not in self.data['counting']['mistakes']:
-            self.data['counting']['mistakes'][user_id] = {'count': 0}
-
-        locked_until = (datetime.utcnow() + timedelta(hours=hours)).isoformat()
-        self.data['counting']['mistakes'][user_id]['locked_until'] = locked_until
-        self.save()
+        self.set_counting_lockout(int(user_id), hours * 3600)
 
     def is_user_locked(self, user_id):
-        if user_id not in self.data['counting']['mistakes']:
-            return False
-
-        locked_until = self.data['counting']['mistakes'][user_id].get('locked_until')
-        if not locked_until:
-            return False
-
-        return datetime.fromisoformat(locked_until) > datetime.utcnow()
+        return self.expiries.active('counting_lockout', int(user_id))
 
     def get_config(self, key):
         if 'config' not in self.data:
@@ -205,6 +327,7 @@ class Database:
         if 'config' not in self.data:
             self.data['config'] = {}
         self.data['config'][key] = value
+        self.config.publish(self.data['config'])
         self.save()
 
     def get_all_config(self):
@@ -221,11 +344,16 @@ class Database:
             'muted': muted,
             'set_at': datetime.utcnow().isoformat()
         }
+        if until_time:
+            self.expiries.set('afk', int(user_id), (until_time - datetime.utcnow()).total_seconds())
+        else:
+            self.expiries.cancel('afk', int(user_id))
         self.save()
 
     def remove_afk(self, user_id):
         if 'afk_states' not in self.data:
             self.data['afk_states'] = {}
+        self.expiries.cancel('afk', int(user_id))
         if str(user_id) in self.data['afk_states']:
             del self.data['afk_states'][str(user_id)]
             self.save()
@@ -236,12 +364,10 @@ class Database:
         if 'afk_states' not in self.data:
             self.data['afk_states'] = {}
         afk_data = self.data['afk_states'].get(str(user_id))
-        if afk_data:
-            if afk_data.get('until'):
-                until_time = datetime.fromisoformat(afk_data['until'])
-                if datetime.utcnow() > until_time:
-                    self.remove_afk(user_id)
-                    return None
+        if afk_data and afk_data.get('until') and not self.expiries.active('afk', int(user_id)):
+            # Lapsed but the wheel has not ticked yet
+            self.remove_afk(user_id)
+            return None
         return afk_data
 
     def add_teach(self, trigger, response, taught_by):
@@ -328,10 +454,7 @@ class Database:
         return self.data['teach_database']
 
     def save_ticket_transcript(self, ticket_id, data):
-        if 'ticket_transcripts' not in self.data:
-            self.data['ticket_transcripts'] = {}
-        self.data['ticket_transcripts'][str(ticket_id)] = data
-        self.save()
+        self.archive_ticket(ticket_id, transcript=data)
 
     def get_ticket_data(self, ticket_id):
         if 'tickets' not in self.data:
@@ -341,99 +464,181 @@ class Database:
     def save_ticket_data(self, ticket_id, data):
         if 'tickets' not in self.data:
             self.data['tickets'] = {}
+        self._extract_ticket_messages(ticket_id, data)
         self.data['tickets'][str(ticket_id)] = data
         self.save()
 
+    # Ticket Message Logs
+    def add_ticket_message(self, ticket_id, ticket_data, role, content, **fields):
+        """Append a message to the ticket's log and update the hot record's metadata"""
+        entry = {
+            'role': role,
+            'content': content,
+            **fields,
+            'timestamp': datetime.utcnow().isoformat()
+        }
+        self.ticket_logs.append(ticket_id, entry)
+        ticket_data['message_count'] = ticket_data.get('message_count', 0) + 1
+        ticket_data['last_message_at'] = entry['timestamp']
+        return entry
+
+    def get_ticket_messages(self, ticket_id, limit=10):
+        """Get the last `limit` messages of a ticket (all of them when limit is None)"""
+        if limit is None:
+            return self.ticket_logs.read_all(ticket_id)
+        return self.ticket_logs.tail(ticket_id, limit)
+
+    def _extract_ticket_messages(self, ticket_id, ticket_data):
+        if not isinstance(ticket_data, dict) or 'messages' not in ticket_data:
+            return
+        messages = ticket_data.pop('messages') or []
+        for message in messages:
+            self.ticket_logs.append(ticket_id, message)
+        ticket_data['message_count'] = ticket_data.get('message_count', 0) + len(messages)
+        if messages and messages[-1].get('timestamp'):
+            ticket_data['last_message_at'] = messages[-1]['timestamp']
+
+    # Ticket Archive
+    def archive_ticket(self, ticket_id, transcript=None, save=True):
+        """Move a closed ticket, its transcript and its conversation log into the archive"""
+        ticket_data = self.data.get('tickets', {}).pop(str(ticket_id), None)
+        stored_transcript = self.data.get('ticket_transcripts', {}).pop(str(ticket_id), None)
+        if transcript is None:
+            transcript = stored_transcript
+
+        messages = self.ticket_logs.read_all(ticket_id)
+
+        # Re-archiving (e.g. a transcript saved after close) keeps what is already stored
+        existing = self.ticket_archive.load(ticket_id) or {}
+        self.ticket_archive.store(ticket_id, {
+            'ticket': ticket_data if ticket_data is not None else existing.get('ticket'),
+            'transcript': transcript if transcript is not None else existing.get('transcript'),
+            'messages': messages or existing.get('messages', [])
+        })
+        self._index_ticket(ticket_id)
+        self.ticket_logs.delete(ticket_id)
+        if save:
+            self.save()
+
+    def get_archived_ticket(self, ticket_id):
+        """Get an archived ticket with its transcript and messages"""
+        return self.ticket_archive.load(ticket_id)
+
+    def get_archived_tickets_by_creator(self, creator_id, limit=None):
+        return self.ticket_archive.find_by_creator(creator_id, limit)
+
+    def get_archived_tickets_between(self, start=None, end=None):
+        return self.ticket_archive.find_by_date(start, end)
+
+    # Search Index
+    def search(self, query, kinds=None, limit=10):
+        return self.search_index.search(query, kinds, limit)
+
+    def prepare_search(self):
+        """Build the index if missing, load it, and compact or snapshot it when due; blocks, so run it in a worker thread"""
+        if not self.search_index.exists():
+            self.rebuild_search_index()
+        return self.search_index.maintain()
+
+    def rebuild_search_index(self):
+        """Index every archived ticket, moderation case, staff note and bug report"""
+        for entry in self.ticket_archive.find_by_date():
+            self._index_ticket(entry['channel_id'])
+        for case_id in list(self.data.get('moderation_cases', {})):
+            self._index_mod_case(case_id)
+        for user_id, notes in list(self.data.get('staff_notes', {}).items()):
+            for note in list(notes):
+                self._index_staff_note(user_id, note)
+        for bug_id in list(self.data.get('bug_reports', {})):
+            self._index_bug_report(bug_id)
+
+    def _index_ticket(self, ticket_id):
+        record = self.ticket_archive.load(ticket_id)
+        if not record:
+            return
+        ticket = record.get('ticket') or {}
+        text = record.get('transcript') or "\n".join(m.get('content', '') for m in record.get('messages', []))
+        self.search_index.add(
+            f"ticket:{ticket_id}", 'ticket', str(ticket_id),
+            f"{ticket.get('label', 'Ticket')} {ticket_id}",
+            f"{ticket.get('reason', '')}\n{ticket.get('close_reason', '')}\n{text}",
+            store_text=False
+        )
+
+    def _index_mod_case(self, case_id):
+        case = self.data['moderation_cases'][str(case_id)]
+        self.search_index.add(
+            f"case:{case_id}", 'case', str(case_id),
+            f"Case #{case_id} - {case['action']}",
+            f"{case['reason']} (user {case['user_id']}, moderator {case['moderator_id']})"
+        )
+
+    def _index_staff_note(self, user_id, note):
+        self.search_index.add(
+            f"note:{note['id']}", 'note', f"{user_id}:{note['id']}",
+            f"Staff note on {user_id}",
+            note['note']
+        )
+
+    def _index_bug_report(self, bug_id):
+        bug = self.data['bug_reports'][bug_id]
+        self.search_index.add(
+            f"bug:{bug_id}", 'bug', bug_id,
+            f"{bug_id} ({bug.get('status', 'pending')})",
+            bug['content']
+        )
+
+    def _search_document_text(self, kind, ref):
+        if kind == 'ticket':
+            record = self.ticket_archive.load(ref) or {}
+            return record.get('transcript')
+        return None
+
     # Counting System
+    # Counting game state lives in self.counting and is checkpointed with the next save
     def get_counting_state(self, guild_id: int):
-        if 'counting_state' not in self.data:
-            self.data['counting_state'] = {}
-        return self.data['counting_state'].get(str(guild_id), {'last_number': 0, 'last_user_id': None})
+        last_number, last_user_id = self.counting.state(guild_id)
+        return {'last_number': last_number, 'last_user_id': last_user_id}
 
     def update_counting_state(self, guild_id: int, last_number: int, last_user_id: int):
-        if 'counting_state' not in self.data:
-            self.data['counting_state'] = {}
-        self.data['counting_state'][str(guild_id)] = {
-            'last_number': last_number,
-            'last_user_id': last_user_id
-        }
-        self.save()
+        self.counting.set_state(guild_id, last_number, last_user_id)
 
     def get_counting_mistakes(self, user_id: int):
-        if 'counting_mistakes' not in self.data:
-            self.data['counting_mistakes'] = {}
-        return self.data['counting_mistakes'].get(str(user_id), 0)
+        return self.counting.mistakes.get(user_id, 0)
 
     def increment_counting_mistakes(self, user_id: int):
-        if 'counting_mistakes' not in self.data:
-            self.data['counting_mistakes'] = {}
-        current = self.data['counting_mistakes'].get(str(user_id), 0)
-        self.data['counting_mistakes'][str(user_id)] = current + 1
-        self.save()
-        return current + 1
+        return self.counting.add_mistake(user_id)
 
     def reset_counting_mistakes(self, user_id: int):
-        if 'counting_mistakes' not in self.data:
-            self.data['counting_mistakes'] = {}
-        self.data['counting_mistakes'][str(user_id)] = 0
-        self.save()
+        self.counting.reset_mistakes(user_id)
 
+    # Counting cooldowns and lockouts live in the expiry wheel; getters return seconds remaining
     def get_counting_cooldown(self, user_id: int):
-        if 'counting_cooldowns' not in self.data:
-            self.data['counting_cooldowns'] = {}
-        return self.data['counting_cooldowns'].get(str(user_id))
-
-    def set_counting_cooldown(self, user_id: int, cooldown_until: str):
-        if 'counting_cooldowns' not in self.data:
-            self.data['counting_cooldowns'] = {}
-        self.data['counting_cooldowns'][str(user_id)] = {'cooldown_until': cooldown_until}
-        self.save()
+        return self.expiries.remaining('counting_cooldown', user_id)
+
+    def set_counting_cooldown(self, user_id: int, seconds: float):
+        self.expiries.set('counting_cooldown', user_id, seconds)
 
     def get_counting_lockout(self, user_id: int):
-        if 'counting_lockouts' not in self.data:
-            self.data['counting_lockouts'] = {}
-        return self.data['counting_lockouts'].get(str(user_id))
-
-    def set_counting_lockout(self, user_id: int, lockout_until: str):
-        if 'counting_lockouts' not in self.data:
-            self.data['counting_lockouts'] = {}
-        self.data['counting_lockouts'][str(user_id)] = {'lockout_until': lockout_until}
+        return self.expiries.remaining('counting_lockout', user_id)
+
+    def set_counting_lockout(self, user_id: int, seconds: float):
+        self.expiries.set('counting_lockout', user_id, seconds)
         self.save()
 
     def clear_counting_lockout(self, user_id: int):
-        if 'counting_lockouts' not in self.data:
-            self.data['counting_lockouts'] = {}
-        if str(user_id) in self.data['counting_lockouts']:
-            del self.data['counting_lockouts'][str(user_id)]
+        if self.expiries.cancel('counting_lockout', user_id):
             self.save()
 
     # Lock system for preventing race conditions
     def is_locked(self, lock_key: str):
-        if 'locks' not in self.data:
-            self.data['locks'] = {}
-        lock_data = self.data['locks'].get(lock_key)
-        if lock_data:
-            expires_at = datetime.fromisoformat(lock_data['expires_at'])
-            if datetime.utcnow() < expires_at:
-                return True
-            else:
-                del self.data['locks'][lock_key]
-                self.save()
-        return False
+        return self.expiries.active('lock', lock_key)
 
     def set_lock(self, lock_key: str, duration_seconds: int):
-        if 'locks' not in self.data:
-            self.data['locks'] = {}
-        expires_at = datetime.utcnow() + timedelta(seconds=duration_seconds)
-        self.data['locks'][lock_key] = {'expires_at': expires_at.isoformat()}
-        self.save()
+        self.expiries.set('lock', lock_key, duration_seconds)
 
     def release_lock(self, lock_key: str):
-        if 'locks' not in self.data:
-            self.data['locks'] = {}
-        if lock_key in self.data['locks']:
-            del self.data['locks'][lock_key]
-            self.save()
+        self.expiries.cancel('lock', lock_key)
 
     def get_open_ticket(self, guild_id: int, user_id: int):
         if 'tickets' not in self.data:
@@ -537,6 +742,7 @@ class Database:
             'timestamp': datetime.utcnow().isoformat()
         }
         self.save()
+        self._index_bug_report(bug_id)
         return bug_id
     
     def update_bug_status(self, bug_id: str, status: str):
@@ -545,6 +751,7 @@ class Database:
         if bug_id in self.data['bug_reports']:
             self.data['bug_reports'][bug_id]['status'] = status
             self.save()
+            self._index_bug_report(bug_id)
             return True
         return False
     
@@ -565,12 +772,23 @@ class Database:
         user_key = str(user_id)
         if user_key not in self.data['staff_notes']:
             self.data['staff_notes'][user_key] = []
-        self.data['staff_notes'][user_key].append({
+        entry = {
+            'id': self._next_staff_note_id(),
             'note': note,
             'staff_id': staff_id,
             'timestamp': datetime.utcnow().isoformat()
-        })
+        }
+        self.data['staff_notes'][user_key].append(entry)
         self.save()
+        self._index_staff_note(user_key, entry)
+    
+    def _next_staff_note_id(self):
+        """Notes get ids from a persisted counter, so search documents don't depend on list positions"""
+        if 'staff_note_next_id' not in self.data:
+            self.data['staff_note_next_id'] = 1
+        note_id = self.data['staff_note_next_id']
+        self.data['staff_note_next_id'] += 1
+        return note_id
     
     def get_staff_notes(self, user_id: int):
         if 'staff_notes' not in self.data:
@@ -591,6 +809,7 @@ class Database:
             'timestamp': datetime.utcnow().isoformat()
         }
         self.save()
+        self._index_mod_case(case_id)
         return case_id
     
     def get_mod_case(self, case_id: int):
@@ -604,22 +823,18 @@ class Database:
         if str(case_id) in self.data['moderation_cases']:
             self.data['moderation_cases'][str(case_id)]['reason'] = new_reason
             self.save()
+            self._index_mod_case(case_id)
             return True
         return False
     
     # Economy System
     def get_balance(self, guild_id: int, user_id: int):
-        if 'economy' not in self.data:
-            self.data['economy'] = {'balances': {}, 'transactions': [], 'shop_items': {}}
-        key = f"{guild_id}:{user_id}"
-        return self.data['economy']['balances'].get(key, 0)
+        return self.stats.get(guild_id, user_id, 'balance')
     
     def add_balance(self, guild_id: int, user_id: int, amount: int):
         if 'economy' not in self.data:
-            self.data['economy'] = {'balances': {}, 'transactions': [], 'shop_items': {}}
-        key = f"{guild_id}:{user_id}"
-        current = self.data['economy']['balances'].get(key, 0)
-        self.data['economy']['balances'][key] = current + amount
+            self.data['economy'] = {'transactions': [], 'shop_items': {}}
+        balance = self.stats.add(guild_id, user_id, 'balance', amount)
         self.data['economy']['transactions'].append({
             'user_id': user_id,
             'guild_id': guild_id,
@@ -628,16 +843,14 @@ class Database:
             'timestamp': datetime.utcnow().isoformat()
         })
         self.save()
-        return self.data['economy']['balances'][key]
+        return balance
     
     def remove_balance(self, guild_id: int, user_id: int, amount: int):
         if 'economy' not in self.data:
-            self.data['economy'] = {'balances': {}, 'transactions': [], 'shop_items': {}}
-        key = f"{guild_id}:{user_id}"
-        current = self.data['economy']['balances'].get(key, 0)
-        if current < amount:
+            self.data['economy'] = {'transactions': [], 'shop_items': {}}
+        if self.stats.get(guild_id, user_id, 'balance') < amount:
             return False
-        self.data['economy']['balances'][key] = current - amount
+        self.stats.add(guild_id, user_id, 'balance', -amount)
         self.data['economy']['transactions'].append({
             'user_id': user_id,
             'guild_id': guild_id,
@@ -650,19 +863,12 @@ class Database:
     
     # Voice Activity Tracking
     def add_voice_time(self, guild_id: int, user_id: int, minutes: int):
-        if 'voice_activity' not in self.data:
-            self.data['voice_activity'] = {}
-        key = f"{guild_id}:{user_id}"
-        if key not in self.data['voice_activity']:
-            self.data['voice_activity'][key] = {'total_minutes': 0, 'last_joined': None}
-        self.data['voice_activity'][key]['total_minutes'] += minutes
+        total = self.stats.add(guild_id, user_id, 'voice_minutes', minutes)
+        self.leaderboards.update('voice', guild_id, user_id, total)
         self.save()
     
     def get_voice_time(self, guild_id: int, user_id: int):
-        if 'voice_activity' not in self.data:
-            return 0
-        key = f"{guild_id}:{user_id}"
-        return self.data['voice_activity'].get(key, {}).get('total_minutes', 0)
+        return self.stats.get(guild_id, user_id, 'voice_minutes')
     
     # Deleted/Edited Messages for Snipe
     def add_deleted_message(self, message_data: dict):
@@ -722,7 +928,7 @@ class Database:
     def add_reminder(self, user_id: int, channel_id: int, message: str, remind_at: datetime):
         if 'reminders' not in self.data:
             self.data['reminders'] = {}
-        reminder_id = str(len(self.data['reminders']) + 1)
+        reminder_id = str(self._next_reminder_id())
         self.data['reminders'][reminder_id] = {
             'user_id': user_id,
             'channel_id': channel_id,
@@ -734,26 +940,40 @@ class Database:
         self.save()
         return reminder_id
     
+    def _seed_reminder_ids(self):
+        """Ids come from a persisted counter so they stay unique after reminders are archived"""
+        if 'reminder_next_id' not in self.data:
+            existing = [int(rid) for rid in self.data.get('reminders', {}) if rid.isdigit()]
+            self.data['reminder_next_id'] = max(existing, default=0) + 1
+    
+    def _next_reminder_id(self):
+        self._seed_reminder_ids()
+        reminder_id = self.data['reminder_next_id']
+        self.data['reminder_next_id'] += 1
+        return reminder_id
+    
+    def get_reminder(self, reminder_id: str):
+        return self.data.get('reminders', {}).get(reminder_id)
+    
     def get_pending_reminders(self):
-        if 'reminders' not in self.data:
-            return []
-        now = datetime.utcnow()
-        pending = []
-        for reminder_id, reminder in self.data['reminders'].items():
-            if not reminder['completed']:
-                remind_at = datetime.fromisoformat(reminder['remind_at'])
-                if remind_at <= now:
-                    pending.append({'id': reminder_id, **reminder})
-        return pending
-    
-    def complete_reminder(self, reminder_id: str):
-        if 'reminders' not in self.data:
+        """Every reminder still waiting to fire; delivered ones live in the archive"""
+        return [{'id': reminder_id, **reminder} for reminder_id, reminder in self.data.get('reminders', {}).items()]
+    
+    def complete_reminder(self, reminder_id: str, status: str = 'completed'):
+        reminder = self.data.get('reminders', {}).pop(reminder_id, None)
+        if reminder is None:
             return False
-        if reminder_id in self.data['reminders']:
-            self.data['reminders'][reminder_id]['completed'] = True
-            self.save()
-            return True
-        return False
+        self._archive_reminders({reminder_id: reminder}, status)
+        self.save()
+        return True
+    
+    def _archive_reminders(self, reminders, status):
+        os.makedirs(os.path.dirname(self.reminder_archive_path), exist_ok=True)
+        finished_at = datetime.utcnow().isoformat()
+        with open(self.reminder_archive_path, 'a', encoding='utf-8') as f:
+            for reminder_id, reminder in reminders.items():
+                entry = {'id': reminder_id, **reminder, 'completed': True, 'status': status, 'finished_at': finished_at}
+                f.write(json.dumps(entry) + '\n')
     
     # User Contributions Tracking
     def increment_contribution(self, user_id: int, contribution_type: str):
@@ -768,6 +988,7 @@ class Database:
             }
         if contribution_type in self.data['user_contributions'][user_key]:
             self.data['user_contributions'][user_key][contribution_type] += 1
+        self.leaderboards.update('contributions', 0, user_id, sum(self.data['user_contributions'][user_key].values()))
         self.save()
     
     def get_contributions(self, user_id: int):
@@ -778,63 +999,29 @@ class Database:
     def get_top_contributors(self, limit: int = 10):
         if 'user_contributions' not in self.data:
             return []
-        sorted_contributors = sorted(
-            self.data['user_contributions'].items(),
-            key=lambda x: sum(x[1].values()),
-            reverse=True
-        )
-        return sorted_contributors[:limit]
+        contributions = self.data['user_contributions']
+        return [
+            (str(member_id), contributions[str(member_id)])
+            for _, member_id, _ in self.leaderboards.get('contributions').top(limit)
+        ]
     
     # Analytics System
+    # Counters only; the time series store is written with the next save
     def track_command_usage(self, command_name: str):
-        if 'analytics' not in self.data:
-            self.data['analytics'] = {'command_usage': {}, 'daily_messages': {}, 'ticket_stats': {}}
-        if 'command_usage' not in self.data['analytics']:
-            self.data['analytics']['command_usage'] = {}
-        
-        current_count = self.data['analytics']['command_usage'].get(command_name, 0)
-        self.data['analytics']['command_usage'][command_name] = current_count + 1
-        self.save()
+        self.analytics.record_command(command_name)
     
-    def track_daily_message(self, guild_id: int):
-        if 'analytics' not in self.data:
-            self.data['analytics'] = {'command_usage': {}, 'daily_messages': {}, 'ticket_stats': {}}
-        if 'daily_messages' not in self.data['analytics']:
-            self.data['analytics']['daily_messages'] = {}
-        
-        today = datetime.utcnow().date().isoformat()
-        guild_key = str(guild_id)
-        
-        if guild_key not in self.data['analytics']['daily_messages']:
-            self.data['analytics']['daily_messages'][guild_key] = {}
-        
-        current_count = self.data['analytics']['daily_messages'][guild_key].get(today, 0)
-        self.data['analytics']['daily_messages'][guild_key][today] = current_count + 1
-        self.save()
+    def track_daily_message(self, guild_id: int, channel_id: int):
+        self.analytics.record_message(guild_id, channel_id)
     
     # Counting Leaderboard
     def increment_count_contribution(self, user_id: int):
-        if 'counting_contributions' not in self.data:
-            self.data['counting_contributions'] = {}
-        current = self.data['counting_contributions'].get(str(user_id), 0)
-        self.data['counting_contributions'][str(user_id)] = current + 1
-        self.save()
+        return self.counting.add_contribution(user_id)
     
     def get_counting_leaderboard(self, limit: int = 10):
-        if 'counting_contributions' not in self.data:
-            return []
-        sorted_users = sorted(
-            self.data['counting_contributions'].items(),
-            key=lambda x: x[1],
-            reverse=True
-        )
-        return sorted_users[:limit]
+        return [(str(member_id), count) for _, member_id, count in self.leaderboards.get('counting').top(limit)]
     
     def reset_counting_contributions(self):
-        if 'counting_contributions' not in self.data:
-            self.data['counting_contributions'] = {}
-        self.data['counting_contributions'] = {}
-        self.save()
+        self.counting.reset_contributions()
     
     # Auto-Moderation Logging
     def log_automod_action(self, guild_id: int, user_id: int, action: str, reason: str, duration = None):
@@ -857,6 +1044,27 @@ class Database:
         
         self.save()
     
+    def log_automod_actions(self, entries):
+        """Log several automod actions with a single save"""
+        if 'automod_logs' not in self.data:
+            self.data['automod_logs'] = []
+        
+        timestamp = datetime.utcnow().isoformat()
+        for entry in entries:
+            self.data['automod_logs'].append({
+                'guild_id': entry['guild_id'],
+                'user_id': entry['user_id'],
+                'action': entry['action'],
+                'reason': entry['reason'],
+                'duration': entry.get('duration'),
+                'timestamp': timestamp
+            })
+        
+        if len(self.data['automod_logs']) > 1000:
+            self.data['automod_logs'] = self.data['automod_logs'][-1000:]
+        
+        self.save()
+    
     # AI Memory System
     def add_ai_memory_message(self, user_id: int, username: str, channel_id: int, content: str, guild_id: int):
         if 'ai_memory' not in self.data:
@@ -912,6 +1120,7 @@ class Database:
     
     def set_ai_ops_status(self, enabled: bool):
         self.data['config']['ai_ops_enabled'] = enabled
+        self.config.publish(self.data['config'])
         self.save()
     
     # Ticket AI State Management
@@ -931,4 +1140,16 @@ class Database:
             return
         if str(channel_id) in self.data['ticket_ai_state']:
             del self.data['ticket_ai_state'][str(channel_id)]
-            self.save()
\ No newline at end of file
+            self.save()
+    # Milestone Role Sync Jobs
+    def get_milestone_sync_state(self, guild_id: int):
+        """Mutable job state for a guild's milestone sync; an empty dict when no job is recorded"""
+        if 'milestone_sync' not in self.data:
+            self.data['milestone_sync'] = {}
+        return self.data['milestone_sync'].setdefault(str(guild_id), {})
+
+    def get_unfinished_milestone_syncs(self):
+        return {
+            int(guild_id): state for guild_id, state in self.data.get('milestone_sync', {}).items()
+            if state.get('remaining')
+        }
@@ -0,0 +1,137 @@
+"""
+Domain Blocklist
+Known phishing/scam domains held as a Bloom filter over a sorted array of 64-bit hashes
+"""
+import asyncio
+import hashlib
+import os
+import time
+from array import array
+from bisect import bisect_left
+
+
+def domain_hash(domain):
+    return int.from_bytes(hashlib.blake2b(domain.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def parse_domain(line):
+    """Accepts plain lists and hosts-file lines ('0.0.0.0 evil.com'); returns None for comments/blank lines"""
+    line = line.split('#', 1)[0].strip().lower()
+    if not line:
+        return None
+    parts = line.split()
+    domain = parts[-1].strip('.')
+    if domain.startswith('www.'):
+        domain = domain[4:]
+    if domain in ('localhost', '0.0.0.0', '127.0.0.1') or '.' not in domain:
+        return None
+    return domain
+
+
+class BlocklistTable:
+    """Immutable lookup table; a reload builds a new one and swaps it in"""
+
+    BITS_PER_ENTRY = 10   # ~1% false-positive rate with 7 probes
+    PROBES = 7
+
+    def __init__(self, domains):
+        hashes = sorted({domain_hash(domain) for domain in domains})
+        self.hashes = array('Q', hashes)
+        self.size = max(64, len(hashes) * self.BITS_PER_ENTRY)
+        self.bits = bytearray((self.size + 7) // 8)
+        for value in hashes:
+            for position in self._positions(value):
+                self.bits[position >> 3] |= 1 << (position & 7)
+
+    def _positions(self, value):
+        # Double hashing from the two 32-bit halves of the domain hash
+        first, second = value >> 32, value & 0xFFFFFFFF | 1
+        return [(first + probe * second) % self.size for probe in range(self.PROBES)]
+
+    def might_contain(self, value):
+        bits, size = self.bits, self.size
+        first, second = value >> 32, value & 0xFFFFFFFF | 1
+        for probe in range(self.PROBES):
+            position = (first + probe * second) % size
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def contains(self, value):
+        index = bisect_left(self.hashes, value)
+        return index < len(self.hashes) and self.hashes[index] == value
+
+    def __len__(self):
+        return len(self.hashes)
+
+
+class DomainBlocklist:
+    """Checks hosts (and their parent domains) against a blocklist file that can be reloaded in the background"""
+
+    def __init__(self, path='blocklist.txt'):
+        self.path = path
+        self.table = BlocklistTable(())
+        self.mtime = None
+        self.reloading = False
+        self.stats = {'lookups': 0, 'bloom_hits': 0, 'blocked': 0, 'lookup_ns': 0}
+
+    def load(self):
+        """Blocking load, for startup"""
+        self.table, self.mtime = self._build()
+
+    async def reload(self, force=False):
+        """Rebuild in a worker thread if the file changed; lookups keep using the old table meanwhile"""
+        if self.reloading:
+            return False
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return False
+        if not force and mtime == self.mtime:
+            return False
+
+        self.reloading = True
+        try:
+            self.table, self.mtime = await asyncio.to_thread(self._build)
+        finally:
+            self.reloading = False
+        print(f"Domain blocklist loaded: {len(self.table)} domains")
+        return True
+
+    def _build(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+            with open(self.path, 'r', encoding='utf-8', errors='ignore') as f:
+                domains = [domain for domain in map(parse_domain, f) if domain]
+        except OSError:
+            return BlocklistTable(()), None
+        return BlocklistTable(domains), mtime
+
+    def is_blocked(self, host):
+        """True if the host or any parent domain is listed ('a.evil.com' matches 'evil.com')"""
+        table = self.table
+        if not len(table):
+            return False
+        start = time.perf_counter_ns()
+        self.stats['lookups'] += 1
+
+        labels = host.lower().rstrip('.').split('.')
+        blocked = False
+        for index in range(len(labels) - 1):
+            value = domain_hash('.'.join(labels[index:]))
+            if table.might_contain(value):
+                self.stats['bloom_hits'] += 1
+                if table.contains(value):
+                    blocked = True
+                    break
+
+        if blocked:
+            self.stats['blocked'] += 1
+        self.stats['lookup_ns'] += time.perf_counter_ns() - start
+        return blocked
+
+    def average_lookup_ns(self):
+        return self.stats['lookup_ns'] / self.stats['lookups'] if self.stats['lookups'] else 0
+
+    def __len__(self):
+        return len(self.table)
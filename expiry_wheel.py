@@ -0,0 +1,184 @@
+"""
+Expiry Wheel
+Hierarchical timing wheel for cooldowns, lockouts and other temporary state, with expiry callbacks
+"""
+import asyncio
+import math
+import time
+
+SLOT_BITS = 6
+SLOTS = 1 << SLOT_BITS      # 64 slots per level
+SLOT_MASK = SLOTS - 1
+LEVELS = 5                  # at one-second ticks the top level reaches ~34 years
+MAX_DELTA = (1 << (SLOT_BITS * LEVELS)) - 1
+
+
+class ExpiryWheel:
+    """Entries are (kind, key) pairs expiring at an integer tick of the monotonic clock.
+
+    Checks are a dict lookup; inserting and cancelling touch one slot. Each tick processes one
+    level-0 slot, and a higher level's slot is cascaded down whenever the level below wraps.
+    """
+
+    def __init__(self, resolution=1.0):
+        self.resolution = resolution
+        self.origin = time.monotonic()
+        self.current = 0            # last tick processed
+        self.wheels = [[set() for _ in range(SLOTS)] for _ in range(LEVELS)]
+        self.entries = {}           # (kind, key) -> [expires, payload, level, slot]
+        self.callbacks = {}         # kind -> [callback(key, payload), ...]
+        self._task = None
+
+    def now(self):
+        return int((time.monotonic() - self.origin) / self.resolution)
+
+    def __len__(self):
+        return len(self.entries)
+
+    # Wheel maintenance
+    def _place(self, ident, entry, earliest=1):
+        # Cascading runs before the current tick's slot is processed, so it may place into that slot
+        delta = min(max(entry[0] - self.current, earliest), MAX_DELTA)
+        target = self.current + delta
+        level = 0
+        while delta >= SLOTS and level < LEVELS - 1:
+            delta >>= SLOT_BITS
+            level += 1
+        slot = (target >> (SLOT_BITS * level)) & SLOT_MASK
+        entry[2], entry[3] = level, slot
+        self.wheels[level][slot].add(ident)
+
+    def _unplace(self, ident, entry):
+        self.wheels[entry[2]][entry[3]].discard(ident)
+
+    def _cascade(self, level):
+        slot = (self.current >> (SLOT_BITS * level)) & SLOT_MASK
+        bucket = self.wheels[level][slot]
+        self.wheels[level][slot] = set()
+        for ident in bucket:
+            self._place(ident, self.entries[ident], earliest=0)
+
+    def advance(self, to_tick=None):
+        """Process ticks up to `to_tick` (default: now); returns [(kind, key, payload), ...] that expired"""
+        to_tick = self.now() if to_tick is None else to_tick
+        expired = []
+        while self.current < to_tick:
+            self.current += 1
+            # Cascade from the highest level that wrapped down to level 1
+            levels = 0
+            while levels < LEVELS - 1 and (self.current >> (SLOT_BITS * levels)) & SLOT_MASK == 0:
+                levels += 1
+            for level in range(levels, 0, -1):
+                self._cascade(level)
+
+            slot = self.current & SLOT_MASK
+            bucket = self.wheels[0][slot]
+            if not bucket:
+                continue
+            self.wheels[0][slot] = set()
+            for ident in bucket:
+                entry = self.entries[ident]
+                if entry[0] <= self.current:
+                    del self.entries[ident]
+                    expired.append((ident[0], ident[1], entry[1]))
+                else:
+                    self._place(ident, entry)
+        return expired
+
+    # Public API
+    def set(self, kind, key, seconds, payload=None):
+        """(Re)start an expiry `seconds` from now"""
+        ident = (kind, key)
+        previous = self.entries.get(ident)
+        if previous:
+            self._unplace(ident, previous)
+        entry = [self.now() + math.ceil(seconds / self.resolution), payload, 0, 0]
+        self.entries[ident] = entry
+        self._place(ident, entry)
+
+    def cancel(self, kind, key):
+        entry = self.entries.pop((kind, key), None)
+        if entry is None:
+            return False
+        self._unplace((kind, key), entry)
+        return True
+
+    def active(self, kind, key):
+        entry = self.entries.get((kind, key))
+        return entry is not None and entry[0] > self.now()
+
+    def remaining(self, kind, key):
+        """Seconds until the entry expires, 0 when it is not active"""
+        entry = self.entries.get((kind, key))
+        if entry is None:
+            return 0
+        return max(0, entry[0] - self.now()) * self.resolution
+
+    def payload(self, kind, key):
+        entry = self.entries.get((kind, key))
+        return entry[1] if entry else None
+
+    def keys(self, kind):
+        return [key for entry_kind, key in self.entries if entry_kind == kind]
+
+    def on_expire(self, kind, callback):
+        """Register callback(key, payload), sync or async, for a kind's expiries"""
+        self.callbacks.setdefault(kind, []).append(callback)
+
+    def remove_callback(self, kind, callback):
+        if callback in self.callbacks.get(kind, []):
+            self.callbacks[kind].remove(callback)
+
+    def fire(self, expired):
+        for kind, key, payload in expired:
+            for callback in list(self.callbacks.get(kind, [])):
+                try:
+                    result = callback(key, payload)
+                    if asyncio.iscoroutine(result):
+                        asyncio.get_running_loop().create_task(self._await(kind, key, result))
+                except Exception as e:
+                    print(f"Expiry callback error for {kind} {key}: {e}")
+
+    async def _await(self, kind, key, coroutine):
+        try:
+            await coroutine
+        except Exception as e:
+            print(f"Expiry callback error for {kind} {key}: {e}")
+
+    # Timer
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            delay = self.origin + (self.current + 1) * self.resolution - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.fire(self.advance())
+
+    # Persistence
+    def checkpoint(self):
+        """Active entries as remaining seconds against wall time, since monotonic time does not survive restarts"""
+        now = self.now()
+        return {
+            'saved_at': time.time(),
+            'entries': [
+                [kind, key, (entry[0] - now) * self.resolution, entry[1]]
+                for (kind, key), entry in self.entries.items() if entry[0] > now
+            ]
+        }
+
+    def restore(self, state):
+        """Load a checkpoint; entries that lapsed while offline expire on the first tick"""
+        if not state:
+            return 0
+        elapsed = max(0, time.time() - state.get('saved_at', time.time()))
+        for kind, key, remaining, payload in state.get('entries', []):
+            self.set(kind, key, max(0, remaining - elapsed), payload)
+        return len(state.get('entries', []))
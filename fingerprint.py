@@ -0,0 +1,123 @@
+"""
+Content Fingerprints
+SimHash clustering of near-identical messages across accounts for raid-wave detection
+"""
+import hashlib
+import re
+import time
+from collections import OrderedDict
+
+MENTION_PATTERN = re.compile(r'<[@#][!&]?\d+>|<a?:\w+:\d+>')
+WORD_PATTERN = re.compile(r'\w+')
+
+
+def normalize(content):
+    """Lowercase, drop mentions/custom emoji and punctuation so trivial variations collapse"""
+    content = MENTION_PATTERN.sub(' ', content.lower())
+    return WORD_PATTERN.findall(content)
+
+
+def _feature_hash(feature):
+    return int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def simhash(tokens):
+    """64-bit SimHash over word bigrams (single words for very short messages)"""
+    features = [' '.join(tokens[i:i + 2]) for i in range(len(tokens) - 1)] or tokens
+    weights = [0] * 64
+    for feature in features:
+        value = _feature_hash(feature)
+        for bit in range(64):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    fingerprint = 0
+    for bit in range(64):
+        if weights[bit] > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+class Cluster:
+    __slots__ = ('fingerprint', 'authors', 'messages', 'actioned', 'alerted')
+
+    def __init__(self, fingerprint):
+        self.fingerprint = fingerprint
+        self.authors = OrderedDict()  # author_id -> last seen (monotonic)
+        self.messages = []            # recent (author_id, message) pairs not yet acted on
+        self.actioned = set()         # authors already punished for this wave
+        self.alerted = False          # staff were told about a wave from established accounts
+
+    def drain(self):
+        """Take the queued messages so the caller can clean them up"""
+        messages, self.messages = self.messages, []
+        return messages
+
+
+class FingerprintIndex:
+    """Bounded LRU of SimHash clusters per guild, bucketed by LSH bands for O(1) lookups"""
+
+    BANDS = 4             # 4 x 16-bit bands: fingerprints within Hamming distance 3 share a band
+    MAX_DISTANCE = 3
+
+    def __init__(self, window=30, author_threshold=5, min_tokens=4, max_clusters=5000, max_messages=100):
+        self.window = window
+        self.author_threshold = author_threshold
+        self.min_tokens = min_tokens
+        self.max_clusters = max_clusters
+        self.max_messages = max_messages
+        self.guilds = {}  # guild_id -> (clusters OrderedDict, bands dict)
+
+    def _bands(self, fingerprint):
+        return [(band, fingerprint >> (band * 16) & 0xFFFF) for band in range(self.BANDS)]
+
+    def observe(self, guild_id, author_id, content, message=None, now=None):
+        """Record a message; returns its Cluster once enough distinct accounts posted near-identical content"""
+        tokens = normalize(content)
+        if len(tokens) < self.min_tokens:
+            return None
+        now = time.monotonic() if now is None else now
+        fingerprint = simhash(tokens)
+
+        clusters, bands = self.guilds.setdefault(guild_id, (OrderedDict(), {}))
+        cutoff = now - self.window
+
+        # Clusters are kept in last-activity order, so stale ones sit at the front
+        while clusters:
+            oldest = next(iter(clusters.values()))
+            if oldest.authors and next(reversed(oldest.authors.values())) >= cutoff:
+                break
+            self._evict(clusters, bands)
+
+        cluster = None
+        for band in self._bands(fingerprint):
+            candidate = clusters.get(bands.get(band))
+            if candidate and bin(candidate.fingerprint ^ fingerprint).count('1') <= self.MAX_DISTANCE:
+                cluster = candidate
+                break
+
+        if cluster is None:
+            cluster = Cluster(fingerprint)
+            clusters[fingerprint] = cluster
+            for band in self._bands(fingerprint):
+                bands[band] = fingerprint
+            while len(clusters) > self.max_clusters:
+                self._evict(clusters, bands)
+        else:
+            clusters.move_to_end(cluster.fingerprint)
+
+        # Time decay: accounts only count while they posted within the window
+        while cluster.authors and next(iter(cluster.authors.values())) < cutoff:
+            cluster.authors.popitem(last=False)
+        cluster.authors[author_id] = now
+        cluster.authors.move_to_end(author_id)
+        cluster.messages.append((author_id, message))
+        del cluster.messages[:-self.max_messages]
+
+        if len(cluster.authors) >= self.author_threshold:
+            return cluster
+        return None
+
+    def _evict(self, clusters, bands):
+        fingerprint, _ = clusters.popitem(last=False)
+        for band in self._bands(fingerprint):
+            if bands.get(band) == fingerprint:
+                del bands[band]
@@ -0,0 +1,183 @@
+"""
+Leaderboards
+Indexable skip lists per (metric, guild) with O(log n) updates, rank, top-K and around-me queries
+"""
+import random
+
+MAX_LEVEL = 24
+
+
+class _Node:
+    __slots__ = ('key', 'member_id', 'score', 'next', 'width')
+
+    def __init__(self, key, member_id, score, level):
+        self.key = key                  # (-score, member_id): highest score first, ties by member id
+        self.member_id = member_id
+        self.score = score
+        self.next = [None] * level
+        self.width = [1] * level        # nodes skipped by each forward link
+
+
+class Leaderboard:
+    """Scores for one metric, kept in rank order"""
+
+    def __init__(self):
+        self.head = _Node(None, None, None, MAX_LEVEL)
+        self.level = 1
+        self.scores = {}                # member_id -> score
+        self.random = random.Random()
+
+    def __len__(self):
+        return len(self.scores)
+
+    def __contains__(self, member_id):
+        return member_id in self.scores
+
+    def _random_level(self):
+        level = 1
+        while level < MAX_LEVEL and self.random.random() < 0.25:
+            level += 1
+        return level
+
+    def _search(self, key):
+        """Predecessor nodes at every level plus the rank (0-based) reached at each"""
+        update = [None] * MAX_LEVEL
+        ranks = [0] * MAX_LEVEL
+        node = self.head
+        position = 0
+        for level in range(self.level - 1, -1, -1):
+            while node.next[level] is not None and node.next[level].key < key:
+                position += node.width[level]
+                node = node.next[level]
+            update[level] = node
+            ranks[level] = position
+        return update, ranks
+
+    def set(self, member_id, score):
+        """Insert or move a member; a score of 0 or less removes them"""
+        if member_id in self.scores:
+            if self.scores[member_id] == score:
+                return
+            self.remove(member_id)
+        if score <= 0:
+            return
+
+        key = (-score, member_id)
+        update, ranks = self._search(key)
+        level = self._random_level()
+        if level > self.level:
+            for extra in range(self.level, level):
+                update[extra] = self.head
+                ranks[extra] = 0
+                self.head.width[extra] = len(self.scores)
+            self.level = level
+
+        node = _Node(key, member_id, score, level)
+        position = ranks[0]
+        for index in range(level):
+            predecessor = update[index]
+            node.next[index] = predecessor.next[index]
+            predecessor.next[index] = node
+            node.width[index] = predecessor.width[index] - (position - ranks[index])
+            predecessor.width[index] = position - ranks[index] + 1
+        for index in range(level, self.level):
+            update[index].width[index] += 1
+
+        self.scores[member_id] = score
+
+    def add(self, member_id, amount):
+        self.set(member_id, self.scores.get(member_id, 0) + amount)
+
+    def remove(self, member_id):
+        score = self.scores.pop(member_id, None)
+        if score is None:
+            return
+        key = (-score, member_id)
+        update, _ = self._search(key)
+        target = update[0].next[0]
+        for index in range(self.level):
+            predecessor = update[index]
+            if predecessor.next[index] is target:
+                predecessor.width[index] += target.width[index] - 1
+                predecessor.next[index] = target.next[index]
+            else:
+                predecessor.width[index] -= 1
+        while self.level > 1 and self.head.next[self.level - 1] is None:
+            self.level -= 1
+
+    def rank(self, member_id):
+        """1-based rank, or None when the member has no score"""
+        score = self.scores.get(member_id)
+        if score is None:
+            return None
+        _, ranks = self._search((-score, member_id))
+        return ranks[0] + 1
+
+    def _node_at(self, index):
+        """Node at 0-based rank `index`"""
+        node = self.head
+        remaining = index + 1
+        for level in range(self.level - 1, -1, -1):
+            while node.next[level] is not None and node.width[level] <= remaining:
+                remaining -= node.width[level]
+                node = node.next[level]
+        return node
+
+    def range(self, start, count):
+        """(rank, member_id, score) for `count` entries from 0-based rank `start`"""
+        if start >= len(self.scores) or count <= 0:
+            return []
+        node = self._node_at(max(start, 0))
+        entries = []
+        rank = max(start, 0) + 1
+        while node is not None and len(entries) < count:
+            entries.append((rank, node.member_id, node.score))
+            node = node.next[0]
+            rank += 1
+        return entries
+
+    def top(self, count=10):
+        return self.range(0, count)
+
+    def around(self, member_id, radius=2):
+        """The member's entry with up to `radius` neighbours on each side"""
+        rank = self.rank(member_id)
+        if rank is None:
+            return []
+        start = max(0, rank - 1 - radius)
+        return self.range(start, rank - start + radius)
+
+    def snapshot(self):
+        """[(member_id, score), ...] in rank order"""
+        return [(member_id, score) for _, member_id, score in self.range(0, len(self.scores))]
+
+    @classmethod
+    def from_snapshot(cls, items):
+        board = cls()
+        for member_id, score in items:
+            board.set(member_id, score)
+        return board
+
+
+class Leaderboards:
+    """Registry of boards per (metric, guild); each is rebuilt from the store the first time it is used"""
+
+    def __init__(self, loader):
+        self.loader = loader            # loader(metric, guild_id) -> iterable of (member_id, score)
+        self.boards = {}
+
+    def get(self, metric, guild_id=0):
+        key = (metric, guild_id)
+        board = self.boards.get(key)
+        if board is None:
+            board = self.boards[key] = Leaderboard.from_snapshot(self.loader(metric, guild_id))
+        return board
+
+    def update(self, metric, guild_id, member_id, score):
+        """Keep an already-built board current; unbuilt boards pick the change up from the store"""
+        board = self.boards.get((metric, guild_id))
+        if board is not None:
+            board.set(member_id, score)
+
+    def reset(self, metric, guild_id=0):
+        self.boards.pop((metric, guild_id), None)
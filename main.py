@@ -3,6 +3,7 @@ from discord.ext import commands, tasks
 import asyncio
 import sys
 from config import Config
+from write_scheduler import WriteScheduler, get_scheduler
 
 intents = discord.Intents.default()
 intents.members = True
@@ -23,9 +24,9 @@ class SpiritualBattlegroundsBot(commands.Bot):
             case_insensitive=True
         )
         self.config = Config
-        self.cooldowns = {}
         self.target_voice_channel_id = 1394796103941095475
         self.presence_watchdog_running = False
+        self.write_scheduler = WriteScheduler()
     
     async def on_voice_state_update(self, member, before, after):
         if member == self.user:
@@ -54,7 +55,9 @@ class SpiritualBattlegroundsBot(commands.Bot):
     async def setup_hook(self):
         print("Loading cogs...")
         cogs = [
+            'cogs.dispatch',
             'cogs.stats',
+            'cogs.analytics',
             'cogs.verification',
             'cogs.tickets_new',
             'cogs.moderation',
@@ -70,6 +73,7 @@ class SpiritualBattlegroundsBot(commands.Bot):
             'cogs.utilities',
             'cogs.staff_tools',
             'cogs.automod',
+            'cogs.anti_raid',
             'cogs.modlogs'
         ]
         
@@ -100,17 +104,15 @@ class SpiritualBattlegroundsBot(commands.Bot):
     
     async def set_streaming_presence(self):
         """Set the bot's streaming presence"""
-        try:
-            await self.change_presence(
-                status=discord.Status.online,
-                activity=discord.Activity(
-                    type=discord.ActivityType.streaming,
-                    name="Spiritual Battleground",
-                    url="https://twitch.tv/spiritualbattlegrounds"
-                )
+        await get_scheduler(self).change_presence(
+            self,
+            discord.Status.online,
+            discord.Activity(
+                type=discord.ActivityType.streaming,
+                name="Spiritual Battleground",
+                url="https://twitch.tv/spiritualbattlegrounds"
             )
-        except Exception as e:
-            print(f"Error setting presence: {e}")
+        )
     
     @tasks.loop(minutes=5)
     async def presence_watchdog(self):
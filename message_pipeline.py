@@ -0,0 +1,192 @@
+"""
+Message Pipeline
+One on_message dispatch: per-message features computed once, handlers routed by channel and run in order
+"""
+import time
+from database import Database
+from rate_tracker import ChannelActivityTracker
+
+# Dispatch overhead (features + routing, excluding handlers) above this is reported
+OVERHEAD_BUDGET_NS = 200_000
+
+
+class MessageFeatures:
+    """Everything handlers commonly derive from a message, computed once"""
+
+    __slots__ = ('message', 'content', 'lower', 'role_ids', 'mention_ids', 'role_mention_ids',
+                 'channel_id', 'category_id', 'kind', 'speakers', 'config')
+
+    def __init__(self, message, kind, speakers, config):
+        self.message = message
+        self.content = message.content
+        self.lower = message.content.strip().lower()
+        self.role_ids = frozenset(role.id for role in getattr(message.author, 'roles', ()))
+        self.mention_ids = frozenset(user.id for user in message.mentions)
+        self.role_mention_ids = frozenset(role.id for role in message.role_mentions)
+        self.channel_id = message.channel.id
+        self.category_id = getattr(message.channel, 'category_id', None)
+        self.kind = kind      # 'counting', 'suggestions', 'bugs', 'ticket' or 'general'
+        self.speakers = speakers  # distinct human speakers in the channel recently, this author included
+        self.config = config  # ConfigSnapshot current at dispatch time
+
+    @property
+    def mention_count(self):
+        return len(self.message.mentions) + len(self.message.role_mentions)
+
+
+class Route:
+    __slots__ = ('name', 'handler', 'order', 'channels', 'categories', 'exclude',
+                 'include_bots', 'guild_only', 'resolved')
+
+    def __init__(self, name, handler, order, channels, categories, exclude, include_bots, guild_only):
+        self.name = name
+        self.handler = handler
+        self.order = order
+        self.channels = channels      # callable(config) -> channel ids, None for every channel
+        self.categories = categories  # callable(config) -> category ids, None for every category
+        self.exclude = exclude        # callable(config) -> channel ids to skip
+        self.include_bots = include_bots
+        self.guild_only = guild_only
+        self.resolved = (None, None, frozenset())
+
+    def resolve(self, config):
+        def ids(source):
+            return None if source is None else frozenset(i for i in source(config) if i)
+        self.resolved = (ids(self.channels), ids(self.categories), ids(self.exclude) or frozenset())
+
+    def matches(self, channel_id, category_id):
+        channels, categories, exclude = self.resolved
+        if channel_id in exclude:
+            return False
+        if channels is not None and categories is not None:
+            return channel_id in channels or category_id in categories
+        if channels is not None:
+            return channel_id in channels
+        if categories is not None:
+            return category_id in categories
+        return True
+
+
+class MessagePipeline:
+    """Routing table of (channel, category) -> ordered handlers; a handler returning True stops the rest"""
+
+    def __init__(self, config_service):
+        self.routes = {}
+        self.table = {}   # (channel_id, category_id) -> tuple of Routes
+        self.kinds = {}   # channel_id -> kind
+        self.ticket_categories = frozenset()
+        self.reserved = set()  # channels parked in a category they don't belong to yet, e.g. ticket pool channels
+        self.activity = ChannelActivityTracker(window=300)
+        self._on_config_change(config_service.subscribe(self._on_config_change))
+        self.stats = {'messages': 0, 'overhead_ns': 0, 'max_overhead_ns': 0, 'over_budget': 0}
+        self.handler_stats = {}  # route name -> [calls, total_ns, errors]
+
+    def register(self, name, handler, order, channels=None, categories=None, exclude=None,
+                 include_bots=False, guild_only=True):
+        """Add handler(message, features); channel filters are callables of the ConfigSnapshot"""
+        route = Route(name, handler, order, channels, categories, exclude, include_bots, guild_only)
+        route.resolve(self.config)
+        self.routes[name] = route
+        self.handler_stats.setdefault(name, [0, 0, 0])
+        self.table.clear()
+
+    def unregister(self, name):
+        if self.routes.pop(name, None):
+            self.table.clear()
+
+    def reserve(self, channel_id):
+        """Route a channel as if it had no category, and never classify it as a ticket"""
+        self.reserved.add(channel_id)
+        self.table.clear()
+
+    def release(self, channel_id):
+        if channel_id in self.reserved:
+            self.reserved.discard(channel_id)
+            self.table.clear()
+
+    def _on_config_change(self, config):
+        self.config = config
+        for route in self.routes.values():
+            route.resolve(config)
+        self.kinds = {
+            channel_id: kind for kind, channel_id in (
+                ('bugs', config.bug_channel),
+                ('suggestions', config.suggestion_channel),
+                ('counting', config.counting_channel)
+            ) if channel_id
+        }
+        self.ticket_categories = frozenset((config.ticket_categories or {}).values())
+        self.table.clear()
+
+    def handlers_for(self, channel_id, category_id):
+        if channel_id in self.reserved:
+            category_id = None
+        key = (channel_id, category_id)
+        routes = self.table.get(key)
+        if routes is None:
+            routes = tuple(sorted(
+                (route for route in self.routes.values() if route.matches(channel_id, category_id)),
+                key=lambda route: route.order
+            ))
+            self.table[key] = routes
+        return routes
+
+    def kind_of(self, channel_id, category_id):
+        kind = self.kinds.get(channel_id)
+        if kind:
+            return kind
+        if channel_id in self.reserved:
+            return 'general'
+        return 'ticket' if category_id in self.ticket_categories else 'general'
+
+    async def dispatch(self, message):
+        start = time.perf_counter_ns()
+        channel_id = message.channel.id
+        category_id = getattr(message.channel, 'category_id', None)
+        routes = self.handlers_for(channel_id, category_id)
+        is_bot = message.author.bot
+        in_guild = message.guild is not None
+        speakers = 0
+        if in_guild and not is_bot:
+            speakers = self.activity.record(channel_id, message.author.id)
+        routes = [
+            route for route in routes
+            if (route.include_bots or not is_bot) and (in_guild or not route.guild_only)
+        ]
+        if not routes:
+            return
+
+        features = MessageFeatures(message, self.kind_of(channel_id, category_id), speakers, self.config)
+        self._record_overhead(time.perf_counter_ns() - start)
+
+        for route in routes:
+            handler_start = time.perf_counter_ns()
+            stats = self.handler_stats[route.name]
+            stats[0] += 1
+            try:
+                stop = await route.handler(message, features)
+            except Exception as e:
+                stats[2] += 1
+                print(f"Message handler '{route.name}' error: {e}")
+                stop = False
+            stats[1] += time.perf_counter_ns() - handler_start
+            if stop:
+                break
+
+    def _record_overhead(self, elapsed):
+        self.stats['messages'] += 1
+        self.stats['overhead_ns'] += elapsed
+        if elapsed > self.stats['max_overhead_ns']:
+            self.stats['max_overhead_ns'] = elapsed
+        if elapsed > OVERHEAD_BUDGET_NS:
+            self.stats['over_budget'] += 1
+            if self.stats['over_budget'] % 100 == 1:
+                print(f"Message pipeline overhead {elapsed / 1000:.0f}us exceeds {OVERHEAD_BUDGET_NS / 1000:.0f}us budget")
+
+
+def get_pipeline(bot):
+    """The bot-wide MessagePipeline (created on first use)"""
+    pipeline = getattr(bot, 'message_pipeline', None)
+    if pipeline is None:
+        pipeline = bot.message_pipeline = MessagePipeline(Database().config)
+    return pipeline
@@ -0,0 +1,173 @@
+"""
+Milestone Sync
+Diff earned milestone roles against members' actual roles and apply the changes at a paced rate
+"""
+import asyncio
+import time
+from datetime import datetime
+import discord
+from write_scheduler import PRIORITY_COSMETIC
+
+RETRY = 'retry'
+
+
+def resolve_milestone_roles(guild, milestone_roles):
+    """{level: role} for the milestone roles that exist in the guild, matched by name in one pass"""
+    wanted = {info['name']: level for level, info in milestone_roles.items()}
+    resolved = {}
+    for role in guild.roles:
+        level = wanted.get(role.name)
+        if level is not None and level not in resolved:
+            resolved[level] = role
+    return resolved
+
+
+class MilestoneChange:
+    __slots__ = ('member_id', 'add', 'remove')
+
+    def __init__(self, member_id, add, remove):
+        self.member_id = member_id
+        self.add = add          # role ids to grant
+        self.remove = remove    # role ids to take away
+
+
+def plan_changes(guild, levels, roles_by_level, member_ids=None, remove_unearned=False):
+    """Minimal per-member role changes so each member holds exactly the milestones their level earns.
+
+    `levels` maps member id -> level. Unearned milestone roles are only removed when asked, since
+    staff may hand them out manually.
+    """
+    milestone_ids = frozenset(role.id for role in roles_by_level.values())
+    thresholds = sorted((level, role.id) for level, role in roles_by_level.items())
+    members = guild.members if member_ids is None else filter(None, map(guild.get_member, member_ids))
+
+    changes = []
+    for member in members:
+        if member.bot:
+            continue
+        level = levels.get(member.id, 1)
+        earned = {role_id for threshold, role_id in thresholds if level >= threshold}
+        held = milestone_ids.intersection(role.id for role in member.roles)
+        add = earned - held
+        remove = held - earned if remove_unearned else set()
+        if add or remove:
+            changes.append(MilestoneChange(member.id, add, remove))
+    return changes
+
+
+class MilestoneSyncJob:
+    """Applies a change set one member at a time through the write scheduler, one role edit per request.
+
+    Progress lives in `state` (a dict in the database), so an interrupted job resumes from the
+    members it had not reached yet.
+    """
+
+    CHECKPOINT_EVERY = 25
+    MAX_RETRIES = 5
+
+    def __init__(self, guild, changes, scheduler, state, save, remove_unearned=False):
+        self.guild = guild
+        self.scheduler = scheduler
+        self.state = state
+        self.save = save
+        self.changes = {change.member_id: change for change in changes}
+        if not state.get('remaining'):
+            state.update({
+                'remaining': list(self.changes),
+                'total': len(self.changes),
+                'done': 0,
+                'failed': 0,
+                'skipped': 0,
+                'remove_unearned': remove_unearned,
+                'started_at': datetime.utcnow().isoformat()
+            })
+        self.started = time.monotonic()
+        self.retries = {}   # member id -> rate-limited attempts
+        self.task = None
+
+    @property
+    def running(self):
+        return self.task is not None and not self.task.done()
+
+    @property
+    def remaining(self):
+        return len(self.state['remaining'])
+
+    def progress(self):
+        total = self.state['total'] or 1
+        handled = self.state['done'] + self.state['failed'] + self.state['skipped']
+        elapsed = time.monotonic() - self.started
+        rate = handled / elapsed if elapsed and handled else 0
+        eta = self.remaining / rate if rate else None
+        return {
+            'total': self.state['total'],
+            'done': self.state['done'],
+            'failed': self.state['failed'],
+            'skipped': self.state['skipped'],
+            'remaining': self.remaining,
+            'percent': int(handled * 100 / total),
+            'eta': eta
+        }
+
+    def start(self):
+        if not self.running:
+            self.task = asyncio.create_task(self.run())
+        return self.task
+
+    async def run(self):
+        remaining = self.state['remaining']
+        since_checkpoint = 0
+        while remaining:
+            member_id = remaining[0]
+            change = self.changes.get(member_id)
+            member = self.guild.get_member(member_id)
+            if change and member:
+                result = await self._apply(member, change)
+                if result is RETRY and self.retries.get(member_id, 0) < self.MAX_RETRIES:
+                    # Rate limited: the route is already paused, so try this member again later
+                    self.retries[member_id] = self.retries.get(member_id, 0) + 1
+                    remaining.append(member_id)
+                elif result is True:
+                    self.state['done'] += 1
+                else:
+                    self.state['failed'] += 1
+            else:
+                # Left the guild, or already in sync when a resumed job re-planned
+                self.state['skipped'] += 1
+            remaining.pop(0)
+
+            since_checkpoint += 1
+            if since_checkpoint >= self.CHECKPOINT_EVERY:
+                since_checkpoint = 0
+                self.save()
+        self.state['finished_at'] = datetime.utcnow().isoformat()
+        self.save()
+
+    async def _apply(self, member, change):
+        """Grant and remove only this member's milestone roles; returns True, False or RETRY"""
+        route = f"member_roles:{self.guild.id}"
+        add = [role for role in map(self.guild.get_role, change.add) if role]
+        remove = [role for role in map(self.guild.get_role, change.remove) if role]
+        results = await asyncio.gather(*(
+            self.scheduler.submit(route, lambda role=role, grant=grant: self._edit_role(route, member, role, grant), PRIORITY_COSMETIC)
+            for roles, grant in ((add, True), (remove, False)) for role in roles
+        ))
+        if RETRY in results:
+            return RETRY
+        return all(result is not None for result in results)
+
+    async def _edit_role(self, route, member, role, grant):
+        # Checked when the write runs, not when it was queued, so other role changes in between are kept
+        if (member.get_role(role.id) is None) != grant:
+            return True
+        try:
+            if grant:
+                await member.add_roles(role, reason="Milestone role sync")
+            else:
+                await member.remove_roles(role, reason="Milestone role sync")
+        except discord.HTTPException as e:
+            if e.status != 429:
+                raise
+            self.scheduler.throttle(route, getattr(e, 'retry_after', None) or 5)
+            return RETRY
+        return True
@@ -0,0 +1,130 @@
+"""
+Raid Detector
+Join-burst detection over fixed-size ring buffers: join rate, account ages and name patterns
+"""
+import re
+import time
+from array import array
+from collections import Counter, deque
+
+# Account-age histogram buckets (upper bounds in seconds); the last bucket is everything older
+AGE_BUCKETS = (3600, 86400, 7 * 86400, 30 * 86400)
+YOUNG_AGE = 7 * 86400     # accounts (or joins) newer than this count as young
+
+SKELETON_DIGITS = re.compile(r'\d+')
+SKELETON_REPEATS = re.compile(r'(.)\1+')
+
+
+def name_skeleton(name):
+    """Collapse a username to its pattern, e.g. 'Raider_0192' and 'raider__77' -> 'raider_#'"""
+    skeleton = SKELETON_DIGITS.sub('#', name.lower())
+    return SKELETON_REPEATS.sub(r'\1', skeleton)
+
+
+def age_bucket(age_seconds):
+    for index, bound in enumerate(AGE_BUCKETS):
+        if age_seconds < bound:
+            return index
+    return len(AGE_BUCKETS)
+
+
+class JoinRecord:
+    __slots__ = ('timestamp', 'member_id', 'skeleton', 'age')
+
+    def __init__(self, timestamp, member_id, skeleton, age):
+        self.timestamp = timestamp
+        self.member_id = member_id
+        self.skeleton = skeleton
+        self.age = age
+
+
+class JoinBurstDetector:
+    """Per-second ring buffers make every join and every threshold check constant time"""
+
+    def __init__(self, window=60, burst_window=10, burst_threshold=10,
+                 young_age=YOUNG_AGE, young_threshold=8, name_threshold=4, capacity=2048):
+        self.window = window
+        self.burst_window = burst_window
+        self.burst_threshold = burst_threshold
+        self.young_age = young_age
+        self.young_threshold = young_threshold
+        self.name_threshold = name_threshold
+
+        buckets = len(AGE_BUCKETS) + 1
+        self.stamps = array('q', [-1] * window)           # which second each slot currently holds
+        self.counts = array('I', [0] * window)            # joins per second
+        self.ages = array('I', [0] * (window * buckets))  # account-age histogram per second
+
+        self.recent = deque()                             # JoinRecords inside the window, oldest first
+        self.capacity = capacity
+        self.skeletons = Counter()
+
+    def _slot(self, second):
+        slot = second % self.window
+        if self.stamps[slot] != second:
+            self.stamps[slot] = second
+            self.counts[slot] = 0
+            base = slot * (len(AGE_BUCKETS) + 1)
+            for offset in range(len(AGE_BUCKETS) + 1):
+                self.ages[base + offset] = 0
+        return slot
+
+    def record(self, member_id, name, account_age, now=None):
+        """Record a join and return (JoinRecord, reasons) - reasons is empty unless a threshold is crossed"""
+        now = time.time() if now is None else now
+        second = int(now)
+
+        slot = self._slot(second)
+        self.counts[slot] += 1
+        self.ages[slot * (len(AGE_BUCKETS) + 1) + age_bucket(account_age)] += 1
+
+        cutoff = now - self.window
+        while self.recent and (self.recent[0].timestamp < cutoff or len(self.recent) >= self.capacity):
+            expired = self.recent.popleft()
+            self.skeletons[expired.skeleton] -= 1
+            if not self.skeletons[expired.skeleton]:
+                del self.skeletons[expired.skeleton]
+
+        entry = JoinRecord(now, member_id, name_skeleton(name), account_age)
+        self.recent.append(entry)
+        self.skeletons[entry.skeleton] += 1
+
+        reasons = []
+        burst = self.joins_within(self.burst_window, second)
+        if burst >= self.burst_threshold:
+            reasons.append(f"{burst} joins in {self.burst_window}s")
+        young = self.young_joins(second)
+        if young >= self.young_threshold:
+            reasons.append(f"{young} accounts younger than {self.young_age // 86400}d in {self.window}s")
+        if self.skeletons[entry.skeleton] >= self.name_threshold:
+            reasons.append(f"{self.skeletons[entry.skeleton]} similar names ({entry.skeleton})")
+        return entry, reasons
+
+    def joins_within(self, seconds, current_second):
+        return sum(
+            self.counts[slot] for slot in range(self.window)
+            if current_second - seconds < self.stamps[slot] <= current_second
+        )
+
+    def young_joins(self, current_second):
+        buckets = len(AGE_BUCKETS) + 1
+        young = [index for index, bound in enumerate(AGE_BUCKETS) if bound <= self.young_age]
+        total = 0
+        for slot in range(self.window):
+            if current_second - self.window < self.stamps[slot] <= current_second:
+                total += sum(self.ages[slot * buckets + index] for index in young)
+        return total
+
+    def age_histogram(self, current_second=None):
+        """Account-age counts across the window, one per AGE_BUCKETS entry plus 'older'"""
+        current_second = int(time.time()) if current_second is None else current_second
+        buckets = len(AGE_BUCKETS) + 1
+        histogram = [0] * buckets
+        for slot in range(self.window):
+            if current_second - self.window < self.stamps[slot] <= current_second:
+                for index in range(buckets):
+                    histogram[index] += self.ages[slot * buckets + index]
+        return histogram
+
+    def is_suspicious(self, entry):
+        return entry.age < self.young_age or self.skeletons.get(entry.skeleton, 0) >= self.name_threshold
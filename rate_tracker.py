@@ -0,0 +1,100 @@
+"""
+Rate Tracker
+Bounded sliding windows for spam detection and channel activity
+"""
+import time
+from collections import OrderedDict, deque
+
+
+class SlidingWindowTracker:
+    """Keeps each active user's last `capacity` (timestamp, content hash) pairs inside `window` seconds"""
+
+    def __init__(self, window, capacity):
+        self.window = window
+        self.capacity = capacity
+        self.users = OrderedDict()  # user_id -> deque, least recently active first
+
+    def record(self, user_id, content, now=None):
+        """Record a message and return (messages in window, copies of this content in window)"""
+        now = time.monotonic() if now is None else now
+        self._evict_idle(now)
+
+        entries = self.users.get(user_id)
+        if entries is None:
+            entries = self.users[user_id] = deque(maxlen=self.capacity)
+        else:
+            self.users.move_to_end(user_id)
+            cutoff = now - self.window
+            while entries and entries[0][0] <= cutoff:
+                entries.popleft()
+
+        digest = hash(content)
+        entries.append((now, digest))
+        duplicates = sum(1 for _, seen in entries if seen == digest)
+        return len(entries), duplicates
+
+    def reset(self, user_id):
+        self.users.pop(user_id, None)
+
+    def _evict_idle(self, now):
+        # Users are ordered by last activity, so only the front can be idle
+        cutoff = now - self.window
+        while self.users:
+            user_id, entries = next(iter(self.users.items()))
+            if entries and entries[-1][0] > cutoff:
+                break
+            self.users.popitem(last=False)
+
+    def __len__(self):
+        return len(self.users)
+
+
+class ChannelActivityTracker:
+    """Distinct human speakers per channel over the last `window` seconds"""
+
+    def __init__(self, window=300, capacity=200):
+        self.window = window
+        self.capacity = capacity
+        self.channels = OrderedDict()  # channel_id -> (deque of (timestamp, user_id), {user_id: count})
+
+    def record(self, channel_id, user_id, now=None):
+        """Record a message and return the number of distinct speakers in the window"""
+        now = time.monotonic() if now is None else now
+        self._evict_idle(now)
+
+        state = self.channels.get(channel_id)
+        if state is None:
+            state = self.channels[channel_id] = (deque(), {})
+        else:
+            self.channels.move_to_end(channel_id)
+        entries, counts = state
+
+        cutoff = now - self.window
+        while entries and (entries[0][0] <= cutoff or len(entries) >= self.capacity):
+            _, expired = entries.popleft()
+            counts[expired] -= 1
+            if not counts[expired]:
+                del counts[expired]
+
+        entries.append((now, user_id))
+        counts[user_id] = counts.get(user_id, 0) + 1
+        return len(counts)
+
+    def speakers(self, channel_id, now=None):
+        """Distinct speakers currently in the window (stale entries are ignored, not removed)"""
+        state = self.channels.get(channel_id)
+        if state is None:
+            return 0
+        cutoff = (time.monotonic() if now is None else now) - self.window
+        return len({user_id for timestamp, user_id in state[0] if timestamp > cutoff})
+
+    def _evict_idle(self, now):
+        cutoff = now - self.window
+        while self.channels:
+            entries, _ = next(iter(self.channels.values()))
+            if entries and entries[-1][0] > cutoff:
+                break
+            self.channels.popitem(last=False)
+
+    def __len__(self):
+        return len(self.channels)
@@ -0,0 +1,135 @@
+"""
+Deadline Scheduler
+Indexed min-heap of per-key deadlines driven by a single timer task
+"""
+import asyncio
+import time
+
+
+class DeadlineScheduler:
+    """Fires `callback(key)` once each key's deadline passes; rescheduling and cancelling are O(log n)"""
+
+    def __init__(self, callback, concurrency=5, name='scheduler'):
+        self.callback = callback
+        self.name = name
+        self._heap = []     # [(deadline, key), ...]
+        self._index = {}    # key -> position in _heap
+        self._wakeup = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._task = None
+        self._running = set()
+
+    # Heap maintenance
+    def _swap(self, i, j):
+        heap = self._heap
+        heap[i], heap[j] = heap[j], heap[i]
+        self._index[heap[i][1]] = i
+        self._index[heap[j][1]] = j
+
+    def _sift_up(self, i):
+        while i > 0:
+            parent = (i - 1) // 2
+            if self._heap[i][0] >= self._heap[parent][0]:
+                break
+            self._swap(i, parent)
+            i = parent
+
+    def _sift_down(self, i):
+        size = len(self._heap)
+        while True:
+            smallest = i
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < size and self._heap[child][0] < self._heap[smallest][0]:
+                    smallest = child
+            if smallest == i:
+                break
+            self._swap(i, smallest)
+            i = smallest
+
+    def _remove_at(self, i):
+        last = len(self._heap) - 1
+        if i != last:
+            self._swap(i, last)
+        deadline, key = self._heap.pop()
+        del self._index[key]
+        if i < len(self._heap):
+            self._sift_up(i)
+            self._sift_down(i)
+        return deadline, key
+
+    # Public API
+    def schedule(self, key, deadline):
+        """Set (or move) a key's deadline, given as a unix timestamp"""
+        position = self._index.get(key)
+        if position is None:
+            self._heap.append((deadline, key))
+            position = self._index[key] = len(self._heap) - 1
+        else:
+            self._heap[position] = (deadline, key)
+        self._sift_up(position)
+        self._sift_down(self._index[key])
+
+        if self._heap[0][1] == key:
+            self._wakeup.set()
+
+    def schedule_in(self, key, seconds):
+        self.schedule(key, time.time() + seconds)
+
+    def cancel(self, key):
+        position = self._index.get(key)
+        if position is None:
+            return False
+        was_next = position == 0
+        self._remove_at(position)
+        if was_next:
+            self._wakeup.set()
+        return True
+
+    def deadline(self, key):
+        position = self._index.get(key)
+        return self._heap[position][0] if position is not None else None
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __len__(self):
+        return len(self._heap)
+
+    # Timer
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        for task in list(self._running):
+            task.cancel()
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            delay = self._heap[0][0] - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            _, key = self._remove_at(0)
+            task = asyncio.create_task(self._fire(key))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _fire(self, key):
+        async with self._semaphore:
+            try:
+                await self.callback(key)
+            except Exception as e:
+                print(f"Error in {self.name} callback for {key}: {e}")
@@ -0,0 +1,412 @@
+"""
+Search Index
+Inverted full-text index over ticket transcripts and moderation history, ranked with BM25
+"""
+import heapq
+import json
+import math
+import os
+import re
+import threading
+import time
+import zlib
+from array import array
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+STOPWORDS = frozenset(
+    'a an and are as at be but by for from has have i if in is it its me my of on or so '
+    'that the this to was we were will with you your'.split()
+)
+
+
+def normalize(token):
+    """Fold simple plurals so that crashes matches crash and hacks matches hack"""
+    if len(token) > 4 and token.endswith('es') and token[-3] in 'hsxz':
+        return token[:-2]
+    if len(token) > 3 and token.endswith('s') and not token.endswith(('ss', 'us', 'is')):
+        return token[:-1]
+    return token
+
+
+def tokenize(text):
+    return [normalize(t) for t in TOKEN_PATTERN.findall((text or '').lower()) if t not in STOPWORDS]
+
+
+def encode_varint(value, out):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def decode_postings(data):
+    """Yield (doc_id, term_frequency) pairs from delta-encoded varint postings"""
+    doc_id = 0
+    value = shift = 0
+    pending_doc = None
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        if pending_doc is None:
+            doc_id += value
+            pending_doc = doc_id
+        else:
+            yield pending_doc, value
+            pending_doc = None
+        value = shift = 0
+
+
+class SearchIndex:
+    """Journal-backed inverted index; writers only append, readers replay lazily.
+
+    `compact` rewrites the journal with only live entries and saves a snapshot of the built index,
+    so a new process loads the snapshot and replays just the entries appended after it. Loading
+    and compaction are slow on a large index and belong in a worker thread.
+    """
+
+    K1 = 1.2
+    B = 0.75
+    SNIPPET_RADIUS = 80
+    STORED_TEXT_LIMIT = 4000
+    COMPACT_MIN_DEAD = 1000     # superseded entries before compaction is worth it
+    SNAPSHOT_EVERY = 2000       # entries replayed past the snapshot before saving a new one
+    WEIGHT_CACHE_SIZE = 512     # terms whose decoded postings are kept between searches
+
+    def __init__(self, directory='search', loader=None, journal_path=None):
+        self.directory = directory
+        os.makedirs(self.directory, exist_ok=True)
+        self.journal_path = journal_path or os.path.join(self.directory, 'journal.jsonl')
+        self.snapshot_path = os.path.join(self.directory, 'snapshot.z')
+        self.loader = loader
+        self.lock = threading.RLock()
+        self._reset()
+        self.generation = False     # journal generation loaded; False until the first refresh
+
+    def _reset(self):
+        self.postings = {}        # token -> bytearray of (delta doc id, tf) varints
+        self.last_doc = {}        # token -> last doc id appended to its postings
+        self.docs = []            # doc id -> document metadata
+        self.doc_lengths = array('I')
+        self.live = {}            # document key -> current doc id
+        self.total_length = 0
+        self._journal_position = 0
+        self._since_snapshot = 0
+        self._weights = {}        # term -> ((doc count, average length), doc ids, tf weights)
+
+    def exists(self):
+        return os.path.exists(self.journal_path)
+
+    def add(self, key, kind, ref, title, text, store_text=True):
+        """Index (or re-index) a document; later entries for the same key replace earlier ones"""
+        tokens = tokenize(f"{title} {text}")
+        frequencies = {}
+        for token in tokens:
+            frequencies[token] = frequencies.get(token, 0) + 1
+
+        entry = {
+            'key': key,
+            'kind': kind,
+            'ref': ref,
+            'title': title,
+            'length': len(tokens),
+            'terms': frequencies,
+            'indexed_at': time.time()
+        }
+        if store_text and text and len(text) <= self.STORED_TEXT_LIMIT:
+            entry['text'] = text
+
+        with self.lock:
+            with open(self.journal_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n')
+
+    def remove(self, key):
+        """Drop a document from results; the entry is discarded at the next compaction"""
+        with self.lock:
+            with open(self.journal_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({'key': key, 'deleted': True}, separators=(',', ':')) + '\n')
+
+    @staticmethod
+    def _generation_of(line):
+        # Compacted journals start with a generation header; older ones have none
+        if line.startswith(b'{"generation"'):
+            try:
+                return json.loads(line)['generation']
+            except ValueError:
+                pass
+        return None
+
+    def load(self):
+        """Bring the index up to date with the journal; the first call loads the snapshot"""
+        self._refresh()
+        return len(self.live)
+
+    def _refresh(self):
+        """Replay journal entries written since the last read (by this or another process)"""
+        with self.lock:
+            if not self.exists():
+                return
+            with open(self.journal_path, 'rb') as f:
+                header = f.readline()
+                generation = self._generation_of(header)
+                size = os.fstat(f.fileno()).st_size
+                if generation != self.generation or self._journal_position > size:
+                    # First load, or another process compacted the journal
+                    self._reset()
+                    self.generation = generation
+                    self._load_snapshot(size)
+                f.seek(self._journal_position)
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break
+                    self._journal_position += len(line)
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if 'key' in entry:
+                        self._apply(entry)
+                        self._since_snapshot += 1
+
+    def _apply(self, entry):
+        doc_id = len(self.docs)
+        previous = self.live.get(entry['key'])
+        if previous is not None:
+            self.total_length -= self.doc_lengths[previous]
+        if entry.get('deleted'):
+            self.live.pop(entry['key'], None)
+            return
+
+        self.docs.append({
+            'key': entry['key'],
+            'kind': entry['kind'],
+            'ref': entry['ref'],
+            'title': entry['title'],
+            'text': entry.get('text')
+        })
+        self.doc_lengths.append(entry['length'])
+        self.live[entry['key']] = doc_id
+        self.total_length += entry['length']
+
+        for token, frequency in entry['terms'].items():
+            data = self.postings.get(token)
+            if data is None:
+                data = self.postings[token] = bytearray()
+            encode_varint(doc_id - self.last_doc.get(token, 0), data)
+            encode_varint(frequency, data)
+            self.last_doc[token] = doc_id
+
+    # Snapshots and compaction
+    def _load_snapshot(self, journal_size):
+        try:
+            with open(self.snapshot_path, 'rb') as f:
+                snapshot = json.loads(zlib.decompress(f.read()))
+        except (OSError, ValueError, zlib.error):
+            return False
+        if snapshot.get('generation') != self.generation or snapshot['position'] > journal_size:
+            return False
+
+        self.docs = [
+            {'key': key, 'kind': kind, 'ref': ref, 'title': title, 'text': text}
+            for key, kind, ref, title, text in snapshot['docs']
+        ]
+        self.doc_lengths = array('I', snapshot['lengths'])
+        for doc_id, doc in enumerate(self.docs):
+            self.live[doc['key']] = doc_id
+        self.total_length = sum(self.doc_lengths[doc_id] for doc_id in self.live.values())
+        self.postings = {token: bytearray(data.encode('latin-1')) for token, data in snapshot['postings'].items()}
+        self.last_doc = snapshot['last_doc']
+        self._journal_position = snapshot['position']
+        return True
+
+    def save_snapshot(self):
+        """Write the built index and the journal position it covers"""
+        with self.lock:
+            self._refresh()
+            snapshot = {
+                'generation': self.generation,
+                'position': self._journal_position,
+                'docs': [[doc['key'], doc['kind'], doc['ref'], doc['title'], doc['text']] for doc in self.docs],
+                'lengths': self.doc_lengths.tolist(),
+                # Postings bytes map one-to-one onto latin-1 characters
+                'postings': {token: bytes(data).decode('latin-1') for token, data in self.postings.items()},
+                'last_doc': self.last_doc
+            }
+            self._since_snapshot = 0
+            payload = json.dumps(snapshot, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        temp_path = self.snapshot_path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(zlib.compress(payload, 6))
+        os.replace(temp_path, self.snapshot_path)
+
+    def dead_entries(self):
+        with self.lock:
+            return len(self.docs) - len(self.live)
+
+    def maintain(self):
+        """Load, then compact or snapshot when worthwhile; returns what was done"""
+        self._refresh()
+        dead = self.dead_entries()
+        if dead >= self.COMPACT_MIN_DEAD and dead >= len(self.live):
+            self.compact()
+            return 'compacted'
+        if self._since_snapshot >= self.SNAPSHOT_EVERY:
+            self.save_snapshot()
+            return 'snapshot'
+        return None
+
+    def compact(self):
+        """Rewrite the journal with only live entries, renumbering docs so postings hold no dead ids"""
+        with self.lock:
+            self._refresh()
+            live_ids = set(self.live.values())
+            position = self._journal_position
+        if not self.exists():
+            return 0
+
+        generation = f"{time.time_ns():x}"
+        temp_path = self.journal_path + '.compact'
+        doc_id = 0
+        with open(self.journal_path, 'rb') as source, open(temp_path, 'wb') as target:
+            target.write(json.dumps({'generation': generation}).encode('utf-8') + b'\n')
+            consumed = 0
+            for line in source:
+                consumed += len(line)
+                if consumed > position:
+                    break
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if 'key' not in entry or entry.get('deleted'):
+                    continue
+                if doc_id in live_ids:
+                    target.write(line)
+                doc_id += 1
+
+        # The rebuilt index is loaded here, off the lock, so searches keep using the old one meanwhile
+        fresh = SearchIndex(self.directory, self.loader, journal_path=temp_path)
+        fresh._refresh()
+
+        with self.lock:
+            # Entries appended since `position` carry over to the new journal
+            with open(self.journal_path, 'rb') as source:
+                source.seek(position)
+                tail = source.read()
+            tail = tail[:tail.rfind(b'\n') + 1]
+            if tail:
+                with open(temp_path, 'ab') as target:
+                    target.write(tail)
+                fresh._refresh()
+            os.replace(temp_path, self.journal_path)
+            for name in ('postings', 'last_doc', 'docs', 'doc_lengths', 'live', 'total_length', '_journal_position', 'generation'):
+                setattr(self, name, getattr(fresh, name))
+            self._since_snapshot = 0
+            self._weights = {}
+            removed = doc_id - len(live_ids)
+        self.save_snapshot()
+        return removed
+
+    def _term_weights(self, term, average_length):
+        """Live doc ids holding `term` and their BM25 tf weights, cached until the index or average length changes"""
+        version = (len(self.docs), round(average_length, 1))
+        cached = self._weights.get(term)
+        if cached and cached[0] == version:
+            return cached[1], cached[2]
+
+        doc_ids = array('I')
+        weights = array('d')
+        data = self.postings.get(term)
+        if data:
+            all_live = len(self.docs) == len(self.live)
+            k1, b = self.K1, self.B
+            for doc_id, tf in decode_postings(data):
+                if all_live or self._is_live(doc_id):
+                    norm = k1 * (1 - b + b * self.doc_lengths[doc_id] / average_length)
+                    doc_ids.append(doc_id)
+                    weights.append(tf * (k1 + 1) / (tf + norm))
+        if len(self._weights) >= self.WEIGHT_CACHE_SIZE:
+            self._weights.clear()
+        self._weights[term] = (version, doc_ids, weights)
+        return doc_ids, weights
+
+    def _is_live(self, doc_id):
+        return self.live.get(self.docs[doc_id]['key']) == doc_id
+
+    def search(self, query, kinds=None, limit=10):
+        """Return the top `limit` results as dicts with score, title, snippet and timing"""
+        started = time.perf_counter()
+        with self.lock:
+            return self._search(query, kinds, limit, started)
+
+    def _search(self, query, kinds, limit, started):
+        self._refresh()
+
+        terms = list(dict.fromkeys(tokenize(query)))
+        doc_count = len(self.live)
+        if not terms or not doc_count:
+            return {'results': [], 'total': 0, 'took_ms': 0.0}
+
+        average_length = self.total_length / doc_count
+        scores = {}
+        for term in terms:
+            doc_ids, weights = self._term_weights(term, average_length)
+            if kinds:
+                pairs = [(doc_id, weight) for doc_id, weight in zip(doc_ids, weights) if self.docs[doc_id]['kind'] in kinds]
+            else:
+                pairs = zip(doc_ids, weights)
+            matches = len(doc_ids) if not kinds else len(pairs)
+            if not matches:
+                continue
+            idf = math.log(1 + (doc_count - matches + 0.5) / (matches + 0.5))
+            if not scores:
+                scores = {doc_id: idf * weight for doc_id, weight in pairs}
+                continue
+            get = scores.get
+            for doc_id, weight in pairs:
+                scores[doc_id] = get(doc_id, 0.0) + idf * weight
+
+        top = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        results = []
+        for doc_id, score in top:
+            doc = self.docs[doc_id]
+            results.append({
+                'key': doc['key'],
+                'kind': doc['kind'],
+                'ref': doc['ref'],
+                'title': doc['title'],
+                'score': round(score, 3),
+                'snippet': self.snippet(doc, terms)
+            })
+
+        return {
+            'results': results,
+            'total': len(scores),
+            'took_ms': round((time.perf_counter() - started) * 1000, 2)
+        }
+
+    def snippet(self, doc, terms):
+        text = doc.get('text')
+        if text is None and self.loader:
+            try:
+                text = self.loader(doc['kind'], doc['ref'])
+            except Exception as e:
+                print(f"Error loading search snippet for {doc['key']}: {e}")
+        if not text:
+            return ''
+
+        pattern = re.compile(r'\b(' + '|'.join(re.escape(t) for t in terms) + r')(?:es|s)?\b', re.IGNORECASE)
+        match = pattern.search(text)
+        center = match.start() if match else 0
+        start = max(0, center - self.SNIPPET_RADIUS)
+        end = min(len(text), center + self.SNIPPET_RADIUS)
+
+        excerpt = ' '.join(text[start:end].split())
+        excerpt = pattern.sub(lambda m: f"**{m.group(0)}**", excerpt)
+        return f"{'…' if start else ''}{excerpt}{'…' if end < len(text) else ''}"
+
+    def __len__(self):
+        self._refresh()
+        return len(self.live)
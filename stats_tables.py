@@ -0,0 +1,225 @@
+"""
+Stats Tables
+Per-guild member stats as parallel typed columns with binary persistence and whole-column aggregates
+"""
+import bisect
+import os
+import struct
+import sys
+import time
+from array import array
+from datetime import datetime, timezone
+
+# (column, array typecode, default for new rows)
+COLUMNS = (
+    ('xp', 'q', 0),
+    ('level', 'i', 1),
+    ('voice_minutes', 'q', 0),
+    ('balance', 'q', 0),
+    ('last_message', 'd', 0.0)      # unix time of the last XP-earning message, 0 for never
+)
+DEFAULTS = {name: default for name, _, default in COLUMNS}
+
+MAGIC = b'GST1'
+GUILD_HEADER = struct.Struct('<QI')     # guild id, row count
+
+
+class GuildStatsTable:
+    """One guild's members: user id -> row index, plus one array per column"""
+
+    def __init__(self, guild_id):
+        self.guild_id = guild_id
+        self.user_ids = array('Q')
+        self.columns = {name: array(code) for name, code, _ in COLUMNS}
+        self.rows = {}
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    def __contains__(self, user_id):
+        return user_id in self.rows
+
+    def row(self, user_id):
+        """Row index for a member, adding a row of defaults the first time"""
+        index = self.rows.get(user_id)
+        if index is None:
+            index = self.rows[user_id] = len(self.user_ids)
+            self.user_ids.append(user_id)
+            for name, column in self.columns.items():
+                column.append(DEFAULTS[name])
+        return index
+
+    def get(self, user_id, column):
+        index = self.rows.get(user_id)
+        return DEFAULTS[column] if index is None else self.columns[column][index]
+
+    def set(self, user_id, column, value):
+        self.columns[column][self.row(user_id)] = value
+
+    def add(self, user_id, column, amount):
+        index = self.row(user_id)
+        values = self.columns[column]
+        values[index] += amount
+        return values[index]
+
+    def items(self, column):
+        """(user_id, value) for every member with a non-zero value"""
+        return [(user_id, value) for user_id, value in zip(self.user_ids, self.columns[column]) if value]
+
+    def total(self, column):
+        return sum(self.columns[column])
+
+    def count(self, column, minimum=1):
+        """Members whose value is at least `minimum`"""
+        return sum(1 for value in self.columns[column] if value >= minimum)
+
+    def percentiles(self, column, percents=(50, 90, 99)):
+        """{percent: value} by nearest rank, from one sort of the column"""
+        ordered = sorted(self.columns[column])
+        if not ordered:
+            return {percent: DEFAULTS[column] for percent in percents}
+        last = len(ordered) - 1
+        return {percent: ordered[min(last, int(percent / 100 * len(ordered)))] for percent in percents}
+
+    def histogram(self, column, edges):
+        """Counts per bucket [edges[i], edges[i + 1]), the last bucket open-ended"""
+        ordered = sorted(self.columns[column])
+        positions = [bisect.bisect_left(ordered, edge) for edge in edges] + [len(ordered)]
+        return [positions[i + 1] - positions[i] for i in range(len(edges))]
+
+    def _write(self, f):
+        f.write(GUILD_HEADER.pack(self.guild_id, len(self.user_ids)))
+        for values in (self.user_ids, *self.columns.values()):
+            if sys.byteorder == 'big':
+                values = array(values.typecode, values)
+                values.byteswap()
+            values.tofile(f)
+
+    @classmethod
+    def _read(cls, f):
+        guild_id, rows = GUILD_HEADER.unpack(f.read(GUILD_HEADER.size))
+        table = cls(guild_id)
+        for values in (table.user_ids, *table.columns.values()):
+            values.fromfile(f, rows)
+            if sys.byteorder == 'big':
+                values.byteswap()
+        table.rows = dict(zip(table.user_ids, range(rows)))
+        return table
+
+
+class StatsTables:
+    """All guilds' tables in one binary file, rewritten only when something changed"""
+
+    def __init__(self, directory='stats'):
+        self.directory = directory
+        os.makedirs(self.directory, exist_ok=True)
+        self.path = os.path.join(self.directory, 'members.bin')
+        self.backup_path = self.path + '.bak'
+        self.guilds = {}
+        self.dirty = False
+        self.read_only = False      # set when no readable file was found, so nothing gets overwritten
+        self.load()
+
+    def guild(self, guild_id):
+        table = self.guilds.get(guild_id)
+        if table is None:
+            table = self.guilds[guild_id] = GuildStatsTable(guild_id)
+        return table
+
+    def get(self, guild_id, user_id, column):
+        table = self.guilds.get(guild_id)
+        return DEFAULTS[column] if table is None else table.get(user_id, column)
+
+    def set(self, guild_id, user_id, column, value):
+        self.guild(guild_id).set(user_id, column, value)
+        self.dirty = True
+
+    def add(self, guild_id, user_id, column, amount):
+        self.dirty = True
+        return self.guild(guild_id).add(user_id, column, amount)
+
+    def _read_file(self, path):
+        guilds = {}
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError("not a stats table file")
+            guild_count, = struct.unpack('<I', f.read(4))
+            for _ in range(guild_count):
+                table = GuildStatsTable._read(f)
+                guilds[table.guild_id] = table
+        return guilds
+
+    def load(self):
+        """Load members.bin, falling back to the backup; a corrupt file is moved aside, never overwritten"""
+        failed = False
+        for path in (self.path, self.backup_path):
+            if not os.path.exists(path):
+                continue
+            try:
+                self.guilds = self._read_file(path)
+            except Exception as e:
+                print(f"Error loading stats tables from {path}: {e}")
+                failed = True
+                if path == self.path:
+                    corrupt_path = f"{self.path}.corrupt.{int(time.time())}"
+                    while os.path.exists(corrupt_path):
+                        corrupt_path += '_'
+                    os.replace(self.path, corrupt_path)
+                    print(f"Moved unreadable stats tables to {corrupt_path}")
+                continue
+            if path == self.backup_path:
+                print(f"Recovered stats tables from {path}")
+                self.dirty = True
+            return
+        if failed:
+            # Saving now would replace every member's stats with whatever is earned from here on
+            self.read_only = True
+            print("Stats tables are read-only until members.bin is restored")
+
+    def save(self):
+        if not self.dirty:
+            return
+        if self.read_only:
+            print("Stats tables not saved: the stats file could not be loaded")
+            return
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(MAGIC)
+            f.write(struct.pack('<I', len(self.guilds)))
+            for table in self.guilds.values():
+                table._write(f)
+        if os.path.exists(self.path):
+            os.replace(self.path, self.backup_path)
+        os.replace(temp_path, self.path)
+        self.dirty = False
+
+    def import_legacy(self, data):
+        """Move the old "guild:user" keyed dicts out of database.json; returns the rows imported"""
+        imported = 0
+
+        def split(key):
+            guild_id, user_id = key.split(':')
+            return int(guild_id), int(user_id)
+
+        for key, entry in data.pop('levels', {}).items():
+            guild_id, user_id = split(key)
+            table = self.guild(guild_id)
+            table.set(user_id, 'xp', entry.get('xp', 0))
+            table.set(user_id, 'level', entry.get('level', 1))
+            if entry.get('last_message'):
+                table.set(user_id, 'last_message', datetime.fromisoformat(entry['last_message']).replace(tzinfo=timezone.utc).timestamp())
+            imported += 1
+
+        for key, entry in data.pop('voice_activity', {}).items():
+            guild_id, user_id = split(key)
+            self.guild(guild_id).set(user_id, 'voice_minutes', entry.get('total_minutes', 0))
+            imported += 1
+
+        for key, balance in data.get('economy', {}).pop('balances', {}).items():
+            guild_id, user_id = split(key)
+            self.guild(guild_id).set(user_id, 'balance', balance)
+            imported += 1
+
+        if imported:
+            self.dirty = True
+        return imported
@@ -3,6 +3,63 @@ Ticket AI Configuration
 Comprehensive configuration for AI-powered ticket system
 Based on Spiritual Battlegrounds AI instruction document
 """
+import re
+
+
+class KeywordMatcher:
+    """Matches every keyword table in one regex pass over the message"""
+
+    def __init__(self, rules):
+        self.intents = {}
+        for intent, keywords in rules.items():
+            for keyword in keywords:
+                self.intents.setdefault(self.normalize(keyword), set()).add(intent)
+
+        # A match is the longest keyword at a position, so fold in keywords that are its prefixes
+        self.closure = {}
+        for keyword in self.intents:
+            intents = set()
+            for other, other_intents in self.intents.items():
+                if keyword.startswith(other) and (len(other) == len(keyword) or not self._is_word(keyword[len(other)])):
+                    intents |= other_intents
+            self.closure[keyword] = frozenset(intents)
+
+        self.pattern = re.compile(r'(?<!\w)(?=(' + self._trie_pattern(self.intents) + r')(?!\w))')
+
+    @staticmethod
+    def normalize(text):
+        return text.lower().replace('\u2019', "'")
+
+    @staticmethod
+    def _is_word(char):
+        return char.isalnum() or char == '_'
+
+    @classmethod
+    def _trie_pattern(cls, keywords):
+        # Shared prefixes keep the per-position cost bounded by keyword length, not keyword count
+        trie = {}
+        for keyword in keywords:
+            node = trie
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node[''] = {}
+        return cls._node_pattern(trie)
+
+    @classmethod
+    def _node_pattern(cls, node):
+        branches = [re.escape(char) + cls._node_pattern(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return '(?:' + body + ')?' if '' in node else body
+
+    def match(self, message):
+        """Return the set of every intent whose keywords appear in the message"""
+        found = set()
+        for match in self.pattern.finditer(self.normalize(message)):
+            found |= self.closure[match.group(1)]
+        return found
+
 
 class TicketAIConfig:
     # Channel IDs (Reference Map)
@@ -215,6 +272,66 @@ class TicketAIConfig:
         'max_warnings': 1
     }
     
+    # Intent precedence - the first matched intent decides how the AI reacts
+    INTENT_PRECEDENCE = [
+        'close_request',
+        'stop',
+        'resume',
+        'human_request',
+        'disallowed_topic',
+        'disrespect'
+    ]
+    
+    _matcher = None
+    
+    @classmethod
+    def intent_rules(cls):
+        """Keyword table per intent; each disallowed topic is its own 'disallowed_topic:<name>' rule"""
+        rules = {
+            'close_request': cls.CLOSE_REQUEST_KEYWORDS,
+            'stop': cls.STOP_KEYWORDS,
+            'resume': cls.RESUME_KEYWORDS,
+            'human_request': cls.HUMAN_REQUEST_KEYWORDS,
+            'disrespect': cls.DISRESPECT_KEYWORDS
+        }
+        for topic, data in cls.DISALLOWED_TOPICS.items():
+            rules[f'disallowed_topic:{topic}'] = data['keywords']
+        return rules
+    
+    @classmethod
+    def matcher(cls):
+        """Compiled matcher for every keyword table (built once, rebuilt after rule changes)"""
+        if cls._matcher is None:
+            cls._matcher = KeywordMatcher(cls.intent_rules())
+        return cls._matcher
+    
+    @classmethod
+    def reload_rules(cls):
+        cls._matcher = None
+    
+    @classmethod
+    def classify(cls, message):
+        """Return every intent in the message, e.g. {'stop', 'disallowed_topic', 'disallowed_topic:suggestions'}"""
+        intents = cls.matcher().match(message)
+        if any(intent.startswith('disallowed_topic:') for intent in intents):
+            intents.add('disallowed_topic')
+        return intents
+    
+    @classmethod
+    def primary_intent(cls, intents):
+        """Highest-precedence intent from a classify() result"""
+        for intent in cls.INTENT_PRECEDENCE:
+            if intent in intents:
+                return intent
+        return None
+    
+    @classmethod
+    def disallowed_redirect(cls, intents):
+        for topic, data in cls.DISALLOWED_TOPICS.items():
+            if f'disallowed_topic:{topic}' in intents:
+                return data['redirect']
+        return None
+    
     @classmethod
     def get_ticket_manager_ping(cls):
         """Get the Ticket Manager role mention"""
@@ -223,38 +340,29 @@ class TicketAIConfig:
     @classmethod
     def is_stop_command(cls, message):
         """Check if message contains stop command"""
-        msg_lower = message.lower().strip()
-        return any(keyword in msg_lower for keyword in cls.STOP_KEYWORDS)
+        return 'stop' in cls.classify(message)
     
     @classmethod
     def is_human_request(cls, message):
         """Check if message requests human support"""
-        msg_lower = message.lower().strip()
-        return any(keyword in msg_lower for keyword in cls.HUMAN_REQUEST_KEYWORDS)
+        return 'human_request' in cls.classify(message)
     
     @classmethod
     def is_disrespectful(cls, message):
         """Check if message contains disrespectful language"""
-        msg_lower = message.lower().strip()
-        return any(keyword in msg_lower for keyword in cls.DISRESPECT_KEYWORDS)
+        return 'disrespect' in cls.classify(message)
     
     @classmethod
     def is_resume_command(cls, message):
         """Check if message asks AI to resume"""
-        msg_lower = message.lower().strip()
-        return any(keyword in msg_lower for keyword in cls.RESUME_KEYWORDS)
+        return 'resume' in cls.classify(message)
     
     @classmethod
     def check_disallowed_topic(cls, message):
         """Check if message contains disallowed topic keywords"""
-        msg_lower = message.lower().strip()
-        for topic, data in cls.DISALLOWED_TOPICS.items():
-            if any(keyword in msg_lower for keyword in data['keywords']):
-                return data['redirect']
-        return None
+        return cls.disallowed_redirect(cls.classify(message))
     
     @classmethod
     def is_close_request(cls, message):
         """Check if message requests ticket closure"""
-        msg_lower = message.lower().strip()
-        return any(keyword in msg_lower for keyword in cls.CLOSE_REQUEST_KEYWORDS)
+        return 'close_request' in cls.classify(message)
@@ -0,0 +1,146 @@
+"""
+Ticket Archive
+Compressed, content-addressed cold storage for closed tickets and their transcripts
+"""
+import bisect
+import hashlib
+import json
+import os
+import zlib
+
+
+class TicketArchive:
+    """Append-only zlib segments with an offset index for closed tickets"""
+
+    SEGMENT_MAX_BYTES = 16 * 1024 * 1024
+
+    def __init__(self, directory='archive'):
+        self.directory = directory
+        os.makedirs(self.directory, exist_ok=True)
+        self.index_path = os.path.join(self.directory, 'index.jsonl')
+
+        self.entries = {}       # channel_id -> index entry
+        self.blobs = {}         # digest -> (segment, offset, length)
+        self.by_creator = {}    # creator_id -> [channel_id, ...]
+        self.by_closed_at = []  # sorted [(closed_at, channel_id), ...]
+        self._last_segment = 1
+        self._index_position = 0
+        self._refresh()
+
+    def _segment_path(self, segment):
+        return os.path.join(self.directory, f"segment-{segment:06d}.z")
+
+    def _current_segment(self):
+        segment = self._last_segment
+        path = self._segment_path(segment)
+        if os.path.exists(path) and os.path.getsize(path) >= self.SEGMENT_MAX_BYTES:
+            segment += 1
+        return segment
+
+    def _refresh(self):
+        """Apply index lines written since the last read (other Database instances share the files)"""
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, 'rb') as f:
+            f.seek(self._index_position)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                self._index_position += len(line)
+                try:
+                    self._apply(json.loads(line))
+                except ValueError:
+                    continue
+
+    def _apply(self, entry):
+        channel_id = str(entry['channel_id'])
+        previous = self.entries.get(channel_id)
+        if previous:
+            self._unindex(channel_id, previous)
+
+        self.entries[channel_id] = entry
+        self.blobs[entry['digest']] = (entry['segment'], entry['offset'], entry['length'])
+        self._last_segment = max(self._last_segment, entry['segment'])
+
+        creator = entry.get('creator')
+        if creator is not None:
+            self.by_creator.setdefault(str(creator), []).append(channel_id)
+        bisect.insort(self.by_closed_at, (entry.get('closed_at') or '', channel_id))
+
+    def _unindex(self, channel_id, entry):
+        creator = entry.get('creator')
+        if creator is not None and channel_id in self.by_creator.get(str(creator), []):
+            self.by_creator[str(creator)].remove(channel_id)
+        key = (entry.get('closed_at') or '', channel_id)
+        position = bisect.bisect_left(self.by_closed_at, key)
+        if position < len(self.by_closed_at) and self.by_closed_at[position] == key:
+            del self.by_closed_at[position]
+
+    def store(self, channel_id, record):
+        """Archive a ticket record; identical payloads are stored once"""
+        self._refresh()
+        payload = json.dumps(record, sort_keys=True, separators=(',', ':')).encode('utf-8')
+        digest = hashlib.sha256(payload).hexdigest()
+
+        if digest in self.blobs:
+            segment, offset, length = self.blobs[digest]
+        else:
+            compressed = zlib.compress(payload, 6)
+            segment = self._current_segment()
+            with open(self._segment_path(segment), 'ab') as f:
+                offset = f.tell()
+                f.write(compressed)
+            length = len(compressed)
+
+        ticket = record.get('ticket') or {}
+        entry = {
+            'channel_id': str(channel_id),
+            'digest': digest,
+            'segment': segment,
+            'offset': offset,
+            'length': length,
+            'creator': ticket.get('creator'),
+            'type': ticket.get('type'),
+            'created_at': ticket.get('created_at'),
+            'closed_at': ticket.get('closed_at')
+        }
+        with open(self.index_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, separators=(',', ':')) + '\n')
+        self._refresh()
+        return digest
+
+    def load(self, channel_id):
+        """Decompress and return the archived record for a ticket channel"""
+        entry = self.get_entry(channel_id)
+        if not entry:
+            return None
+        with open(self._segment_path(entry['segment']), 'rb') as f:
+            f.seek(entry['offset'])
+            compressed = f.read(entry['length'])
+        return json.loads(zlib.decompress(compressed))
+
+    def get_entry(self, channel_id):
+        self._refresh()
+        return self.entries.get(str(channel_id))
+
+    def find_by_creator(self, creator_id, limit=None):
+        """Index entries for a creator, newest first"""
+        self._refresh()
+        channel_ids = self.by_creator.get(str(creator_id), [])
+        entries = [self.entries[cid] for cid in reversed(channel_ids)]
+        return entries[:limit] if limit else entries
+
+    def find_by_date(self, start=None, end=None):
+        """Index entries closed between two ISO timestamps (inclusive); a date-only `end` covers that whole day"""
+        self._refresh()
+        low = bisect.bisect_left(self.by_closed_at, (start or '',))
+        # Suffixing '\uffff' sorts after every timestamp that starts with `end`, whatever its channel id
+        high = bisect.bisect_right(self.by_closed_at, ((end or '') + '\uffff',))
+        return [self.entries[cid] for _, cid in self.by_closed_at[low:high]]
+
+    def __contains__(self, channel_id):
+        return self.get_entry(channel_id) is not None
+
+    def __len__(self):
+        self._refresh()
+        return len(self.entries)
@@ -0,0 +1,74 @@
+"""
+Ticket Message Logs
+Append-only per-ticket conversation storage kept outside database.json
+"""
+import json
+import os
+
+
+class TicketMessageLog:
+    """Stores each ticket's conversation in its own JSONL file keyed by channel ID"""
+
+    BLOCK_SIZE = 4096
+
+    def __init__(self, directory='ticket_logs'):
+        self.directory = directory
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, ticket_id):
+        return os.path.join(self.directory, f"{ticket_id}.jsonl")
+
+    def append(self, ticket_id, entry):
+        """Append one message entry (a single write, independent of history size)"""
+        line = json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n'
+        with open(self._path(ticket_id), 'a', encoding='utf-8') as f:
+            f.write(line)
+
+    def tail(self, ticket_id, limit=10):
+        """Return the last `limit` entries, reading backwards from the end of the file"""
+        path = self._path(ticket_id)
+        if limit <= 0 or not os.path.exists(path):
+            return []
+
+        with open(path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            data = b''
+            # One extra newline guarantees the oldest returned line is complete
+            while position > 0 and data.count(b'\n') <= limit:
+                read_size = min(self.BLOCK_SIZE, position)
+                position -= read_size
+                f.seek(position)
+                data = f.read(read_size) + data
+
+        return self._parse_lines(data.splitlines()[-limit:])
+
+    def read_all(self, ticket_id):
+        """Return every entry for a ticket, oldest first"""
+        path = self._path(ticket_id)
+        if not os.path.exists(path):
+            return []
+        with open(path, 'rb') as f:
+            return self._parse_lines(f.read().splitlines())
+
+    def exists(self, ticket_id):
+        return os.path.exists(self._path(ticket_id))
+
+    def delete(self, ticket_id):
+        try:
+            os.remove(self._path(ticket_id))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _parse_lines(self, lines):
+        entries = []
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                # A torn final write should not hide the rest of the conversation
+                continue
+        return entries
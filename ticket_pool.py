@@ -0,0 +1,95 @@
+"""
+Ticket Channel Pool
+Hidden, pre-created channels per ticket category so opening a ticket is a single channel edit
+"""
+import asyncio
+import discord
+from collections import deque
+
+
+class TicketChannelPool:
+    """Keeps up to `size` reserved channels in each ticket category"""
+
+    POOL_NAME = 'ticket-pool'
+    POOL_TOPIC = 'Reserved ticket channel'
+    CREATE_INTERVAL = 3  # seconds between channel creations, well inside Discord's channel rate limit
+
+    def __init__(self, on_reserve=None, on_release=None):
+        self.available = {}  # category_id -> deque of channel ids
+        self.reserved = set()  # every unclaimed pool channel id; these are not tickets yet
+        self.on_reserve = on_reserve    # optional callback(channel_id) when a channel joins the pool
+        self.on_release = on_release    # optional callback(channel_id) when it is claimed or removed
+        self._lock = asyncio.Lock()
+
+    def _reserve(self, channel_id):
+        self.reserved.add(channel_id)
+        if self.on_reserve:
+            self.on_reserve(channel_id)
+
+    def _release(self, channel_id):
+        self.reserved.discard(channel_id)
+        if self.on_release:
+            self.on_release(channel_id)
+
+    def is_pool_channel(self, channel):
+        return getattr(channel, 'topic', None) == self.POOL_TOPIC and channel.name == self.POOL_NAME
+
+    def discover(self, guild, category_ids):
+        """Pick up reserved channels left over from a previous run"""
+        for category_id in category_ids:
+            category = guild.get_channel(category_id)
+            if not isinstance(category, discord.CategoryChannel):
+                continue
+            self.available[category_id] = deque(
+                channel.id for channel in category.text_channels if self.is_pool_channel(channel)
+            )
+            for channel_id in self.available[category_id]:
+                self._reserve(channel_id)
+
+    def claim(self, guild, category_id):
+        """Take a reserved channel from the category's pool, or None if it is empty"""
+        queue = self.available.get(category_id)
+        while queue:
+            channel_id = queue.popleft()
+            self._release(channel_id)
+            channel = guild.get_channel(channel_id)
+            if channel and self.is_pool_channel(channel):
+                return channel
+        return None
+
+    def count(self, category_id):
+        return len(self.available.get(category_id, ()))
+
+    async def refill(self, guild, category_ids, size):
+        """Top every category up to `size`, pacing creations; surplus channels are removed"""
+        if self._lock.locked():
+            return
+        async with self._lock:
+            for category_id in category_ids:
+                category = guild.get_channel(category_id)
+                if not isinstance(category, discord.CategoryChannel):
+                    continue
+                queue = self.available.setdefault(category_id, deque())
+
+                while len(queue) > size:
+                    channel_id = queue.pop()
+                    self._release(channel_id)
+                    channel = guild.get_channel(channel_id)
+                    if channel:
+                        await channel.delete(reason="Ticket pool shrunk")
+                        await asyncio.sleep(self.CREATE_INTERVAL)
+
+                while len(queue) < size:
+                    channel = await guild.create_text_channel(
+                        name=self.POOL_NAME,
+                        category=category,
+                        overwrites={
+                            guild.default_role: discord.PermissionOverwrite(read_messages=False),
+                            guild.me: discord.PermissionOverwrite(read_messages=True, send_messages=True)
+                        },
+                        topic=self.POOL_TOPIC,
+                        reason="Pre-provisioning ticket channel"
+                    )
+                    queue.append(channel.id)
+                    self._reserve(channel.id)
+                    await asyncio.sleep(self.CREATE_INTERVAL)
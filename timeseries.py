@@ -0,0 +1,212 @@
+"""
+Time Series
+Activity counters in minute buckets rolled up to hours and days, with retention and compact persistence
+"""
+import json
+import os
+import time
+import zlib
+from datetime import datetime, timezone
+
+# (name, bucket width in seconds, retention in seconds)
+RESOLUTIONS = (
+    ('minute', 60, 2 * 86400),
+    ('hour', 3600, 90 * 86400),
+    ('day', 86400, 5 * 365 * 86400)
+)
+RESOLUTION_INDEX = {name: index for index, (name, _, _) in enumerate(RESOLUTIONS)}
+
+# Queries without an explicit resolution pick the finest one that stays under this many points
+MAX_POINTS = 400
+
+
+class Series:
+    __slots__ = ('buckets', 'total')
+
+    def __init__(self):
+        self.buckets = tuple({} for _ in RESOLUTIONS)   # per resolution: bucket index -> count
+        self.total = 0                                  # lifetime count, kept past retention
+
+
+class TimeSeriesStore:
+    """Named counters such as "message:<guild>", "channel:<id>" and "command:<name>".
+
+    Recording only bumps a counter for the open minute; it is folded into the minute, hour and
+    day buckets of every series when the minute changes or a query needs it.
+    """
+
+    def __init__(self, directory='stats'):
+        self.directory = directory
+        os.makedirs(self.directory, exist_ok=True)
+        self.path = os.path.join(self.directory, 'timeseries.z')
+        self.series = {}
+        self.pending = {}           # key -> count for the open minute
+        self.pending_minute = None
+        self.dirty = False
+        self.loaded_mtime = 0
+        self.load()
+
+    def record(self, key, amount=1, now=None):
+        minute = int(time.time() if now is None else now) // 60
+        if minute != self.pending_minute:
+            self.rollup()
+            self.pending_minute = minute
+        self.pending[key] = self.pending.get(key, 0) + amount
+
+    def record_message(self, guild_id, channel_id, now=None):
+        self.record(f"message:{guild_id}", now=now)
+        self.record(f"channel:{channel_id}", now=now)
+
+    def record_command(self, name, now=None):
+        self.record(f"command:{name}", now=now)
+
+    def rollup(self):
+        """Fold the open minute's counters into every resolution"""
+        if not self.pending:
+            return
+        start = self.pending_minute * 60
+        indexes = [start // width for _, width, _ in RESOLUTIONS]
+        for key, count in self.pending.items():
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = Series()
+            for buckets, index in zip(series.buckets, indexes):
+                buckets[index] = buckets.get(index, 0) + count
+            series.total += count
+        self.pending = {}
+        self.dirty = True
+
+    def compact(self, now=None):
+        """Drop buckets past their resolution's retention; coarser resolutions still hold the counts"""
+        now = time.time() if now is None else now
+        self.rollup()
+        dropped = 0
+        for series in self.series.values():
+            for buckets, (_, width, retention) in zip(series.buckets, RESOLUTIONS):
+                oldest = int(now - retention) // width
+                expired = [index for index in buckets if index < oldest]
+                for index in expired:
+                    del buckets[index]
+                dropped += len(expired)
+        if dropped:
+            self.dirty = True
+        return dropped
+
+    def _resolution_for(self, start, end, now):
+        for index, (_, width, retention) in enumerate(RESOLUTIONS):
+            if now - start <= retention and (end - start) / width <= MAX_POINTS:
+                return index
+        return len(RESOLUTIONS) - 1
+
+    def query(self, key, start, end, resolution=None, now=None):
+        """[(bucket start, count), ...] covering unix times [start, end), zero-filled"""
+        self.rollup()
+        now = time.time() if now is None else now
+        index = self._resolution_for(start, end, now) if resolution is None else RESOLUTION_INDEX[resolution]
+        width = RESOLUTIONS[index][1]
+        series = self.series.get(key)
+        buckets = series.buckets[index] if series else {}
+        first, last = int(start) // width, (int(end) - 1) // width
+        return [(bucket * width, buckets.get(bucket, 0)) for bucket in range(first, last + 1)]
+
+    def total(self, key, start=None, end=None, now=None):
+        """Count over [start, end), or the lifetime count when no range is given"""
+        if start is None:
+            self.rollup()
+            series = self.series.get(key)
+            return series.total if series else 0
+        return sum(count for _, count in self.query(key, start, end, now=now))
+
+    def top(self, kind, start, end, limit=10, now=None):
+        """[(name, count), ...] for the busiest series of a kind ("channel", "command") in a range"""
+        self.rollup()
+        now = time.time() if now is None else now
+        index = self._resolution_for(start, end, now)
+        width = RESOLUTIONS[index][1]
+        first, last = int(start) // width, (int(end) - 1) // width
+        prefix = f"{kind}:"
+
+        counts = []
+        for key, series in self.series.items():
+            if not key.startswith(prefix):
+                continue
+            buckets = series.buckets[index]
+            if len(buckets) <= last - first + 1:
+                count = sum(value for bucket, value in buckets.items() if first <= bucket <= last)
+            else:
+                count = sum(buckets.get(bucket, 0) for bucket in range(first, last + 1))
+            if count:
+                counts.append((key[len(prefix):], count))
+        counts.sort(key=lambda item: item[1], reverse=True)
+        return counts[:limit]
+
+    def import_legacy(self, analytics):
+        """Fold the old per-day message counts and lifetime command counts in; returns entries imported"""
+        imported = 0
+        day_width = RESOLUTIONS[RESOLUTION_INDEX['day']][1]
+        for guild_id, days in analytics.pop('daily_messages', {}).items():
+            series = self.series.setdefault(f"message:{guild_id}", Series())
+            for day, count in days.items():
+                start = datetime.fromisoformat(day).replace(tzinfo=timezone.utc).timestamp()
+                day_buckets = series.buckets[RESOLUTION_INDEX['day']]
+                index = int(start) // day_width
+                day_buckets[index] = day_buckets.get(index, 0) + count
+                series.total += count
+                imported += 1
+        for name, count in analytics.pop('command_usage', {}).items():
+            self.series.setdefault(f"command:{name}", Series()).total += count
+            imported += 1
+        if imported:
+            self.dirty = True
+        return imported
+
+    def save(self):
+        self.rollup()
+        if not self.dirty:
+            return
+        payload = {}
+        for key, series in self.series.items():
+            entry = {'total': series.total}
+            for (name, _, _), buckets in zip(RESOLUTIONS, series.buckets):
+                # Sorted (index, count) pairs stored as [first index, count, gap, count, ...]
+                flat = []
+                previous = 0
+                for index in sorted(buckets):
+                    flat.extend((index - previous, buckets[index]))
+                    previous = index
+                entry[name] = flat
+            payload[key] = entry
+
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(zlib.compress(json.dumps(payload, separators=(',', ':')).encode('utf-8')))
+        os.replace(temp_path, self.path)
+        self.loaded_mtime = os.path.getmtime(self.path)
+        self.dirty = False
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'rb') as f:
+                payload = json.loads(zlib.decompress(f.read()))
+            self.loaded_mtime = os.path.getmtime(self.path)
+        except Exception as e:
+            print(f"Error loading time series: {e}")
+            return
+
+        self.series = {}
+        for key, entry in payload.items():
+            series = self.series[key] = Series()
+            series.total = entry.get('total', 0)
+            for (name, _, _), buckets in zip(RESOLUTIONS, series.buckets):
+                flat = entry.get(name, [])
+                index = 0
+                for position in range(0, len(flat), 2):
+                    index += flat[position]
+                    buckets[index] = flat[position + 1]
+
+    def refresh(self):
+        """Reload if another process (the bot) saved newer data; for read-only users like the dashboard"""
+        if os.path.exists(self.path) and os.path.getmtime(self.path) > self.loaded_mtime and not self.pending:
+            self.load()
@@ -0,0 +1,157 @@
+"""
+Ticket Transcripts
+Records ticket channel activity as it happens so closing a ticket never re-reads history
+"""
+import discord
+from datetime import datetime
+from ticket_logs import TicketMessageLog
+
+
+class TranscriptRecorder:
+    """Streams ticket messages, edits and deletes to an on-disk event log per channel"""
+
+    def __init__(self, directory='transcripts'):
+        self.log = TicketMessageLog(directory)
+        self._resume_points = {}
+
+    def record_message(self, message):
+        """Record a newly sent message with its embed and attachment metadata"""
+        # Pin where this process picked up before writing, so backfill still sees the gap
+        self.resume_point(message.channel.id)
+        self.log.append(message.channel.id, {
+            'event': 'message',
+            'id': message.id,
+            'author': message.author.name,
+            'author_id': message.author.id,
+            'content': message.content,
+            'created_at': message.created_at.strftime("%Y-%m-%d %H:%M:%S"),
+            'embeds': [embed.title or 'No title' for embed in message.embeds],
+            'attachments': [
+                {
+                    'filename': attachment.filename,
+                    'url': attachment.url,
+                    'size': attachment.size,
+                    'content_type': attachment.content_type
+                }
+                for attachment in message.attachments
+            ]
+        })
+
+    def record_edit(self, channel_id, message_id, content):
+        self.log.append(channel_id, {
+            'event': 'edit',
+            'id': message_id,
+            'content': content,
+            'edited_at': datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+        })
+
+    def record_delete(self, channel_id, message_id):
+        self.log.append(channel_id, {
+            'event': 'delete',
+            'id': message_id,
+            'deleted_at': datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+        })
+
+    def has_transcript(self, channel_id):
+        return self.log.exists(channel_id)
+
+    def resume_point(self, channel_id):
+        """Newest message captured before this process started listening to the channel"""
+        if channel_id not in self._resume_points:
+            last_id = 0
+            for event in reversed(self.log.tail(channel_id, limit=50)):
+                if event.get('event') == 'message':
+                    last_id = event['id']
+                    break
+            if not last_id and self.log.exists(channel_id):
+                last_id = max(
+                    (e['id'] for e in self.log.read_all(channel_id) if e.get('event') == 'message'),
+                    default=0
+                )
+            self._resume_points[channel_id] = last_id
+        return self._resume_points[channel_id] or None
+
+    def last_activity(self, channel_id):
+        """Time of the newest captured message, or None if nothing was captured"""
+        for event in reversed(self.log.tail(channel_id, limit=50)):
+            if event.get('event') == 'message':
+                return datetime.strptime(event['created_at'], "%Y-%m-%d %H:%M:%S")
+        return None
+
+    async def backfill(self, channel):
+        """Capture any messages sent while the bot was not listening"""
+        last_id = self.resume_point(channel.id)
+        after = discord.Object(id=last_id) if last_id else None
+
+        count = 0
+        newest = last_id or 0
+        async for message in channel.history(limit=None, after=after, oldest_first=True):
+            self.record_message(message)
+            newest = max(newest, message.id)
+            count += 1
+        self._resume_points[channel.id] = newest
+        return count
+
+    async def build(self, channel, header_lines):
+        """Render the transcript, paging history only if nothing was ever captured"""
+        if not self.has_transcript(channel.id):
+            try:
+                await self.backfill(channel)
+            except Exception as e:
+                print(f"Error backfilling transcript for {channel.id}: {e}")
+        return self.render(channel.id, header_lines)
+
+    def render(self, channel_id, header_lines):
+        """Replay the event log into the plain-text transcript format"""
+        messages = {}
+        for event in self.log.read_all(channel_id):
+            kind = event.get('event')
+            if kind == 'message':
+                # Backfill may capture a message that was also seen live
+                if event['id'] not in messages:
+                    messages[event['id']] = dict(event, edits=[], deleted=False)
+            elif kind == 'edit' and event['id'] in messages:
+                messages[event['id']]['edits'].append(event)
+            elif kind == 'delete' and event['id'] in messages:
+                messages[event['id']]['deleted'] = True
+
+        lines = list(header_lines)
+        for message_id in sorted(messages):
+            message = messages[message_id]
+            content = message['edits'][-1]['content'] if message['edits'] else message['content']
+            flags = ""
+            if message['edits']:
+                flags += " (edited)"
+            if message['deleted']:
+                flags += " [deleted]"
+            lines.append(f"[{message['created_at']}] {message['author']}: {content}{flags}")
+
+            if message['edits']:
+                lines.append(f"  [Original: {message['content']}]")
+
+            for title in message['embeds']:
+                lines.append(f"  [Embed: {title}]")
+
+            for attachment in message['attachments']:
+                lines.append(f"  [Attachment: {attachment['filename']} - {attachment['url']}]")
+
+        return "\n".join(lines)
+
+    def discard(self, channel_id):
+        self._resume_points.pop(channel_id, None)
+        self.log.delete(channel_id)
+
+
+def transcript_header(channel, ticket_data, closer, close_reason):
+    """Standard header shared by every ticket transcript"""
+    return [
+        f"Ticket Transcript - {channel.name}",
+        f"Ticket ID: {channel.id}",
+        f"Type: {ticket_data.get('label', 'Unknown')}",
+        f"Creator: {ticket_data.get('creator')}",
+        f"Created: {ticket_data.get('created_at', 'Unknown')}",
+        f"Closed by: {closer.name} ({closer.id})",
+        f"Close Reason: {close_reason}",
+        "=" * 80,
+        ""
+    ]
@@ -145,6 +145,44 @@ def memory_stats():
         'recent_messages': messages[-50:] if messages else []
     })
 
+@app.route('/api/search')
+@login_required
+def search():
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'success': False, 'message': 'Query is required'})
+    
+    kinds = [k for k in request.args.get('kinds', '').split(',') if k] or None
+    limit = min(request.args.get('limit', 20, type=int), 100)
+    try:
+        found = db.search(query, kinds, limit)
+        return jsonify({'success': True, **found})
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Error: {str(e)}'})
+
+@app.route('/api/analytics')
+@login_required
+def analytics():
+    key = request.args.get('series', '').strip()
+    if not key:
+        return jsonify({'success': False, 'message': 'Series is required'})
+
+    now = time.time()
+    end = request.args.get('end', now, type=float)
+    start = request.args.get('start', end - 86400, type=float)
+    resolution = request.args.get('resolution') or None
+    try:
+        db.analytics.refresh()
+        points = db.analytics.query(key, start, end, resolution)
+        return jsonify({
+            'success': True,
+            'series': key,
+            'points': points,
+            'total': sum(count for _, count in points)
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Error: {str(e)}'})
+
 @app.route('/ai/start', methods=['POST'])
 @owner_required
 def ai_start():
@@ -0,0 +1,265 @@
+"""
+Write Scheduler
+Central queue for outbound Discord writes with per-route pacing, coalescing and priorities
+"""
+import asyncio
+import heapq
+import itertools
+import time
+import discord
+from bulk_delete import BulkDeleteQueue
+
+PRIORITY_MODERATION = 0
+PRIORITY_NORMAL = 1
+PRIORITY_COSMETIC = 2
+
+# route prefix -> (requests, per seconds); kept under Discord's published limits
+ROUTE_LIMITS = {
+    'channel_edit': (2, 600),
+    'presence': (4, 60),
+    'message_delete': (4, 1),
+    'message_send': (4, 5),
+    'member_edit': (8, 1),
+    'member_kick': (2, 1),
+    'member_roles': (5, 5),
+    'bulk_delete': (1, 1)
+}
+DEFAULT_LIMIT = (4, 1)
+
+
+class RouteBucket:
+    """Token bucket for one Discord route"""
+
+    def __init__(self, capacity, per):
+        self.capacity = capacity
+        self.rate = capacity / per
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def delay(self):
+        """Seconds until a token is available (0 when one can be taken now)"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+    def block(self, seconds):
+        self.blocked_until = time.monotonic() + seconds
+
+
+class WriteJob:
+    __slots__ = ('route', 'action', 'priority', 'key', 'value', 'expires', 'future', 'queued')
+
+    def __init__(self, route, action, priority, key, value, ttl):
+        self.route = route
+        self.action = action
+        self.priority = priority
+        self.key = key
+        self.value = value
+        self.expires = time.monotonic() + ttl if ttl else None
+        self.future = asyncio.get_running_loop().create_future()
+        self.queued = True
+
+
+class WriteScheduler:
+    """Runs queued writes highest priority first, as each route's bucket allows.
+
+    Each route keeps its own priority queue. Routes with a token are in `_runnable`, ordered by
+    their best job; routes waiting on their bucket are in `_waiting` by ready time, so a wake-up
+    only touches routes that can actually send.
+    """
+
+    def __init__(self):
+        self._routes = {}         # route -> [(priority, order, job), ...]
+        self._runnable = []       # [(priority, order, route), ...]
+        self._waiting = []        # [(ready_at, route), ...]
+        self._route_state = {}    # route -> 'runnable' or 'waiting' while it has queued jobs
+        self._counter = itertools.count()
+        self._pending = {}        # coalescing key -> queued job
+        self._applied = {}        # coalescing key -> last value written
+        self._buckets = {}
+        self._wakeup = None
+        self._task = None
+        self.bulk_deletes = BulkDeleteQueue(self)
+        self.stats = {'submitted': 0, 'executed': 0, 'skipped': 0, 'merged': 0, 'expired': 0, 'failed': 0}
+
+    def _bucket(self, route):
+        bucket = self._buckets.get(route)
+        if bucket is None:
+            capacity, per = ROUTE_LIMITS.get(route.split(':', 1)[0], DEFAULT_LIMIT)
+            bucket = self._buckets[route] = RouteBucket(capacity, per)
+        return bucket
+
+    def throttle(self, route, seconds):
+        """Pause a route, e.g. after an action handled a 429 itself"""
+        self._bucket(route).block(seconds)
+
+    def submit(self, route, action, priority=PRIORITY_NORMAL, key=None, value=None, ttl=None):
+        """Queue `action` (a coroutine function) and return a future for its result.
+
+        Writes sharing a `key` are merged: only the newest queued action runs, and it is skipped
+        entirely if `value` matches what was last written for that key.
+        """
+        self.stats['submitted'] += 1
+        if key is not None:
+            queued = self._pending.get(key)
+            if queued:
+                queued.action = action
+                queued.value = value
+                if priority < queued.priority:
+                    queued.priority = priority
+                    self._push(queued)
+                self.stats['merged'] += 1
+                return queued.future
+            if value is not None and self._applied.get(key) == value:
+                self.stats['skipped'] += 1
+                future = asyncio.get_running_loop().create_future()
+                future.set_result(None)
+                return future
+
+        job = WriteJob(route, action, priority, key, value, ttl)
+        if key is not None:
+            self._pending[key] = job
+        self._push(job)
+        return job.future
+
+    def _push(self, job):
+        order = next(self._counter)
+        heapq.heappush(self._routes.setdefault(job.route, []), (job.priority, order, job))
+        if self._route_state.get(job.route) != 'waiting':
+            # Duplicate runnable entries are harmless: the route is drained on the first one
+            self._route_state[job.route] = 'runnable'
+            heapq.heappush(self._runnable, (job.priority, order, job.route))
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        self._wakeup.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def _drain(self, route):
+        """Start this route's jobs while its bucket has tokens, then park it until the next one"""
+        queue = self._routes[route]
+        bucket = self._bucket(route)
+        while queue:
+            priority, order, job = queue[0]
+            if not job.queued or priority != job.priority:
+                heapq.heappop(queue)  # already run, or re-queued at a higher priority
+                continue
+            if job.expires and time.monotonic() > job.expires:
+                heapq.heappop(queue)
+                self._finish(job)
+                self.stats['expired'] += 1
+                continue
+            delay = bucket.delay()
+            if delay > 0:
+                self._route_state[route] = 'waiting'
+                heapq.heappush(self._waiting, (time.monotonic() + delay, route))
+                return
+            heapq.heappop(queue)
+            bucket.take()
+            self._finish(job)
+            asyncio.create_task(self._execute(job, bucket))
+        del self._routes[route]
+        del self._route_state[route]
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            now = time.monotonic()
+            while self._waiting and self._waiting[0][0] <= now:
+                _, route = heapq.heappop(self._waiting)
+                queue = self._routes.get(route)
+                if queue:
+                    self._route_state[route] = 'runnable'
+                    heapq.heappush(self._runnable, (queue[0][0], queue[0][1], route))
+
+            while self._runnable:
+                _, _, route = heapq.heappop(self._runnable)
+                if self._route_state.get(route) == 'runnable':
+                    self._drain(route)
+
+            timeout = max(0, self._waiting[0][0] - time.monotonic()) if self._waiting else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _finish(self, job):
+        job.queued = False
+        if job.key is not None and self._pending.get(job.key) is job:
+            del self._pending[job.key]
+        if job.expires and not job.future.done() and time.monotonic() > job.expires:
+            job.future.set_result(None)
+
+    async def _execute(self, job, bucket):
+        try:
+            result = await job.action()
+            if job.key is not None and job.value is not None:
+                self._applied[job.key] = job.value
+            self.stats['executed'] += 1
+            if not job.future.done():
+                job.future.set_result(result)
+        except discord.HTTPException as e:
+            if e.status == 429:
+                bucket.block(getattr(e, 'retry_after', None) or 5)
+            self._fail(job, e)
+        except Exception as e:
+            self._fail(job, e)
+
+    def _fail(self, job, error):
+        # Callers rarely await writes, so failures are logged and resolve to None
+        self.stats['failed'] += 1
+        print(f"Write to {job.route} failed: {error}")
+        if not job.future.done():
+            job.future.set_result(None)
+
+    # Common writes
+    def rename_channel(self, channel, name, priority=PRIORITY_COSMETIC):
+        key = f"channel_name:{channel.id}"
+        if key not in self._pending:
+            # The cached channel is the source of truth, so renames made elsewhere are respected
+            self._applied[key] = channel.name
+        return self.submit(f"channel_edit:{channel.id}", lambda: channel.edit(name=name), priority, key, name)
+
+    def change_presence(self, bot, status, activity, priority=PRIORITY_COSMETIC):
+        value = (str(status), activity.type.value if activity else None, getattr(activity, 'name', None), getattr(activity, 'url', None))
+        return self.submit('presence', lambda: bot.change_presence(status=status, activity=activity), priority, 'presence', value)
+
+    def delete_message(self, message, priority=PRIORITY_MODERATION):
+        """Deletions are collected per channel and sent as bulk deletes where possible"""
+        return self.bulk_deletes.add(message, priority)
+
+    def send_message(self, channel, priority=PRIORITY_NORMAL, key=None, ttl=None, **kwargs):
+        return self.submit(f"message_send:{channel.id}", lambda: channel.send(**kwargs), priority, key, ttl=ttl)
+
+    def timeout_member(self, member, duration, reason=None, priority=PRIORITY_MODERATION):
+        return self.submit(
+            f"member_edit:{member.guild.id}",
+            lambda: member.timeout(duration, reason=reason),
+            priority,
+            f"timeout:{member.guild.id}:{member.id}"
+        )
+
+    def kick_member(self, member, reason=None, priority=PRIORITY_MODERATION):
+        return self.submit(
+            f"member_kick:{member.guild.id}",
+            lambda: member.kick(reason=reason),
+            priority,
+            f"kick:{member.guild.id}:{member.id}"
+        )
+
+
+def get_scheduler(bot):
+    """The bot-wide WriteScheduler (created on first use)"""
+    scheduler = getattr(bot, 'write_scheduler', None)
+    if scheduler is None:
+        scheduler = bot.write_scheduler = WriteScheduler()
+    return scheduler
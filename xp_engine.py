@@ -0,0 +1,179 @@
+"""
+XP Engine
+In-memory member XP with monotonic cooldowns, closed-form level math and batched saves
+"""
+import asyncio
+import math
+import time
+
+
+def xp_for_level(level):
+    """XP needed to go from `level` to `level + 1`"""
+    return 5 * (level ** 2) + (50 * level) + 100
+
+
+def total_xp_for_level(level):
+    """Cumulative XP needed to reach `level` from level 1: sum of xp_for_level(1 .. level - 1)"""
+    n = level - 1
+    return 5 * n * (n + 1) * (2 * n + 1) // 6 + 50 * n * (n + 1) // 2 + 100 * n
+
+
+def level_for_total(total):
+    """Invert total_xp_for_level: returns (level, xp into that level) for a cumulative XP total"""
+    if total <= 0:
+        return 1, 0
+    # total ~ (5/3)n^3 + 27.5n^2 + ...; the cube-root estimate is within a level or two
+    level = max(1, int(math.pow(total * 3 / 5, 1 / 3)) - 4)
+    while total_xp_for_level(level + 1) <= total:
+        level += 1
+    while level > 1 and total_xp_for_level(level) > total:
+        level -= 1
+    return level, total - total_xp_for_level(level)
+
+
+class XPRecord:
+    __slots__ = ('level', 'xp', 'next_award', 'last_message')
+
+    def __init__(self, level=1, xp=0, last_message=0.0):
+        self.level = level
+        self.xp = xp                # progress into the current level
+        self.next_award = 0.0       # monotonic time the message cooldown ends
+        self.last_message = last_message  # unix time of the last XP-earning message
+
+    @property
+    def total(self):
+        return total_xp_for_level(self.level) + self.xp
+
+
+class LevelUp:
+    __slots__ = ('guild_id', 'user_id', 'old_level', 'new_level', 'member', 'source')
+
+    def __init__(self, guild_id, user_id, old_level, new_level, member=None, source='message'):
+        self.guild_id = guild_id
+        self.user_id = user_id
+        self.old_level = old_level
+        self.new_level = new_level
+        self.member = member
+        self.source = source
+
+    def crossed(self, level):
+        return self.old_level < level <= self.new_level
+
+
+class XPEngine:
+    """XP lives in XPRecords; the stats tables are only written when dirty records are flushed"""
+
+    def __init__(self, stats, save):
+        self.stats = stats          # StatsTables holding the xp, level and last_message columns
+        self.save = save
+        self.records = {}           # (guild_id, user_id) -> XPRecord
+        self.dirty = set()
+        self.listeners = []
+        self.on_change = None       # optional callback(guild_id, user_id, total) on every score change
+
+    def subscribe(self, callback):
+        """Register an async callback(LevelUp)"""
+        self.listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self.listeners:
+            self.listeners.remove(callback)
+
+    def get(self, guild_id, user_id):
+        key = (guild_id, user_id)
+        record = self.records.get(key)
+        if record is None:
+            table = self.stats.guilds.get(guild_id)
+            if table is not None and user_id in table:
+                record = XPRecord(
+                    table.get(user_id, 'level'), table.get(user_id, 'xp'), table.get(user_id, 'last_message')
+                )
+            else:
+                record = XPRecord()
+            self.records[key] = record
+        return record
+
+    def guild_levels(self, guild_id):
+        """member id -> level for everyone with XP in the guild, unsaved changes included"""
+        table = self.stats.guilds.get(guild_id)
+        levels = dict(zip(table.user_ids, table.columns['level'])) if table is not None else {}
+        for (record_guild, user_id), record in self.records.items():
+            if record_guild == guild_id:
+                levels[user_id] = record.level
+        return levels
+
+    def ready(self, guild_id, user_id, now=None):
+        """Whether the member's message cooldown has passed"""
+        now = time.monotonic() if now is None else now
+        return now >= self.get(guild_id, user_id).next_award
+
+    def award(self, guild_id, user_id, amount, member=None, source='message', cooldown=0, now=None):
+        """Add XP, carrying overflow across as many levels as it covers; returns a LevelUp or None"""
+        record = self.get(guild_id, user_id)
+        if cooldown:
+            record.next_award = (time.monotonic() if now is None else now) + cooldown
+        if source == 'message':
+            record.last_message = time.time()
+
+        old_level = record.level
+        record.xp += amount
+        if record.xp >= xp_for_level(record.level):
+            record.level, record.xp = level_for_total(total_xp_for_level(record.level) + record.xp)
+        self.dirty.add((guild_id, user_id))
+        if self.on_change:
+            self.on_change(guild_id, user_id, record.total)
+
+        if record.level == old_level:
+            return None
+        event = LevelUp(guild_id, user_id, old_level, record.level, member, source)
+        self.emit(event)
+        return event
+
+    def set_total(self, guild_id, user_id, total):
+        """Set a member's cumulative XP (imports, admin overrides) without firing level-up events"""
+        record = self.get(guild_id, user_id)
+        record.level, record.xp = level_for_total(total)
+        self.dirty.add((guild_id, user_id))
+        if self.on_change:
+            self.on_change(guild_id, user_id, record.total)
+        return record
+
+    def emit(self, event):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        for callback in list(self.listeners):
+            loop.create_task(self._notify(callback, event))
+
+    async def _notify(self, callback, event):
+        try:
+            await callback(event)
+        except Exception as e:
+            print(f"Level-up handler error: {e}")
+
+    def _write(self, key):
+        record = self.records[key]
+        table = self.stats.guild(key[0])
+        table.set(key[1], 'xp', record.xp)
+        table.set(key[1], 'level', record.level)
+        table.set(key[1], 'last_message', record.last_message)
+        self.stats.dirty = True
+
+    def sync(self, guild_id, user_id):
+        """Write one member's unsaved XP into the stats tables"""
+        key = (guild_id, user_id)
+        if key in self.dirty:
+            self._write(key)
+            self.dirty.discard(key)
+
+    def flush(self, save=True):
+        """Write all dirty records into the stats tables; one save for the whole batch"""
+        if not self.dirty:
+            return 0
+        dirty, self.dirty = self.dirty, set()
+        for key in dirty:
+            self._write(key)
+        if save:
+            self.save()
+        return len(dirty)